@@ -23,6 +23,8 @@ admin.site.register(proj.ProjectTaskRequirement)
 admin.site.register(proj.VolunteerApplication)
 admin.site.register(user.User)
 admin.site.register(user.UserNotification)
+admin.site.register(user.ArchivedNotification)
+admin.site.register(user.NotificationEmail)
 admin.site.register(user.VolunteerProfile)
 admin.site.register(user.VolunteerSkill)
 admin.site.register(user.UserBadge)
@@ -33,3 +35,18 @@ admin.site.register(org.OrganizationRole)
 admin.site.register(proj.ProjectRole)
 admin.site.register(proj.ProjectTaskRole)
 admin.site.register(news.NewsPiece)
+
+
+class ProjectBlueprintTaskInline(admin.StackedInline):
+    model = proj.ProjectBlueprintTask
+    extra = 0
+
+
+class ProjectBlueprintChannelInline(admin.TabularInline):
+    model = proj.ProjectBlueprintChannel
+    extra = 0
+
+
+@admin.register(proj.ProjectBlueprint)
+class ProjectBlueprintAdmin(admin.ModelAdmin):
+    inlines = [ProjectBlueprintTaskInline, ProjectBlueprintChannelInline]
@@ -0,0 +1,129 @@
+import functools
+import hashlib
+import inspect
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save
+
+
+# Cached entries are tagged with the models they were computed from, either
+# the whole model or the rows with a given value in a field. Every tag has a
+# version stored in the cache, and the versions of its tags are part of the
+# key of an entry, so invalidating a tag only needs to change its version and
+# works the same with any cache backend. Entries of old versions just expire.
+DOMAIN_CACHE_PREFIX = 'domain'
+TAG_VERSION_PREFIX = 'tag'
+MISSING = object()
+
+# {model: set of field names its rows are tagged by}
+tagged_fields = {}
+
+
+def get_tag(model, field=None, value=None):
+    # The tag of the whole model changes with any row, and the '*' field tag
+    # changes only when all the rows are invalidated at once.
+    if field is None:
+        return model._meta.label_lower
+    if field == '*':
+        return '{0}:*'.format(model._meta.label_lower)
+    if isinstance(value, Model):
+        value = value.pk
+    return '{0}:{1}={2}'.format(model._meta.label_lower, field, value)
+
+def new_tag_version():
+    # Not a counter starting at 1, so that a tag whose version was evicted
+    # from the cache cannot come back to the version of old entries.
+    return int(time.time() * 1000000)
+
+def get_tag_versions(tags):
+    version_keys = ['{0}:{1}'.format(TAG_VERSION_PREFIX, tag) for tag in tags]
+    versions = cache.get_many(version_keys)
+    for key in version_keys:
+        if key not in versions:
+            cache.add(key, new_tag_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in version_keys]
+
+def invalidate_tags(tags):
+    for tag in tags:
+        key = '{0}:{1}'.format(TAG_VERSION_PREFIX, tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, new_tag_version(), None)
+
+def invalidate(model, **field_values):
+    # Called after changes that do not send signals, such as update() and
+    # bulk_create(). Without field values all the rows are invalidated.
+    tags = [get_tag(model)]
+    if field_values:
+        tags += [get_tag(model, field, value) for field, value in field_values.items()]
+    else:
+        tags.append(get_tag(model, '*'))
+    transaction.on_commit(lambda: invalidate_tags(tags))
+
+def invalidate_instance(sender, instance, **kwargs):
+    fields = tagged_fields.get(sender, ())
+    invalidate(sender, **{field: getattr(instance, 'pk' if field == 'pk' else sender._meta.get_field(field).attname)
+                          for field in fields})
+
+def register_tag(model, field=None):
+    if model not in tagged_fields:
+        tagged_fields[model] = set()
+        post_save.connect(invalidate_instance, sender=model, dispatch_uid='domain-cache')
+        post_delete.connect(invalidate_instance, sender=model, dispatch_uid='domain-cache')
+    if field is not None:
+        tagged_fields[model].add(field)
+
+
+def cached(tags=(), vary_on=None, timeout=None):
+    # Caches the result of a domain getter. Each tag is a model, to tag the
+    # entry with all its rows, or a (model, argument[, field]) tuple, to tag
+    # it with the rows whose field (the primary key by default) is the value
+    # of the argument. The key is built from the arguments listed in vary_on
+    # (all of them by default), so request_user must only be left out when
+    # the result does not depend on it. Results must be picklable, so
+    # getters returning lazy query sets cannot be cached.
+    entry_tags = []
+    for tag in tags:
+        if isinstance(tag, tuple):
+            model, argument, field = (tag + ('pk',))[:3]
+        else:
+            model, argument, field = tag, None, None
+        register_tag(model, field)
+        entry_tags.append((model, argument, field))
+
+    def decorator(function):
+        signature = inspect.signature(function)
+        key_arguments = list(signature.parameters) if vary_on is None else list(vary_on)
+        function_name = '{0}.{1}'.format(function.__module__, function.__qualname__)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            # Inside a transaction the data may not be committed yet, so the
+            # cache is neither read nor written.
+            if not settings.DOMAIN_CACHE_ENABLED or connection.in_atomic_block:
+                return function(*args, **kwargs)
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            values = arguments.arguments
+            key_values = [values[name].pk if isinstance(values[name], Model) else values[name] for name in key_arguments]
+            tag_names = []
+            for model, argument, field in entry_tags:
+                if argument is None:
+                    tag_names.append(get_tag(model))
+                else:
+                    tag_names += [get_tag(model, field, values[argument]), get_tag(model, '*')]
+            key_hash = hashlib.md5(repr((function_name, key_values, get_tag_versions(tag_names))).encode('utf-8')).hexdigest()
+            key = '{0}:{1}'.format(DOMAIN_CACHE_PREFIX, key_hash)
+            result = cache.get(key, MISSING)
+            if result is MISSING:
+                result = function(*args, **kwargs)
+                cache.set(key, result, settings.DOMAIN_CACHE_TIMEOUT if timeout is None else timeout)
+            return result
+        return wrapper
+    return decorator
@@ -1,8 +1,16 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
 from marketplace.models.common import SocialCause, TaskType
 from marketplace.models.proj import ProjectStatus
 from marketplace.models.user import BadgeType
 from marketplace.models.org import OrganizationType
 
+from .cache import invalidate
+
+COUNTER_RECONCILE_BATCH_SIZE = 500
+
 
 def get_field_value(object, path):
     if isinstance(path, str):
@@ -21,6 +29,59 @@ def validate_consistent_keys(object, error_message='Detected primary key inconsi
     return True
 
 
+def diff_rows(existing_rows, wanted_values, new_row, keys=None):
+    # Compares the existing rows ({key: row}) with the wanted field values
+    # ({key: {field: value}}) and returns the rows to create (built with
+    # new_row(key, values)), to update and to delete. When keys is given,
+    # only the rows with those keys may be deleted.
+    created_rows = []
+    updated_rows = []
+    for key, values in wanted_values.items():
+        row = existing_rows.get(key)
+        if row is None:
+            created_rows.append(new_row(key, values))
+        elif any(getattr(row, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(row, field, value)
+            updated_rows.append(row)
+    deleted_rows = [row for key, row in existing_rows.items()
+                    if key not in wanted_values and (keys is None or key in keys)]
+    return created_rows, updated_rows, deleted_rows
+
+
+def apply_row_diff(model, created_rows, updated_rows, deleted_rows, fields):
+    # Applies the result of diff_rows with one query of each kind, and
+    # returns whether anything changed
+    if not (created_rows or updated_rows or deleted_rows):
+        return False
+    with transaction.atomic():
+        model.objects.bulk_create(created_rows)
+        model.objects.bulk_update(updated_rows, fields)
+        model.objects.filter(id__in=[row.id for row in deleted_rows]).delete()
+    return True
+
+
+def count_rows(query_set, field):
+    return Coalesce(Subquery(query_set.filter(**{field: OuterRef('pk')})
+                                      .order_by()
+                                      .values(field)
+                                      .annotate(row_count=Count('id'))
+                                      .values('row_count'), output_field=IntegerField()), 0)
+
+
+def reconcile_counter(query_set, counter_field, actual_count):
+    # Repairs the rows whose counter drifted from the actual count, and
+    # returns how many there were
+    drifted_ids = list(query_set.annotate(actual_count=actual_count)
+                                .exclude(**{counter_field: F('actual_count')})
+                                .values_list('id', flat=True))
+    for i in range(0, len(drifted_ids), COUNTER_RECONCILE_BATCH_SIZE):
+        query_set.filter(id__in=drifted_ids[i:i + COUNTER_RECONCILE_BATCH_SIZE]).update(**{counter_field: actual_count})
+    if drifted_ids:
+        invalidate(query_set.model)
+    return len(drifted_ids)
+
+
 social_cause_view_model_translation = {
                                         'education': SocialCause.EDUCATION,
                                         'health': SocialCause.HEALTH,
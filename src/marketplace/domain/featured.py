@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.db.models import Avg, Count, F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from ..models.common import ReviewStatus
+from ..models.news import FeaturedContent
+from ..models.org import Organization, OrganizationType
+from ..models.proj import Project, ProjectStatus
+from ..models.user import VolunteerProfile
+
+
+# A scorer receives the query set of candidates of a kind of featured content
+# and returns it ordered from best to worst. The scorer of each kind is chosen
+# with the FEATURED_*_SCORER settings.
+
+def most_volunteers_project_scorer(projects):
+    return projects.order_by('-volunteer_count', 'id')
+
+def best_reviewed_project_scorer(projects):
+    accepted_reviews = Q(projecttask__projecttaskreview__review_result=ReviewStatus.ACCEPTED)
+    return projects.annotate(average_review_score=Avg('projecttask__projecttaskreview__review_score', filter=accepted_reviews)) \
+                   .order_by(F('average_review_score').desc(nulls_last=True), '-volunteer_count', 'id')
+
+def most_projects_organization_scorer(organizations):
+    return organizations.annotate(project_count=Count('project')).order_by('-project_count', 'id')
+
+def best_reviewed_volunteer_scorer(volunteers):
+    return volunteers.annotate(task_count=Count('user__projecttaskrole')) \
+                     .order_by(F('average_review_score').desc(nulls_last=True), '-task_count', 'id')
+
+
+def get_featured_candidates(kind):
+    if kind == 'project':
+        return Project.objects.exclude(status__in=[ProjectStatus.DRAFT, ProjectStatus.EXPIRED, ProjectStatus.DELETED])
+    elif kind == 'organization':
+        return Organization.objects.filter(type=OrganizationType.SOCIAL_GOOD)
+    elif kind == 'volunteer':
+        return VolunteerProfile.objects.filter(volunteer_status=ReviewStatus.ACCEPTED)
+    raise KeyError("Unknown featured content kind: {0}".format(kind))
+
+FEATURED_SCORER_SETTINGS = {
+    'project': 'FEATURED_PROJECT_SCORER',
+    'organization': 'FEATURED_ORGANIZATION_SCORER',
+    'volunteer': 'FEATURED_VOLUNTEER_SCORER',
+}
+FEATURED_KINDS = tuple(FEATURED_SCORER_SETTINGS.keys())
+# Primary key of the single row of picks
+FEATURED_CONTENT_PK = 1
+
+
+class FeaturedContentService():
+
+    @staticmethod
+    def compute_pick(kind):
+        scorer = import_string(getattr(settings, FEATURED_SCORER_SETTINGS[kind]))
+        return scorer(get_featured_candidates(kind)).values_list('id', flat=True).first()
+
+    @staticmethod
+    def refresh_picks(kinds=FEATURED_KINDS):
+        # Called periodically (see the update_featured_content command) and
+        # when a domain event makes a candidate eligible or not eligible.
+        if set(kinds) != set(FEATURED_KINDS):
+            picks = {kind + '_id': FeaturedContentService.compute_pick(kind) for kind in kinds}
+            if FeaturedContent.objects.filter(pk=FEATURED_CONTENT_PK).update(**picks):
+                return picks
+        # All the picks are computed when they are not stored yet
+        picks = {kind + '_id': FeaturedContentService.compute_pick(kind) for kind in FEATURED_KINDS}
+        picks['computed_date'] = timezone.now()
+        FeaturedContent.objects.update_or_create(pk=FEATURED_CONTENT_PK, defaults=picks)
+        return picks
+
+    @staticmethod
+    def get_featured_content():
+        # The stored picks are served even when they are old; they are only
+        # computed here the first time.
+        content = FeaturedContent.objects.filter(pk=FEATURED_CONTENT_PK).first()
+        if content is None:
+            FeaturedContentService.refresh_picks()
+            content = FeaturedContent.objects.get(pk=FEATURED_CONTENT_PK)
+        return content
+
+    @staticmethod
+    def get_featured(kind, query_set=None):
+        # The stored pick is looked up among the current candidates. A pick
+        # that is no longer eligible is replaced by the best candidate, which
+        # is not stored until the next refresh. The query set can add related
+        # objects or annotations to the candidates.
+        if query_set is None:
+            query_set = get_featured_candidates(kind)
+        pick_id = getattr(FeaturedContentService.get_featured_content(), kind + '_id')
+        if pick_id is not None:
+            pick = query_set.filter(pk=pick_id).first()
+            if pick is not None:
+                return pick
+        pick_id = FeaturedContentService.compute_pick(kind)
+        if pick_id is None:
+            return None
+        return query_set.filter(pk=pick_id).first()
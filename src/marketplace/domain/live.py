@@ -0,0 +1,58 @@
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from ..models.proj import ProjectComment
+from ..models.user import UserNotification
+from .cache import get_tag, get_tag_versions
+
+
+class LiveUpdatesService():
+
+    @staticmethod
+    def get_new_notifications(request_user, after_id):
+        return list(UserNotification.objects.filter(user=request_user, id__gt=after_id)
+                                            .order_by('-id')[:settings.LIVE_UPDATES_MAX_ROWS])
+
+    @staticmethod
+    def get_new_comments(request_user, proj, channelid, after_id):
+        return list(ProjectComment.objects.filter(channel__id=channelid, channel__project=proj.id, id__gt=after_id)
+                                          .select_related('author')
+                                          .prefetch_related('author__userbadge_set')
+                                          .order_by('-id')[:settings.LIVE_UPDATES_MAX_ROWS])
+
+    @staticmethod
+    def get_notification_updates(request_user, after_id, timeout=0):
+        return LiveUpdatesService.wait_for_rows([get_tag(UserNotification, 'user', request_user)],
+                                                lambda: LiveUpdatesService.get_new_notifications(request_user, after_id),
+                                                timeout)
+
+    @staticmethod
+    def get_comment_updates(request_user, proj, channelid, after_id, timeout=0):
+        return LiveUpdatesService.wait_for_rows([get_tag(ProjectComment, 'channel', channelid)],
+                                                lambda: LiveUpdatesService.get_new_comments(request_user, proj, channelid, after_id),
+                                                timeout)
+
+    @staticmethod
+    def wait_for_rows(tags, fetch_rows, timeout):
+        # Returns the rows of fetch_rows as soon as there are any, waiting up
+        # to timeout seconds for them. New notifications and comments change
+        # the version of the domain cache tag of their user and channel, so
+        # while waiting only the versions of the tags are read from the
+        # cache. The database is queried again when they change or, as the
+        # cache may not be shared by all the web workers, when the wait is
+        # over.
+        versions = get_tag_versions(tags)
+        rows = fetch_rows()
+        if rows or timeout <= 0:
+            return rows
+        # The database connection is not kept open while waiting
+        if not connection.in_atomic_block:
+            connection.close()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(max(0, min(settings.LIVE_UPDATES_POLL_INTERVAL, deadline - time.monotonic())))
+            if get_tag_versions(tags) != versions:
+                break
+        return fetch_rows()
@@ -0,0 +1,142 @@
+import numpy as np
+
+from django.db import transaction
+from django.db.models import F
+
+from ..models.common import ReviewStatus, SkillLevel
+from ..models.proj import (
+    ProjectStatus, ProjectTask, ProjectTaskRequirement, ProjectTaskRole, TaskStatus, TaskRole,
+    TaskRequirementImportance, VolunteerApplication, VolunteerTaskMatch,
+)
+from ..models.user import User, VolunteerSkill
+from marketplace.authorization.common import ensure_user_has_permission
+
+
+# Relative weight of each requirement in the score of a task
+IMPORTANCE_WEIGHTS = {
+    TaskRequirementImportance.NICE_TO_HAVE: 1.0,
+    TaskRequirementImportance.IMPORTANT: 2.0,
+    TaskRequirementImportance.REQUIRED: 4.0,
+}
+LEVEL_COUNT = len(SkillLevel.get_choices())
+# Scores below this are not stored
+MIN_MATCH_SCORE = 0.25
+MATCH_BATCH_SIZE = 1000
+
+
+def get_matchable_tasks():
+    return ProjectTask.objects.exclude(stage__in=[TaskStatus.COMPLETED, TaskStatus.DELETED]) \
+                              .exclude(project__status__in=[ProjectStatus.COMPLETED, ProjectStatus.EXPIRED, ProjectStatus.DELETED])
+
+
+def build_requirement_matrices(task_ids, skill_index, requirements):
+    # A requirement of level L (counted from 1) and weight W is satisfied in
+    # a fraction min(V, L) / L by a volunteer of level V (0 if the volunteer
+    # lacks the skill). Writing min(V, L) as the number of levels k <= L
+    # with V >= k, the weighted score of every task against every volunteer
+    # becomes a sum of LEVEL_COUNT matrix products, where
+    # requirements[k][t, s] = W / L if L >= k, and
+    # volunteers[k][u, s] = 1 if V >= k.
+    task_index = {task_id: i for i, task_id in enumerate(task_ids)}
+    matrices = np.zeros((LEVEL_COUNT, len(task_ids), len(skill_index)), dtype=np.float32)
+    total_weights = np.zeros(len(task_ids), dtype=np.float32)
+    for task_id, skill_id, level, importance in requirements:
+        weight = IMPORTANCE_WEIGHTS[importance]
+        required_levels = level + 1
+        matrices[:required_levels, task_index[task_id], skill_index[skill_id]] = weight / required_levels
+        total_weights[task_index[task_id]] += weight
+    return matrices, total_weights
+
+
+def build_volunteer_matrices(user_ids, skill_index, volunteer_skills):
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+    matrices = np.zeros((LEVEL_COUNT, len(user_ids), len(skill_index)), dtype=np.float32)
+    for user_id, skill_id, level in volunteer_skills:
+        matrices[:level + 1, user_index[user_id], skill_index[skill_id]] = 1.0
+    return matrices
+
+
+def score_matrices(requirement_matrices, total_weights, volunteer_matrices):
+    # Returns a tasks x volunteers matrix of scores between 0 and 1
+    scores = np.einsum('kts,kus->tu', requirement_matrices, volunteer_matrices)
+    return scores / np.maximum(total_weights, 1.0)[:, np.newaxis]
+
+
+class MatchingService():
+
+    @staticmethod
+    def compute_matches(tasks=None, users=None):
+        # Scores the given tasks against the given volunteers (all of them if
+        # None) in a single vectorized pass and returns the unsaved matches
+        # that are above MIN_MATCH_SCORE.
+        requirements = ProjectTaskRequirement.objects.filter(task__in=get_matchable_tasks())
+        if tasks is not None:
+            requirements = requirements.filter(task__in=tasks)
+        requirements = list(requirements.values_list('task_id', 'skill_id', 'level', 'importance'))
+        volunteer_skills = VolunteerSkill.objects.all()
+        if users is not None:
+            volunteer_skills = volunteer_skills.filter(user__in=users)
+        volunteer_skills = list(volunteer_skills.values_list('user_id', 'skill_id', 'level'))
+        if not requirements or not volunteer_skills:
+            return []
+
+        task_ids = sorted(set(row[0] for row in requirements))
+        user_ids = sorted(set(row[0] for row in volunteer_skills))
+        skill_ids = sorted(set(row[1] for row in requirements) | set(row[1] for row in volunteer_skills))
+        skill_index = {skill_id: i for i, skill_id in enumerate(skill_ids)}
+
+        requirement_matrices, total_weights = build_requirement_matrices(task_ids, skill_index, requirements)
+        volunteer_matrices = build_volunteer_matrices(user_ids, skill_index, volunteer_skills)
+        scores = score_matrices(requirement_matrices, total_weights, volunteer_matrices)
+
+        task_positions, user_positions = np.nonzero(scores >= MIN_MATCH_SCORE)
+        return [VolunteerTaskMatch(task_id=task_ids[t], user_id=user_ids[u], score=round(float(scores[t, u]), 4))
+                for t, u in zip(task_positions, user_positions)]
+
+    @staticmethod
+    def rebuild_matches():
+        matches = MatchingService.compute_matches()
+        with transaction.atomic():
+            VolunteerTaskMatch.objects.all().delete()
+            VolunteerTaskMatch.objects.bulk_create(matches, batch_size=MATCH_BATCH_SIZE)
+        return len(matches)
+
+    @staticmethod
+    def update_volunteer_matches(user):
+        # Only the row of the volunteer is recomputed
+        matches = MatchingService.compute_matches(users=[user])
+        with transaction.atomic():
+            VolunteerTaskMatch.objects.filter(user=user).delete()
+            VolunteerTaskMatch.objects.bulk_create(matches, batch_size=MATCH_BATCH_SIZE)
+
+    @staticmethod
+    def update_task_matches(task):
+        # Only the column of the task is recomputed
+        matches = MatchingService.compute_matches(tasks=[task])
+        with transaction.atomic():
+            VolunteerTaskMatch.objects.filter(task=task).delete()
+            VolunteerTaskMatch.objects.bulk_create(matches, batch_size=MATCH_BATCH_SIZE)
+
+    @staticmethod
+    def recommended_tasks(request_user, user, limit=10):
+        ensure_user_has_permission(request_user, user, 'user.is_same_user')
+        return ProjectTask.objects.filter(volunteertaskmatch__user=user,
+                                          accepting_volunteers=True) \
+                                  .exclude(stage__in=[TaskStatus.COMPLETED, TaskStatus.DRAFT, TaskStatus.DELETED]) \
+                                  .exclude(project__status__in=[ProjectStatus.DRAFT, ProjectStatus.EXPIRED, ProjectStatus.DELETED]) \
+                                  .exclude(projecttaskrole__user=user) \
+                                  .exclude(pk__in=VolunteerApplication.objects.filter(volunteer=user, status=ReviewStatus.NEW)
+                                                                              .values('task')) \
+                                  .annotate(match_score=F('volunteertaskmatch__score')) \
+                                  .select_related('project') \
+                                  .order_by('-match_score', 'id')[:limit]
+
+    @staticmethod
+    def recommended_volunteers(request_user, task, limit=10):
+        ensure_user_has_permission(request_user, task.project, 'project.volunteers_view')
+        return User.objects.filter(volunteertaskmatch__task=task,
+                                   volunteerprofile__volunteer_status=ReviewStatus.ACCEPTED) \
+                           .exclude(pk__in=ProjectTaskRole.objects.filter(task=task, role=TaskRole.VOLUNTEER)
+                                                                  .values('user')) \
+                           .annotate(match_score=F('volunteertaskmatch__score')) \
+                           .order_by('-match_score', 'id')[:limit]
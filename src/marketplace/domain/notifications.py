@@ -1,10 +1,20 @@
 import logging
+from datetime import timedelta
+from itertools import groupby
 from smtplib import SMTPException
 
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.db.models.functions import Greatest
+from django.template.loader import render_to_string
+from django.utils import timezone
 
-from marketplace.models.user import UserNotification
+from marketplace.models.user import User, UserNotification, ArchivedNotification, NotificationEmail, EmailDeliveryStatus, EmailNotificationFrequency
+
+from .cache import get_tag, invalidate_tags
+from .common import count_rows, reconcile_counter
 
 
 LOG = logging.getLogger(__name__)
@@ -14,14 +24,18 @@ class NotificationService():
 
     @staticmethod
     def add_user_notification(user, notification_description, severity, source, target_id):
+        send_immediately = user.notification_email_frequency == EmailNotificationFrequency.IMMEDIATE
         notification = UserNotification(user=user,
                                         notification_description=notification_description,
                                         severity=severity,
                                         source=source,
                                         target_id=target_id,
-                                        is_read=False)
+                                        is_read=False,
+                                        email_pending=not send_immediately)
         notification.save()
-        if user.email:
+        User.objects.filter(pk=user.pk).update(unread_notification_count=F('unread_notification_count') + 1)
+        NotificationService.invalidate_user_tags([user.id])
+        if user.email and send_immediately:
             message = "You have a new notification pending:\n{0}".format(notification_description)
             NotificationService.send_email(
                 settings.DEFAULT_FROM_EMAIL,
@@ -31,29 +45,223 @@ class NotificationService():
             )
 
     @staticmethod
-    def add_multiuser_notification(users, notification_description, severity, source, target_id):
+    def invalidate_user_tags(user_ids):
+        # New notifications change the tag of their user for the requests that
+        # wait for them (see domain.live). The tag is not bumped by signals,
+        # which would prevent fast deletes of the notifications.
+        transaction.on_commit(lambda: invalidate_tags([get_tag(UserNotification, 'user', user_id) for user_id in user_ids]))
+
+    @staticmethod
+    def get_recipients(users):
+        # Returns a list of unique (id, email, email frequency) tuples.
+        # Querysets are deduplicated by the database; UNION queries are
+        # already distinct and do not allow further filtering.
+        fields = ('id', 'email', 'notification_email_frequency')
+        if isinstance(users, QuerySet):
+            if users.query.combinator:
+                return list(users.values_list(*fields))
+            return list(users.order_by().values_list(*fields).distinct())
+        recipients = {}
         for user in users:
-            NotificationService.add_user_notification(user, notification_description, severity, source, target_id)
+            recipients[user.id] = (user.id, user.email, user.notification_email_frequency)
+        return list(recipients.values())
+
+    @staticmethod
+    def add_multiuser_notification(users, notification_description, severity, source, target_id):
+        recipients = NotificationService.get_recipients(users)
+        if not recipients:
+            return
+        UserNotification.objects.bulk_create([
+            UserNotification(user_id=user_id,
+                             notification_description=notification_description,
+                             severity=severity,
+                             source=source,
+                             target_id=target_id,
+                             is_read=False,
+                             email_pending=frequency != EmailNotificationFrequency.IMMEDIATE)
+            for (user_id, email, frequency) in recipients
+        ])
+        user_ids = [user_id for (user_id, email, frequency) in recipients]
+        User.objects.filter(pk__in=user_ids).update(unread_notification_count=F('unread_notification_count') + 1)
+        NotificationService.invalidate_user_tags(user_ids)
+        emails = [email for (user_id, email, frequency) in recipients if email and frequency == EmailNotificationFrequency.IMMEDIATE]
+        if emails:
+            message = "You have a new notification pending:\n{0}".format(notification_description)
+            NotificationService.send_email(
+                settings.DEFAULT_FROM_EMAIL,
+                emails,
+                f"[{settings.SITE_NAME}] You have a new notification",
+                message,
+            )
+
+    @staticmethod
+    def mark_notifications_as_read(user, notification_ids=None, up_to_id=None):
+        # Marks the given notifications of the user, or all of them up to the
+        # given id, as read with a single UPDATE, and returns how many were
+        # unread. Passing the newest id the user has seen keeps the
+        # notifications that arrived afterwards unread.
+        if notification_ids is not None and not notification_ids:
+            return 0
+        query_set = UserNotification.objects.filter(user=user, is_read=False)
+        if notification_ids is not None:
+            query_set = query_set.filter(id__in=notification_ids)
+        if up_to_id is not None:
+            query_set = query_set.filter(id__lte=up_to_id)
+        with transaction.atomic():
+            read_count = query_set.update(is_read=True)
+            if read_count:
+                User.objects.filter(pk=user.pk).update(unread_notification_count=Greatest(F('unread_notification_count') - read_count, 0))
+        return read_count
+
+    @staticmethod
+    def reconcile_unread_counters():
+        # Returns the number of drifted unread notification counters that
+        # were repaired
+        unread_notifications = UserNotification.objects.filter(is_read=False)
+        return reconcile_counter(User.objects.all(), 'unread_notification_count', count_rows(unread_notifications, 'user'))
 
     @staticmethod
-    def mark_notifications_as_read(user_notification_list):
-        for notification in user_notification_list:
-            notification.is_read = True
-            notification.save()
+    def archive_read_notifications(cutoff_date, batch_size=None, delete=False, after_id=0):
+        # Moves one batch of the read notifications older than the cutoff
+        # date to the archive, or deletes them, and returns its size and the
+        # id of its last notification. Each batch is its own transaction so
+        # that the locks are held briefly, and starts after the id of the
+        # previous one so that the rows already scanned are not read again.
+        batch_size = batch_size or settings.NOTIFICATION_ARCHIVE_BATCH_SIZE
+        with transaction.atomic():
+            batch = list(UserNotification.objects.filter(id__gt=after_id, is_read=True, notification_date__lt=cutoff_date)
+                                                 .order_by('id')
+                                                 .values('id', 'notification_date', 'notification_description', 'source', 'target_id', 'user_id')[:batch_size])
+            if not batch:
+                return (0, after_id)
+            if not delete:
+                ArchivedNotification.objects.bulk_create([
+                    ArchivedNotification(notification_date=row['notification_date'],
+                                         notification_description=row['notification_description'],
+                                         source=row['source'],
+                                         target_id=row['target_id'],
+                                         user_id=row['user_id'])
+                    for row in batch
+                ])
+            UserNotification.objects.filter(id__in=[row['id'] for row in batch]).delete()
+            return (len(batch), batch[-1]['id'])
 
     @staticmethod
     def send_email(from_email, to_email_or_list, subject, message):
+        # Emails are not sent from within the request. They are written to
+        # the outbox using the caller's transaction (so they are discarded if
+        # the operation that generated them is rolled back) and delivered by
+        # the send_notification_emails management command.
         if isinstance(to_email_or_list, str):
             to_email_or_list = [to_email_or_list]
 
+        NotificationEmail.objects.bulk_create([
+            NotificationEmail(from_email=from_email,
+                              to_email=to_email,
+                              subject=subject,
+                              message=message)
+            for to_email in to_email_or_list
+        ])
+
+    @staticmethod
+    def send_notification_digests(frequency):
+        # Users that switched back to immediate emails may still have pending
+        # notifications; they are included in the hourly digests.
+        if frequency == EmailNotificationFrequency.HOURLY:
+            frequencies = [EmailNotificationFrequency.HOURLY, EmailNotificationFrequency.IMMEDIATE]
+        else:
+            frequencies = [frequency]
+        cutoff_date = timezone.now()
+        with transaction.atomic():
+            pending_notifications = UserNotification.objects.filter(email_pending=True,
+                                                                    notification_date__lte=cutoff_date,
+                                                                    user__notification_email_frequency__in=frequencies) \
+                                                            .select_related('user') \
+                                                            .order_by('user', 'notification_date')
+            digest_count = 0
+            emails = []
+            # Only the notifications in the digests are marked as sent, as
+            # the frequency of a user may change while they are built
+            notification_ids = []
+            for user, notifications in groupby(pending_notifications, key=lambda n: n.user):
+                notifications = list(notifications)
+                notification_ids += [notification.id for notification in notifications]
+                digest_count += 1
+                if not user.email:
+                    continue
+                message = render_to_string('marketplace/notification_digest_email.html',
+                                           {'user': user, 'notifications': notifications, 'site_name': settings.SITE_NAME})
+                emails.append(NotificationEmail(from_email=settings.DEFAULT_FROM_EMAIL,
+                                                to_email=user.email,
+                                                subject=f"[{settings.SITE_NAME}] You have {len(notifications)} new notifications",
+                                                message=message))
+            NotificationEmail.objects.bulk_create(emails)
+            UserNotification.objects.filter(id__in=notification_ids).update(email_pending=False)
+            return digest_count
+
+    @staticmethod
+    def get_retry_delay(attempts):
+        return timedelta(seconds=settings.NOTIFICATION_EMAIL_RETRY_DELAY * (2 ** (attempts - 1)))
+
+    @staticmethod
+    def deliver_pending_emails(batch_size=None, max_attempts=None):
+        batch_size = batch_size or settings.NOTIFICATION_EMAIL_BATCH_SIZE
+        max_attempts = max_attempts or settings.NOTIFICATION_EMAIL_MAX_ATTEMPTS
+        with transaction.atomic():
+            # skip_locked lets several workers drain the outbox concurrently
+            # on databases that support it; it is ignored elsewhere.
+            batch = list(NotificationEmail.objects.select_for_update(skip_locked=True)
+                                                  .filter(status=EmailDeliveryStatus.PENDING,
+                                                          next_attempt_date__lte=timezone.now())
+                                                  .order_by('next_attempt_date', 'id')[:batch_size])
+            if not batch:
+                return (0, 0)
+            # The batch is claimed by postponing its next attempt for the
+            # claim timeout, so the emails are not sent inside the transaction
+            # and, if the worker stops before saving their status, they are
+            # retried once the claim expires.
+            claim_date = timezone.now() + timedelta(seconds=settings.NOTIFICATION_EMAIL_CLAIM_TIMEOUT)
+            NotificationEmail.objects.filter(id__in=[email.id for email in batch]).update(next_attempt_date=claim_date)
+
+        sent_count = 0
+        failed_count = 0
+        connection = get_connection(fail_silently=False)
         try:
-            send_mail(
-                subject,
-                message,
-                from_email,
-                to_email_or_list,
-                fail_silently=False,
-            )
-        except (OSError, SMTPException):
-            LOG.exception("send_mail failed [from_email: %r] [to_email: %r]",
-                          from_email, to_email_or_list)
+            connection.open()
+            connection_error = None
+        except (OSError, SMTPException) as exc:
+            LOG.exception("Could not open the email connection")
+            connection_error = exc
+
+        try:
+            for email in batch:
+                now = timezone.now()
+                try:
+                    if connection_error:
+                        raise connection_error
+                    EmailMessage(email.subject,
+                                 email.message,
+                                 email.from_email,
+                                 [email.to_email],
+                                 connection=connection).send()
+                    email.status = EmailDeliveryStatus.SENT
+                    email.sent_date = now
+                    email.last_error = None
+                    sent_count += 1
+                except (OSError, SMTPException) as exc:
+                    LOG.warning("send_mail failed [from_email: %r] [to_email: %r] [attempt: %d]",
+                                email.from_email, email.to_email, email.attempts + 1)
+                    email.last_error = str(exc)[:500]
+                    if email.attempts + 1 >= max_attempts:
+                        email.status = EmailDeliveryStatus.FAILED
+                    else:
+                        email.next_attempt_date = now + NotificationService.get_retry_delay(email.attempts + 1)
+                    failed_count += 1
+                email.attempts += 1
+                # Saved one by one, so the emails already sent are not sent
+                # again if a later one raises
+                email.save(update_fields=['status', 'attempts', 'next_attempt_date', 'sent_date', 'last_error'])
+        finally:
+            if not connection_error:
+                connection.close()
+        return (sent_count, failed_count)
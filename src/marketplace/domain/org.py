@@ -1,7 +1,7 @@
 from itertools import accumulate
 
 from django.db import IntegrityError, transaction
-from django.db.models import Case, Q, When, Count
+from django.db.models import Case, Q, When
 
 from ..models.common import OrgRole, ReviewStatus, SocialCause
 from ..models.org import (
@@ -11,8 +11,11 @@ from ..models.user import (
     User, NotificationSeverity, NotificationSource,
 )
 from ..models.proj import ProjectStatus
+from .cache import cached
+from .featured import FeaturedContentService
 from .notifications import NotificationService
-from .proj import ProjectService
+from .proj import ProjectService, PROJECT_FETCH_PROFILES, apply_fetch_profile
+from .search import ProjectSearchService
 
 from .common import validate_consistent_keys, social_cause_view_model_translation, project_status_view_model_translation, org_type_view_model_translation
 
@@ -53,15 +56,13 @@ class OrganizationService():
         return base_query.order_by('name')
 
     @staticmethod
+    @cached(tags=[(Organization, 'org_pk')], vary_on=['org_pk'])
     def get_organization(request_user, org_pk):
         return Organization.objects.get(pk=org_pk)
 
     @staticmethod
     def get_featured_organization():
-        # Long-term, devise a better way of selecting a featured organization.
-        return Organization.objects.filter(type=OrganizationType.SOCIAL_GOOD) \
-                                .annotate(projectcount=Count('project')) \
-                                .order_by('-projectcount').first()
+        return FeaturedContentService.get_featured('organization')
 
 
     @staticmethod
@@ -70,6 +71,7 @@ class OrganizationService():
         validate_consistent_keys(organization, ('id', orgid))
         if organization.id == orgid:
             organization.save()
+            ProjectSearchService.update_organization_projects(organization)
         else:
             raise ValueError('Request does not match organization')
 
@@ -102,6 +104,7 @@ class OrganizationService():
             admin_role.organization = organization
             admin_role.role = OrgRole.ADMINISTRATOR
             admin_role.save()
+            FeaturedContentService.refresh_picks(['organization'])
             message = "You have created the organization {0} and have been made its administrator user.".format(organization.name)
             NotificationService.add_user_notification(request_user,
                                                         message,
@@ -165,14 +168,15 @@ class OrganizationService():
         return base_query.values('first_name', 'last_name', 'username', 'id').order_by('first_name', 'last_name')[:25]
 
     @staticmethod
-    def get_organization_projects(request_user, org):
+    def get_organization_projects(request_user, org, fetch_profile=None):
         if org.is_volunteer_group():
-            return ProjectService.get_all_organization_member_volunteer_projects(request_user, org)
+            projects = ProjectService.get_all_organization_member_volunteer_projects(request_user, org)
         else:
             if OrganizationService.user_is_organization_member(request_user, org):
-                return ProjectService.get_all_organization_projects(request_user, org)
+                projects = ProjectService.get_all_organization_projects(request_user, org)
             else:
-                return ProjectService.get_organization_public_projects(request_user, org)
+                projects = ProjectService.get_organization_public_projects(request_user, org)
+        return apply_fetch_profile(projects, PROJECT_FETCH_PROFILES, fetch_profile)
 
     @staticmethod
     def create_project(request_user, orgid, project):
@@ -7,63 +7,266 @@ from ..models.proj import (
     Project, ProjectStatus, ProjectRole, ProjRole, ProjectFollower, ProjectLog, ProjectLogType, ProjectLogSource, ProjectDiscussionChannel, ProjectComment,
     ProjectTask, TaskStatus, TaskRole, ProjectTaskRole, ProjectTaskReview, VolunteerApplication,
     ProjectTaskRequirement, TaskRequirementImportance, ProjectScope, PinnedTaskReview,
-    ProjectSocialCause,
+    ProjectSocialCause, ProjectBlueprint,
 )
 from ..models.common import (
     ReviewStatus, TaskType,
 )
 from ..models.user import (
-    User, NotificationSeverity, NotificationSource, VolunteerProfile, Skill, BadgeTier, UserBadge, BadgeType,
+    User, NotificationSeverity, NotificationSource, VolunteerProfile, Skill,
 )
-from django.db.models import Case, When, Count, Q, Subquery, Avg, F
+from django.db.models import Case, When, Count, Q, F, Value, IntegerField, CharField, Prefetch
 
-from .common import validate_consistent_keys, social_cause_view_model_translation, project_status_view_model_translation
+from .common import validate_consistent_keys, diff_rows, apply_row_diff, count_rows, reconcile_counter, social_cause_view_model_translation, project_status_view_model_translation
 from .notifications import NotificationService
+from .matching import MatchingService
+from .search import ProjectSearchService
+from .skills import SkillCatalogService
+from .cache import cached, get_tag, invalidate, invalidate_tags
+from .featured import FeaturedContentService
+from .stats import PlatformStatsService, VolunteerStatsService
 from marketplace.authorization.common import ensure_user_has_permission
 
+ACTIVE_TASK_STAGES = [TaskStatus.STARTED, TaskStatus.WAITING_REVIEW]
+
 def filter_public_projects(query_set):
     return query_set.exclude(status=ProjectStatus.DRAFT) \
                     .exclude(status=ProjectStatus.EXPIRED) \
                     .exclude(status=ProjectStatus.DELETED)
 
+
+def change_project_status(project, status):
+    PlatformStatsService.record_project_status_change(project.status, status)
+    project.status = status
+
+
+def update_volunteer_counters(project_task, delta):
+    # The follower and volunteer counters are only changed with F() updates,
+    # so concurrent changes are not lost. See also reconcile_counters.
+    ProjectTask.objects.filter(pk=project_task.id).update(volunteer_count=F('volunteer_count') + delta)
+    Project.objects.filter(pk=project_task.project_id).update(volunteer_count=F('volunteer_count') + delta)
+    invalidate(ProjectTask, pk=project_task.id)
+    invalidate(Project, pk=project_task.project_id)
+
+# Fetch profiles name the related objects that a page renders for every row,
+# as (select_related fields, prefetch_related lookups), so that the getters
+# load them with a fixed number of queries instead of one per row.
+PROJECT_FETCH_PROFILES = {
+    'list': (['organization'], ['projectsocialcause_set']),
+}
+TASK_FETCH_PROFILES = {
+    'info': ([], [Prefetch('projecttaskrequirement_set', queryset=ProjectTaskRequirement.objects.select_related('skill'))]),
+}
+USER_FETCH_PROFILES = {
+    'display': ([], ['userbadge_set']),
+}
+
+def apply_fetch_profile(query_set, fetch_profiles, fetch_profile):
+    if fetch_profile is None:
+        return query_set
+    if fetch_profile not in fetch_profiles:
+        raise KeyError('Unknown fetch profile: {0}'.format(fetch_profile))
+    select_related, prefetch_related = fetch_profiles[fetch_profile]
+    if select_related:
+        query_set = query_set.select_related(*select_related)
+    if prefetch_related:
+        query_set = query_set.prefetch_related(*prefetch_related)
+    return query_set
+
+
+# Default tasks and discussion channels of a new project, used when the
+# organization has not defined its own ProjectBlueprint
+DEFAULT_PROJECT_BLUEPRINT = {
+    'scope_version_notes': "Initial scope at project creation time.",
+    'tasks': [
+        {
+            'name': 'Project scoping',
+            'short_summary': 'Project scoping task to define the project work.',
+            'description': 'This project is new and needs help being defined. The project scoping includes defining the problem being solved, defining what form the soluntion will take, splitting the work into the necessary tasks, and specifying the expertise needed to complete each task. Project scopers will also review volunteer applications and will QA the work done by volunteers.',
+            'onboarding_instructions': 'Describe in detail the volunteer onboarding instructions for project scoping.',
+            'stage': TaskStatus.NOT_STARTED,
+            'type': TaskType.SCOPING_TASK,
+            'channel_name': "Project scoping",
+            'channel_description': "Discussion channel for the task Project scoping.",
+        },
+        {
+            'name': 'Project management',
+            'short_summary': 'Project management task to ensure the project is successful.',
+            'description': 'This project needs experienced project managers that can ensure the project gets successfully completed on time. Duties include managing the status of all the tasks in the project, ensuring work gets done at the required pace, foreseeing risks to the project and preventing blockers. Project managers will also review volunteer applications and will QA the work done by volunteers.',
+            'onboarding_instructions': 'Describe in detail the volunteer onboarding instructions for project management.',
+            'stage': TaskStatus.DRAFT,
+            'type': TaskType.PROJECT_MANAGEMENT_TASK,
+            'channel_name': "Project management",
+            'channel_description': "Discussion channel for the task Project management.",
+        },
+        {
+            'name': 'Example domain work task',
+            'short_summary': 'Project work description.',
+            'description': 'Domain work tasks represent the tasks that need to be completed to finish the project. ',
+            'onboarding_instructions': 'Describe in detail the volunteer onboarding instructions for this domain work task.',
+            'stage': TaskStatus.DRAFT,
+            'type': TaskType.DOMAIN_WORK_TASK,
+            'channel_name': "Domain work",
+            'channel_description': "Discussion channel for the task Domain work.",
+        },
+        {
+            'name': 'Task and project QA',
+            'short_summary': 'Task for performing QA on the domain tasks.',
+            'description': 'This project needs experienced volunteers to work on ensuring that the tasks that are completed by other volunteers meet the requirements and the expected levels of delivery quality. Duties include reviewing work that volunteers complete, giving constructive feedback, deciding when tasks are ready to be marked as completed, and reviewing the status of the project before the final signoff.',
+            'onboarding_instructions': 'Describe in detail the volunteer onboarding instructions for this QA task.',
+            'stage': TaskStatus.DRAFT,
+            'type': TaskType.QA_TASK,
+            'channel_name': "QA",
+            'channel_description': "Discussion channel for the QA task.",
+        },
+    ],
+    'channels': [
+        {'name': "General discussion", 'description': "Discussion channel for general topics about the project."},
+        {'name': "Technical talk", 'description': "Discussion channel for technical topics that are not specific to a single task."},
+    ],
+}
+BLUEPRINT_TASK_FIELDS = ['name', 'short_summary', 'description', 'onboarding_instructions', 'stage', 'type']
+
+def get_project_blueprint(organization):
+    blueprint = ProjectBlueprint.objects.filter(organization=organization).first()
+    if blueprint is None:
+        return DEFAULT_PROJECT_BLUEPRINT
+    return {
+        'scope_version_notes': blueprint.scope_version_notes,
+        'tasks': list(blueprint.projectblueprinttask_set.values(*BLUEPRINT_TASK_FIELDS, 'channel_name', 'channel_description')),
+        'channels': list(blueprint.projectblueprintchannel_set.values('name', 'description')),
+    }
+
+
+# Bumped every time the domain layer changes project roles, task roles or task
+# stages. Snapshots built under an older generation are discarded, so a
+# snapshot cached on one user instance never outlives a change made through
+# another instance of the same user.
+_role_snapshot_generation = 0
+
+def invalidate_project_role_snapshots():
+    global _role_snapshot_generation
+    _role_snapshot_generation += 1
+
+
+class ProjectRoleSnapshot():
+    """All the roles a user has in a single project, loaded with one query.
+
+    Snapshots are cached on the user object, which Django builds once per
+    request, so the permission predicates evaluated while rendering a page
+    share the same snapshot instead of running one EXISTS query each.
+    """
+
+    def __init__(self, project_roles, task_roles):
+        self.project_roles = frozenset(project_roles)
+        # Tuples of (task id, task type, task stage, task role)
+        self.task_roles = tuple(task_roles)
+
+    @staticmethod
+    def load(user, proj):
+        task_roles = ProjectTaskRole.objects.filter(user=user, task__project=proj) \
+                        .values_list('role', 'task_id', 'task__type', 'task__stage')
+        project_roles = ProjectRole.objects.filter(user=user, project=proj) \
+                        .annotate(no_task=Value(None, output_field=IntegerField()),
+                                  no_type=Value(None, output_field=CharField()),
+                                  no_stage=Value(None, output_field=CharField())) \
+                        .values_list('role', 'no_task', 'no_type', 'no_stage')
+        project_role_list = []
+        task_role_list = []
+        for role, task_id, task_type, task_stage in task_roles.union(project_roles, all=True):
+            if task_id is None:
+                project_role_list.append(role)
+            else:
+                task_role_list.append((task_id, task_type, task_stage, role))
+        return ProjectRoleSnapshot(project_role_list, task_role_list)
+
+    @staticmethod
+    def get(user, proj):
+        projid = getattr(proj, 'id', proj)
+        cache = getattr(user, '_project_role_snapshots', None)
+        if cache is None or cache[0] != _role_snapshot_generation:
+            cache = (_role_snapshot_generation, {})
+            user._project_role_snapshots = cache
+        snapshot = cache[1].get(projid)
+        if snapshot is None:
+            snapshot = ProjectRoleSnapshot.load(user, projid)
+            cache[1][projid] = snapshot
+        return snapshot
+
+    def has_project_role(self, role=None):
+        if role is None:
+            return bool(self.project_roles)
+        return role in self.project_roles
+
+    def has_task_role(self, role=TaskRole.VOLUNTEER, task_types=None, stages=None, task=None):
+        taskid = getattr(task, 'id', task)
+        for task_id, task_type, task_stage, task_role in self.task_roles:
+            if role is not None and task_role != role:
+                continue
+            if task_types is not None and task_type not in task_types:
+                continue
+            if stages is not None and task_stage not in stages:
+                continue
+            if taskid is not None and task_id != taskid:
+                continue
+            return True
+        return False
+
 class ProjectService():
     @staticmethod
+    @cached(tags=[(Project, 'projid')], vary_on=['projid'])
     def get_project(request_user, projid):
-        return Project.objects.filter(pk=projid).annotate(follower_count=Count('projectfollower')).first()
+        return Project.objects.filter(pk=projid).first()
 
     @staticmethod
-    def get_all_public_projects(request_user, search_config=None):
+    def get_all_public_projects(request_user, search_config=None, with_facet_counts=False, fetch_profile=None):
         # We could also add the projects that are non-public but that also belong
         # to the organizations that the user is member of. Should that be added
         # or should users access those projects through the page of their org?
+        # If with_facet_counts is set, the number of matching projects per
+        # social cause and status is returned along with the projects.
         base_query = filter_public_projects(Project.objects.all())
+        search_fields = []
+        social_causes = []
+        project_statuses = []
         if search_config:
+            if 'keywords' in search_config:
+                search_fields.append((None, search_config['keywords']))
             if 'projname' in search_config:
-                base_query = base_query.filter(name__icontains=search_config['projname'])
+                search_fields.append(('name', search_config['projname']))
             if 'orgname' in search_config:
-                base_query = base_query.filter(organization__name__icontains=search_config['orgname'])
+                search_fields.append(('organization', search_config['orgname']))
             if 'skills' in search_config:
-                for skill_fragment in search_config['skills'].split():
-                    base_query = base_query.filter(projecttask__projecttaskrequirement__skill__name__icontains=skill_fragment.strip())
+                search_fields.append(('skills', search_config['skills']))
             if 'social_cause' in search_config:
                 sc = search_config['social_cause']
                 if isinstance(sc, str):
                     sc = [sc]
-                social_causes = []
                 for social_cause_from_view in sc:
                     social_causes.append(social_cause_view_model_translation[social_cause_from_view])
-                # base_query = base_query.filter(project_cause__in=social_causes)
-                base_query = base_query.filter(projectsocialcause__social_cause__in=social_causes).distinct()
             if 'project_status' in search_config:
                 project_status_list = search_config['project_status']
                 if isinstance(project_status_list, str):
                     project_status_list = [project_status_list]
-                project_statuses = []
                 for project_status_from_view in project_status_list:
                     status_filter = project_status_view_model_translation[project_status_from_view]
                     project_statuses.extend(status_filter)
-                base_query = base_query.filter(status__in=project_statuses).distinct()
-        return base_query.distinct().order_by('name')
+        search_results = ProjectSearchService.search_projects(base_query.distinct(), search_fields)
+        if search_results is not None:
+            text_query = search_results
+        else:
+            text_query = base_query.distinct().order_by('name')
+        projects = text_query
+        if social_causes:
+            # base_query = base_query.filter(project_cause__in=social_causes)
+            projects = projects.filter(projectsocialcause__social_cause__in=social_causes).distinct()
+        if project_statuses:
+            projects = projects.filter(status__in=project_statuses).distinct()
+        projects = apply_fetch_profile(projects, PROJECT_FETCH_PROFILES, fetch_profile)
+        if with_facet_counts:
+            facet_counts = ProjectSearchService.get_facet_counts(search_config, text_query, social_causes, project_statuses)
+            return projects, facet_counts
+        return projects
 
 
     @staticmethod
@@ -79,13 +282,7 @@ class ProjectService():
 
     @staticmethod
     def get_featured_project():
-        # Long-term, make a more intelligent selection, choosing for example
-        # the project with best average task review score, the one with the
-        # least deviation from estimates, etc.
-        return filter_public_projects(
-                Project.objects.all() \
-                                .annotate(volunteercount=Count('projecttask__projecttaskrole'))) \
-                                .order_by('-volunteercount').first()
+        return FeaturedContentService.get_featured('project')
 
     @staticmethod
     def get_organization_public_projects(request_user, org):
@@ -93,7 +290,7 @@ class ProjectService():
 
     @staticmethod
     def user_is_project_owner(user, proj):
-        return user.is_authenticated and ProjectRole.objects.filter(project=proj, user=user, role=ProjRole.OWNER).exists()
+        return user.is_authenticated and ProjectRoleSnapshot.get(user, proj).has_project_role(ProjRole.OWNER)
 
     @staticmethod
     def user_is_project_follower(user, proj):
@@ -101,7 +298,7 @@ class ProjectService():
 
     @staticmethod
     def user_is_project_volunteer(user, proj):
-        return user.is_authenticated and ProjectTaskRole.objects.filter(user=user, role=TaskRole.VOLUNTEER, task__project=proj).exists()
+        return user.is_authenticated and ProjectRoleSnapshot.get(user, proj).has_task_role()
 
     @staticmethod
     def user_is_volunteer(user):
@@ -109,15 +306,15 @@ class ProjectService():
 
     @staticmethod
     def user_is_project_scoper(user, proj):
-        return user.is_authenticated and ProjectTaskRole.objects.filter(user=user, role=TaskRole.VOLUNTEER, task__project=proj, task__type=TaskType.SCOPING_TASK, task__stage__in=[TaskStatus.STARTED, TaskStatus.WAITING_REVIEW]).exists()
+        return user.is_authenticated and ProjectRoleSnapshot.get(user, proj).has_task_role(task_types=[TaskType.SCOPING_TASK], stages=ACTIVE_TASK_STAGES)
 
     @staticmethod
     def user_is_project_manager(user, proj):
-        return user.is_authenticated and ProjectTaskRole.objects.filter(user=user, role=TaskRole.VOLUNTEER, task__project=proj, task__type=TaskType.PROJECT_MANAGEMENT_TASK, task__stage__in=[TaskStatus.STARTED, TaskStatus.WAITING_REVIEW]).exists()
+        return user.is_authenticated and ProjectRoleSnapshot.get(user, proj).has_task_role(task_types=[TaskType.PROJECT_MANAGEMENT_TASK], stages=ACTIVE_TASK_STAGES)
 
     @staticmethod
     def user_is_project_reviewer(user, proj):
-        return user.is_authenticated and ProjectTaskRole.objects.filter(user=user, role=TaskRole.VOLUNTEER, task__project=proj, task__type=TaskType.QA_TASK, task__stage__in=[TaskStatus.STARTED, TaskStatus.WAITING_REVIEW]).exists()
+        return user.is_authenticated and ProjectRoleSnapshot.get(user, proj).has_task_role(task_types=[TaskType.QA_TASK], stages=ACTIVE_TASK_STAGES)
 
     @staticmethod
     def user_can_view_project_tasks(user, proj):
@@ -133,7 +330,7 @@ class ProjectService():
 
     @staticmethod
     def user_is_project_volunteer_official(user, proj):
-        return user.is_authenticated and ProjectTaskRole.objects.filter(user=user, role=TaskRole.VOLUNTEER, task__project=proj, task__type__in=[TaskType.SCOPING_TASK, TaskType.PROJECT_MANAGEMENT_TASK], task__stage__in=[TaskStatus.STARTED, TaskStatus.WAITING_REVIEW]).exists()
+        return user.is_authenticated and ProjectRoleSnapshot.get(user, proj).has_task_role(task_types=[TaskType.SCOPING_TASK, TaskType.PROJECT_MANAGEMENT_TASK], stages=ACTIVE_TASK_STAGES)
 
     @staticmethod
     def user_is_task_editor(user, proj):
@@ -145,7 +342,7 @@ class ProjectService():
 
     @staticmethod
     def user_is_project_member(user, proj):
-        return user.is_authenticated and (ProjectRole.objects.filter(project=proj, user=user).exists() or ProjectService.user_is_project_volunteer_official(user, proj))
+        return user.is_authenticated and (ProjectRoleSnapshot.get(user, proj).has_project_role() or ProjectService.user_is_project_volunteer_official(user, proj))
 
     @staticmethod
     def user_is_project_commenter(user, proj):
@@ -165,53 +362,49 @@ class ProjectService():
 
     @staticmethod
     def get_project_officials(request_user, proj):
-        return User.objects.filter(projectrole__project=proj, projectrole__role=ProjRole.OWNER).union(
-            User.objects.filter(projecttaskrole__task__project=proj,
-                                projecttaskrole__role=TaskRole.VOLUNTEER,
-                                projecttaskrole__task__type__in=[TaskType.SCOPING_TASK, TaskType.PROJECT_MANAGEMENT_TASK],
-                                projecttaskrole__task__stage__in=[TaskStatus.STARTED, TaskStatus.WAITING_REVIEW]
-                                )
-        )
+        return User.objects.filter(Q(pk__in=ProjectRole.objects.filter(project=proj, role=ProjRole.OWNER).values('user')) |
+                                   Q(pk__in=ProjectTaskRole.objects.filter(task__project=proj,
+                                                                           role=TaskRole.VOLUNTEER,
+                                                                           task__type__in=[TaskType.SCOPING_TASK, TaskType.PROJECT_MANAGEMENT_TASK],
+                                                                           task__stage__in=ACTIVE_TASK_STAGES
+                                                                           ).values('user')))
 
     @staticmethod
     def get_project_reviewers(request_user, proj):
-        return User.objects.filter(projectrole__project=proj, projectrole__role=ProjRole.OWNER).union(
-            User.objects.filter(projecttaskrole__task__project=proj,
-                                projecttaskrole__role=TaskRole.VOLUNTEER,
-                                projecttaskrole__task__type__in=[TaskType.QA_TASK],
-                                projecttaskrole__task__stage__in=[TaskStatus.STARTED, TaskStatus.WAITING_REVIEW]
-                                )
-        )
+        return User.objects.filter(Q(pk__in=ProjectRole.objects.filter(project=proj, role=ProjRole.OWNER).values('user')) |
+                                   Q(pk__in=ProjectTaskRole.objects.filter(task__project=proj,
+                                                                           role=TaskRole.VOLUNTEER,
+                                                                           task__type__in=[TaskType.QA_TASK],
+                                                                           task__stage__in=ACTIVE_TASK_STAGES
+                                                                           ).values('user')))
 
     @staticmethod
     def get_project_members(request_user, proj):
-        return User.objects.filter(projectrole__project=proj).union(
-            User.objects.filter(projecttaskrole__task__project=proj,
-                                projecttaskrole__role=TaskRole.VOLUNTEER,
-                                projecttaskrole__task__type__in=[TaskType.SCOPING_TASK, TaskType.PROJECT_MANAGEMENT_TASK],
-                                projecttaskrole__task__stage__in=[TaskStatus.STARTED, TaskStatus.WAITING_REVIEW]
-                                )
-        )
+        return User.objects.filter(Q(pk__in=ProjectRole.objects.filter(project=proj).values('user')) |
+                                   Q(pk__in=ProjectTaskRole.objects.filter(task__project=proj,
+                                                                           role=TaskRole.VOLUNTEER,
+                                                                           task__type__in=[TaskType.SCOPING_TASK, TaskType.PROJECT_MANAGEMENT_TASK],
+                                                                           task__stage__in=ACTIVE_TASK_STAGES
+                                                                           ).values('user')))
 
     @staticmethod
     def get_all_project_users(request_user, proj):
-        return User.objects.filter(projectrole__project=proj).union(
-            User.objects.filter(projecttaskrole__task__project=proj,
-                                projecttaskrole__role=TaskRole.VOLUNTEER,
-                                projecttaskrole__task__stage__in=[TaskStatus.STARTED, TaskStatus.WAITING_REVIEW]
-                                )
-        )
+        return User.objects.filter(Q(pk__in=ProjectRole.objects.filter(project=proj).values('user')) |
+                                   Q(pk__in=ProjectTaskRole.objects.filter(task__project=proj,
+                                                                           role=TaskRole.VOLUNTEER,
+                                                                           task__stage__in=ACTIVE_TASK_STAGES
+                                                                           ).values('user')))
 
     @staticmethod
     def get_public_notification_users(request_user, proj):
-        return User.objects.filter(projectrole__project=proj).union(
-            User.objects.filter(projecttaskrole__task__project=proj,
-                                projecttaskrole__role=TaskRole.VOLUNTEER,
-                                projecttaskrole__task__stage__in=[TaskStatus.STARTED, TaskStatus.WAITING_REVIEW]
-                                ).union(
-                                    User.objects.filter(projectfollower__project=proj)
-                                )
-        ).distinct()
+        # Written with IN subqueries instead of joins or UNIONs so each user
+        # appears once and the queryset can still be filtered by the caller.
+        return User.objects.filter(Q(pk__in=ProjectRole.objects.filter(project=proj).values('user')) |
+                                   Q(pk__in=ProjectTaskRole.objects.filter(task__project=proj,
+                                                                           role=TaskRole.VOLUNTEER,
+                                                                           task__stage__in=ACTIVE_TASK_STAGES
+                                                                           ).values('user')) |
+                                   Q(pk__in=ProjectFollower.objects.filter(project=proj).values('user')))
 
     @staticmethod
     def get_project_followers(request_user, proj):
@@ -244,6 +437,8 @@ class ProjectService():
         change.change_target_id = target_id
         change.change_description = description
         change.save()
+        if target_type == ProjectLogSource.STATUS:
+            ProjectSearchService.invalidate_facet_counts()
 
     @staticmethod
     def add_project_comment(request_user, projid, channelid, project_comment):
@@ -259,6 +454,9 @@ class ProjectService():
             project_comment.channel = channel
             try:
                 project_comment.save()
+                # New comments change the tag of their channel for the
+                # requests that wait for them (see domain.live)
+                transaction.on_commit(lambda: invalidate_tags([get_tag(ProjectComment, 'channel', channel.id)]))
                 NotificationService.add_multiuser_notification(ProjectService.get_public_notification_users(request_user, project),
                                                             "New comment added to the discussion channel {0} of project {1}.".format(channel.name, project.name),
                                                             NotificationSeverity.INFO,
@@ -276,6 +474,8 @@ class ProjectService():
             project.organization = organization
             project.status = ProjectStatus.DRAFT
             project.save()
+            PlatformStatsService.record_project_created()
+            ProjectSearchService.update_project(project)
 
             # Create default administrator
             project_admin_role = ProjectRole()
@@ -283,142 +483,69 @@ class ProjectService():
             project_admin_role.project = project
             project_admin_role.role = ProjRole.OWNER
             project_admin_role.save()
+            invalidate_project_role_snapshots()
 
-            # Create project scope
-            project_scope = ProjectScope()
-            project_scope.project = project
-            project_scope.scope_goals = project.scope_goals
-            project_scope.scope_interventions = project.scope_interventions
-            project_scope.scope_available_data = project.scope_available_data
-            project_scope.scope_analysis = project.scope_analysis
-            project_scope.scope_validation_methodology = project.scope_validation_methodology
-            project_scope.scope_implementation = project.scope_implementation
-            project_scope.author = request_user
-            project_scope.version_notes = "Initial scope at project creation time."
-            project_scope.save()
-
-            # Create default tasks
-            scoping_task = ProjectTask()
-            scoping_task.name = 'Project scoping'
-            scoping_task.short_summary = 'Project scoping task to define the project work.'
-            scoping_task.description = 'This project is new and needs help being defined. The project scoping includes defining the problem being solved, defining what form the soluntion will take, splitting the work into the necessary tasks, and specifying the expertise needed to complete each task. Project scopers will also review volunteer applications and will QA the work done by volunteers.'
-            scoping_task.onboarding_instructions = 'Describe in detail the volunteer onboarding instructions for project scoping.'
-            scoping_task.stage = TaskStatus.NOT_STARTED
-            scoping_task.type = TaskType.SCOPING_TASK
-            scoping_task.accepting_volunteers = False
-            scoping_task.project = project
-            scoping_task.percentage_complete = 0
-            scoping_task.business_area = 'no'
-            scoping_task.estimated_start_date = date.today()
-            scoping_task.estimated_end_date = date.today()
-            scoping_task.save()
-
-            project_management_task = ProjectTask()
-            project_management_task.name = 'Project management'
-            project_management_task.short_summary = 'Project management task to ensure the project is successful.'
-            project_management_task.description = 'This project needs experienced project managers that can ensure the project gets successfully completed on time. Duties include managing the status of all the tasks in the project, ensuring work gets done at the required pace, foreseeing risks to the project and preventing blockers. Project managers will also review volunteer applications and will QA the work done by volunteers.'
-            project_management_task.onboarding_instructions = 'Describe in detail the volunteer onboarding instructions for project management.'
-            project_management_task.stage = TaskStatus.DRAFT
-            project_management_task.type = TaskType.PROJECT_MANAGEMENT_TASK
-            project_management_task.accepting_volunteers = False
-            project_management_task.project = project
-            project_management_task.percentage_complete = 0
-            project_management_task.business_area = 'no'
-            project_management_task.estimated_start_date = date.today()
-            project_management_task.estimated_end_date = date.today()
-            project_management_task.save()
-
-            domain_work_task = ProjectTask()
-            domain_work_task.name = 'Example domain work task'
-            domain_work_task.short_summary = 'Project work description.'
-            domain_work_task.description = 'Domain work tasks represent the tasks that need to be completed to finish the project. '
-            domain_work_task.onboarding_instructions = 'Describe in detail the volunteer onboarding instructions for this domain work task.'
-            domain_work_task.stage = TaskStatus.DRAFT
-            domain_work_task.type = TaskType.DOMAIN_WORK_TASK
-            domain_work_task.accepting_volunteers = False
-            domain_work_task.project = project
-            domain_work_task.percentage_complete = 0
-            domain_work_task.business_area = 'no'
-            domain_work_task.estimated_start_date = date.today()
-            domain_work_task.estimated_end_date = date.today()
-            domain_work_task.save()
-
-            qa_task = ProjectTask()
-            qa_task.name = 'Task and project QA'
-            qa_task.short_summary = 'Task for performing QA on the domain tasks.'
-            qa_task.description = 'This project needs experienced volunteers to work on ensuring that the tasks that are completed by other volunteers meet the requirements and the expected levels of delivery quality. Duties include reviewing work that volunteers complete, giving constructive feedback, deciding when tasks are ready to be marked as completed, and reviewing the status of the project before the final signoff.'
-            qa_task.onboarding_instructions = 'Describe in detail the volunteer onboarding instructions for this QA task.'
-            qa_task.stage = TaskStatus.DRAFT
-            qa_task.type = TaskType.QA_TASK
-            qa_task.accepting_volunteers = False
-            qa_task.project = project
-            qa_task.percentage_complete = 0
-            qa_task.business_area = 'no'
-            qa_task.estimated_start_date = date.today()
-            qa_task.estimated_end_date = date.today()
-            qa_task.save()
-
-            # Create default discussion channels
-            general_channel = ProjectDiscussionChannel()
-            general_channel.project = project
-            general_channel.name = "General discussion"
-            general_channel.description = "Discussion channel for general topics about the project."
-            general_channel.save()
-
-            technical_channel = ProjectDiscussionChannel()
-            technical_channel.project = project
-            technical_channel.name = "Technical talk"
-            technical_channel.description = "Discussion channel for technical topics that are not specific to a single task."
-            technical_channel.save()
-
-            project_management_channel = ProjectDiscussionChannel()
-            project_management_channel.project = project
-            project_management_channel.name = "Project management"
-            project_management_channel.related_task = project_management_task
-            project_management_channel.description = "Discussion channel for the task Project management."
-            project_management_channel.save()
-
-            scoping_channel = ProjectDiscussionChannel()
-            scoping_channel.project = project
-            scoping_channel.name = "Project scoping"
-            scoping_channel.related_task = scoping_task
-            scoping_channel.description = "Discussion channel for the task Project scoping."
-            scoping_channel.save()
-
-            domain_work_channel = ProjectDiscussionChannel()
-            domain_work_channel.project = project
-            domain_work_channel.name = "Domain work"
-            domain_work_channel.related_task = domain_work_task
-            domain_work_channel.description = "Discussion channel for the task Domain work."
-            domain_work_channel.save()
-
-            qa_channel = ProjectDiscussionChannel()
-            qa_channel.project = project
-            qa_channel.name = "QA"
-            qa_channel.related_task = qa_task
-            qa_channel.description = "Discussion channel for the QA task."
-            qa_channel.save()
-
+            ProjectService.create_project_from_blueprint(request_user, project, get_project_blueprint(organization))
 
             message = "The project {0} was created by {1} within the organization {2}.".format(project.name, request_user.standard_display_name(), organization.name)
-            NotificationService.add_multiuser_notification(organization_members,
-                                                     message,
-                                                     NotificationSeverity.INFO,
-                                                     NotificationSource.PROJECT,
-                                                     project.id)
-            NotificationService.add_user_notification(request_user,
-                                                     "The project {0} was created successfully and you have been made project administrator. The next step is to define the project scope and to review the three default tasks that were created automatically.".format(project.name),
-                                                     NotificationSeverity.INFO,
-                                                     NotificationSource.PROJECT,
-                                                     project.id)
+            def notify_project_created():
+                NotificationService.add_multiuser_notification(organization_members,
+                                                         message,
+                                                         NotificationSeverity.INFO,
+                                                         NotificationSource.PROJECT,
+                                                         project.id)
+                NotificationService.add_user_notification(request_user,
+                                                         "The project {0} was created successfully and you have been made project administrator. The next step is to define the project scope and to review the three default tasks that were created automatically.".format(project.name),
+                                                         NotificationSeverity.INFO,
+                                                         NotificationSource.PROJECT,
+                                                         project.id)
+            # Notifications (and their emails) are only sent once the
+            # project is committed, and do not hold the transaction open
+            transaction.on_commit(notify_project_created)
 
             return project
 
+    @staticmethod
+    def create_project_from_blueprint(request_user, project, blueprint):
+        project_scope = ProjectScope()
+        project_scope.project = project
+        project_scope.scope_goals = project.scope_goals
+        project_scope.scope_interventions = project.scope_interventions
+        project_scope.scope_available_data = project.scope_available_data
+        project_scope.scope_analysis = project.scope_analysis
+        project_scope.scope_validation_methodology = project.scope_validation_methodology
+        project_scope.scope_implementation = project.scope_implementation
+        project_scope.author = request_user
+        project_scope.version_notes = blueprint['scope_version_notes']
+        project_scope.save()
+
+        tasks = [ProjectTask(project=project,
+                             accepting_volunteers=False,
+                             percentage_complete=0,
+                             business_area='no',
+                             estimated_start_date=date.today(),
+                             estimated_end_date=date.today(),
+                             **{field: task[field] for field in BLUEPRINT_TASK_FIELDS})
+                 for task in blueprint['tasks']]
+        ProjectTask.objects.bulk_create(tasks)
+        if any(task.id is None for task in tasks):
+            # Not all the databases return the ids of bulk created rows, but
+            # they are assigned in insertion order
+            for task, task_id in zip(tasks, ProjectTask.objects.filter(project=project).order_by('id').values_list('id', flat=True)):
+                task.id = task_id
+
+        channels = [ProjectDiscussionChannel(project=project, name=channel['name'], description=channel['description'])
+                    for channel in blueprint['channels']]
+        channels += [ProjectDiscussionChannel(project=project, related_task=task, name=task_blueprint['channel_name'], description=task_blueprint['channel_description'])
+                     for task, task_blueprint in zip(tasks, blueprint['tasks']) if task_blueprint['channel_name']]
+        ProjectDiscussionChannel.objects.bulk_create(channels)
+
     @staticmethod
     def save_project(request_user, projid, project):
         validate_consistent_keys(project, ('id', projid))
         ensure_user_has_permission(request_user, project, 'project.information_edit')
         project.save()
+        ProjectSearchService.update_project(project)
         message = "The project {0} was edited by {1}.".format(project.name, request_user.standard_display_name())
         NotificationService.add_multiuser_notification(ProjectService.get_public_notification_users(request_user, project),
                                                  message,
@@ -445,6 +572,7 @@ class ProjectService():
                 new_sc.social_cause = sc
                 new_sc.project = project
                 new_sc.save()
+        ProjectSearchService.invalidate_facet_counts()
 
     @staticmethod
     def publish_project(request_user, projid, project):
@@ -452,12 +580,13 @@ class ProjectService():
         ensure_user_has_permission(request_user, project, 'project.publish')
         if project.status == ProjectStatus.DRAFT:
             # TODO ensure all the project description fields are filled out, or else raise an error
-            project.status = ProjectStatus.NEW
+            change_project_status(project, ProjectStatus.NEW)
             # When is the start date of a project? When it's published, when
             # volunteers start scoping the project, or when volunteers start
             # working on domain tasks?
             project.actual_start_date = timezone.now()
             project.save()
+            FeaturedContentService.refresh_picks(['project'])
         message = "The project {0} was published by {1} and can now be applied to by volunteers.".format(project.name, request_user.standard_display_name())
         NotificationService.add_multiuser_notification(ProjectService.get_project_members(request_user, project),
                                                  message,
@@ -476,7 +605,7 @@ class ProjectService():
         validate_consistent_keys(project, ('id', projid))
         ensure_user_has_permission(request_user, project, 'project.approve_as_completed')
         if project.status == ProjectStatus.WAITING_REVIEW:
-            project.status = ProjectStatus.COMPLETED
+            change_project_status(project, ProjectStatus.COMPLETED)
             project.actual_end_date = timezone.now()
             project.save()
         message = "The project {0} has been accepted as finished, so all the volunteer work has been completed.".format(project.name)
@@ -501,6 +630,7 @@ class ProjectService():
             try:
                 previous_members = ProjectService.get_project_members(request_user, project)
                 project_role.save()
+                invalidate_project_role_snapshots()
                 message = "New staff member {0} added to the project {1} with role {2}.".format(project_role.user.standard_display_name(), project.name, project_role.get_role_display())
                 NotificationService.add_multiuser_notification(previous_members,
                                                             message,
@@ -533,6 +663,7 @@ class ProjectService():
             len(ProjectService.get_project_owners(request_user, projid)) <= 1:
             raise ValueError('You are trying to remove the last administrator of the project. Please appoint another administrator before removing the current one.')
         project_role.save()
+        invalidate_project_role_snapshots()
         project = project_role.project
         message = "The role of {0} in project {1} has been changed to {2}.".format(project_role.user.standard_display_name(), project.name, project_role.get_role_display())
         NotificationService.add_multiuser_notification(ProjectService.get_project_members(request_user, project),
@@ -559,6 +690,7 @@ class ProjectService():
         if project_role.role == ProjRole.OWNER and len(ProjectService.get_project_owners(request_user, projid)) <= 1:
             raise ValueError('You are trying to remove the last administrator of the project. Please appoint another administrator before removing the current one.')
         project_role.delete()
+        invalidate_project_role_snapshots()
         project = project_role.project
         message = "The user {0} has been removed from the staff of project {1}.".format(project_role.user.standard_display_name(), project.name)
         NotificationService.add_multiuser_notification(ProjectService.get_project_members(request_user, project),
@@ -648,8 +780,9 @@ class ProjectService():
         return ProjectTaskRole.objects.filter(task__project__id=projid).order_by('-task__stage', 'user__first_name')
 
     @staticmethod
-    def get_project_public_volunteer_list(request_user, projid):
-        return User.objects.filter(projecttaskrole__task__project__id=projid).distinct()
+    def get_project_public_volunteer_list(request_user, projid, fetch_profile=None):
+        return apply_fetch_profile(User.objects.filter(projecttaskrole__task__project__id=projid).distinct(),
+                                   USER_FETCH_PROFILES, fetch_profile)
 
     @staticmethod
     def get_all_volunteer_applications(request_user, projid):
@@ -666,13 +799,17 @@ class ProjectService():
             project = Project.objects.get(pk=projid)
             if project:
                 project_follower = ProjectFollower.objects.filter(project=project, user=request_user).first()
-                if project_follower:
-                    project_follower.delete()
-                else:
-                    project_follower = ProjectFollower()
-                    project_follower.project = project
-                    project_follower.user = request_user
-                    project_follower.save()
+                with transaction.atomic():
+                    if project_follower:
+                        project_follower.delete()
+                        Project.objects.filter(pk=project.id).update(follower_count=F('follower_count') - 1)
+                    else:
+                        project_follower = ProjectFollower()
+                        project_follower.project = project
+                        project_follower.user = request_user
+                        project_follower.save()
+                        Project.objects.filter(pk=project.id).update(follower_count=F('follower_count') + 1)
+                    invalidate(Project, pk=project.id)
             else:
                 raise KeyError('Project not found')
 
@@ -712,8 +849,18 @@ class ProjectService():
                                       status=ProjectStatus.DRAFT
                         ).distinct()
 
+    @staticmethod
+    def reconcile_counters():
+        # Returns the number of drifted (project followers, project
+        # volunteers, task volunteers) counters that were repaired
+        volunteer_roles = ProjectTaskRole.objects.filter(role=TaskRole.VOLUNTEER)
+        return (reconcile_counter(Project.objects.all(), 'follower_count', count_rows(ProjectFollower.objects.all(), 'project')),
+                reconcile_counter(Project.objects.all(), 'volunteer_count', count_rows(volunteer_roles, 'task__project')),
+                reconcile_counter(ProjectTask.objects.all(), 'volunteer_count', count_rows(volunteer_roles, 'task')))
+
 class ProjectTaskService():
     @staticmethod
+    @cached(tags=[(ProjectTask, 'taskid')], vary_on=['projid', 'taskid'])
     def get_project_task(request_user, projid, taskid):
         return ProjectTask.objects.get(pk=taskid, project=projid)
 
@@ -728,13 +875,13 @@ class ProjectTaskService():
                                           project=proj).exclude(stage__in=[TaskStatus.COMPLETED, TaskStatus.DRAFT, TaskStatus.DELETED]).order_by('estimated_start_date')
 
     @staticmethod
-    def get_public_tasks(request_user, proj):
+    def get_public_tasks(request_user, proj, fetch_profile=None):
         query_set = ProjectTask.objects.filter(project=proj) \
-                                    .exclude(stage__in=[TaskStatus.DRAFT, TaskStatus.DELETED]) \
-                                    .annotate(volunteer_count=Count('projecttaskrole', filter=Q(projecttaskrole__role=TaskRole.VOLUNTEER), distinct=True))
+                                    .exclude(stage__in=[TaskStatus.DRAFT, TaskStatus.DELETED])
         if not request_user.is_anonymous:
             query_set = query_set.annotate(already_applied=Count('volunteerapplication', filter=Q(volunteerapplication__volunteer=request_user, volunteerapplication__status=ReviewStatus.NEW), distinct=True)) \
                                  .annotate(already_volunteer=Count('projecttaskrole', filter=Q(projecttaskrole__user=request_user, projecttaskrole__role=TaskRole.VOLUNTEER), distinct=True))
+        query_set = apply_fetch_profile(query_set, TASK_FETCH_PROFILES, fetch_profile)
         return query_set.order_by( '-stage','-accepting_volunteers')
 
     @staticmethod
@@ -789,7 +936,7 @@ class ProjectTaskService():
 
     @staticmethod
     def user_is_task_volunteer(user, task):
-        return user.is_authenticated and ProjectTaskRole.objects.filter(user=user, role=TaskRole.VOLUNTEER, task=task).exists()
+        return user.is_authenticated and ProjectRoleSnapshot.get(user, task.project_id).has_task_role(task=task)
 
     @staticmethod
     def user_can_view_task_review(user, task_review):
@@ -805,7 +952,7 @@ class ProjectTaskService():
 
     @staticmethod
     def user_can_review_task(user, task):
-        return ProjectService.user_can_review_project_tasks(user, task.project) and not ProjectTaskRole.objects.filter(user=user, task=task).exists()
+        return ProjectService.user_can_review_project_tasks(user, task.project) and not ProjectRoleSnapshot.get(user, task.project_id).has_task_role(role=None, task=task)
 
     @staticmethod
     def task_has_volunteers(request_user, taskid):
@@ -828,6 +975,7 @@ class ProjectTaskService():
         with transaction.atomic():
             current_task = ProjectTask.objects.get(pk=project_task.id)
             project_task.save()
+            invalidate_project_role_snapshots()
             if project_task.name != current_task.name and project_task.projectdiscussionchannel:
                 channel = project_task.projectdiscussionchannel
                 channel.name = project_task.name
@@ -844,7 +992,7 @@ class ProjectTaskService():
                                 t.accepting_volunteers = True
                                 t.save()
                             # Move the project to status waiting staff
-                            project.status = ProjectStatus.WAITING_STAFF
+                            change_project_status(project, ProjectStatus.WAITING_STAFF)
                             project.save()
                             message = "The status of project {0} has changed to 'Staffing', so users can now apply to volunteer in the project tasks.".format(project.name)
                             NotificationService.add_multiuser_notification(ProjectService.get_public_notification_users(request_user, project),
@@ -861,7 +1009,7 @@ class ProjectTaskService():
                     elif project_task.stage == TaskStatus.WAITING_REVIEW:
                         if project.status == ProjectStatus.DESIGN:
                             # Move the project to status waiting design review
-                            project.status = ProjectStatus.WAITING_DESIGN_APPROVAL
+                            change_project_status(project, ProjectStatus.WAITING_DESIGN_APPROVAL)
                             project.save()
                             message = "The status of project {0} has changed to 'Scoping QA'; the project's staff will review the current scope and determine if it is final and thus the project work can begin, or if the current scope needs further modifications.".format(project.name)
                             NotificationService.add_multiuser_notification(ProjectService.get_public_notification_users(request_user, project),
@@ -882,7 +1030,7 @@ class ProjectTaskService():
                         # Check that there are no more open tasks, then move the project to waiting review stage
                         with_open_tasks = ProjectTask.objects.filter(project=project).exclude(stage=TaskStatus.COMPLETED).exists()
                         if not with_open_tasks:
-                            project.status = ProjectStatus.WAITING_REVIEW
+                            change_project_status(project, ProjectStatus.WAITING_REVIEW)
                             project.save()
                             message = "The status of project {0} has changed to 'Final QA'; the project's work has finished and the staff will now verify if the project can be considered finished or if additional work needs to be completed.".format(project.name)
                             NotificationService.add_multiuser_notification(ProjectService.get_public_notification_users(request_user, project),
@@ -985,8 +1133,11 @@ class ProjectTaskService():
                 channel.related_task = None
                 channel.is_read_only = True
                 channel.save()
+        VolunteerStatsService.mark_stats_pending(User.objects.filter(projecttaskrole__task=project_task))
         project_task.delete()
+        invalidate_project_role_snapshots()
         project = project_task.project
+        ProjectSearchService.update_project(project)
         message = "The task {0} has been deleted from project {1}.".format(project_task.name, project.name)
         NotificationService.add_multiuser_notification(ProjectService.get_project_members(request_user, project),
                                                      message,
@@ -1027,7 +1178,7 @@ class ProjectTaskService():
             channel.save()
 
             if project.status == ProjectStatus.WAITING_REVIEW:
-                project.status = ProjectStatus.IN_PROGRESS
+                change_project_status(project, ProjectStatus.IN_PROGRESS)
                 project.save()
                 message = "The status of project {0} has changed to 'In progress' as the staff determined that the project was not ready to be marked as finished.".format(project.name)
                 NotificationService.add_multiuser_notification(ProjectService.get_public_notification_users(request_user, project),
@@ -1083,138 +1234,11 @@ class ProjectTaskService():
                 project_task.actual_effort_hours = task_review.volunteer_effort_hours
                 project_task.actual_end_date = timezone.now()
                 ProjectTaskService.save_task_internal(request_user, projid, taskid, project_task)
-                for role in project_task.projecttaskrole_set.all():
-                    ProjectTaskService.update_user_task_count(role.user)
-                    ProjectTaskService.update_user_review_score(role.user)
-                    ProjectTaskService.update_user_work_speed(role.user)
+                VolunteerStatsService.recompute_stats(list(project_task.projecttaskrole_set.values_list('user', flat=True)))
             elif task_review.review_result == ReviewStatus.REJECTED and project_task.stage != TaskStatus.COMPLETED:
                 project_task.stage = TaskStatus.STARTED
                 ProjectTaskService.save_task_internal(request_user, projid, taskid, project_task)
-                for role in project_task.projecttaskrole_set.all():
-                    ProjectTaskService.update_user_review_score(role.user)
-
-
-    @staticmethod
-    def update_user_badge(request_user, badge_type, badge_tier, badge_name):
-        if badge_tier is not None:
-            try:
-                current_badge = UserBadge.objects.get(user=request_user, type=badge_type)
-                if current_badge.tier != badge_tier:
-                    is_better_badge = current_badge.tier < badge_tier
-                    current_badge.tier = badge_tier
-                    current_badge.save()
-                    if is_better_badge:
-                        message = "Congratulations! Your award for {0} has increased to {1}. Keep up with the good work!".format(badge_name, current_badge.get_tier_display())
-                    else:
-                        message = "Unfortunately your award for {0} has decreased to {1}.".format(badge_name, current_badge.get_tier_display())
-                    NotificationService.add_user_notification(request_user,
-                                                             message,
-                                                             NotificationSeverity.INFO,
-                                                             NotificationSource.BADGE,
-                                                             current_badge.id)
-            except:
-                new_badge = UserBadge()
-                new_badge.type = badge_type
-                new_badge.tier = badge_tier
-                new_badge.user = request_user
-                new_badge.save()
-                message = "Congratulations! You have been awarded a new badge ({0}) for {1}. Keep up with the good work!".format(new_badge.get_tier_display(), badge_name)
-                NotificationService.add_user_notification(request_user,
-                                                         message,
-                                                         NotificationSeverity.INFO,
-                                                         NotificationSource.BADGE,
-                                                         new_badge.id)
-        else:
-            try:
-                current_badge = UserBadge.objects.get(user=request_user, type=badge_type)
-                current_badge.delete()
-                message = "Unfortunately your award for {0} was removed.".format(badge_name, current_badge.get_tier_display())
-                NotificationService.add_user_notification(request_user,
-                                                         message,
-                                                         NotificationSeverity.INFO,
-                                                         NotificationSource.BADGE,
-                                                         current_badge.id)
-            except:
-                pass
-
-
-    @staticmethod
-    def update_user_task_count(request_user):
-        try:
-            completed_task_count = ProjectTaskRole.objects.filter(task__stage=TaskStatus.COMPLETED, user=request_user).count()
-            try:
-                request_user.volunteerprofile.completed_task_count = completed_task_count
-                request_user.volunteerprofile.save()
-            except:
-                pass
-            badge_tier = None
-            if completed_task_count > 10:
-                badge_tier = BadgeTier.MASTER
-            elif completed_task_count > 5:
-                badge_tier = BadgeTier.ADVANCED
-            elif completed_task_count > 0:
-                badge_tier = BadgeTier.BASIC
-            ProjectTaskService.update_user_badge(request_user, BadgeType.NUMBER_OF_PROJECTS, badge_tier, "completing tasks")
-        except:
-            pass # TODO log this exception
-
-
-    @staticmethod
-    def update_user_review_score(request_user):
-        try:
-            average_review_score = ProjectTaskReview.objects.filter(volunteer=request_user, review_result=ReviewStatus.ACCEPTED).aggregate(Avg('review_score'))['review_score__avg']
-            if average_review_score is not None:
-                try:
-                    request_user.volunteerprofile.average_review_score = average_review_score
-                    request_user.volunteerprofile.save()
-                except:
-                    pass
-                badge_tier = None
-                if average_review_score >= 4:
-                    badge_tier = BadgeTier.MASTER
-                elif average_review_score >= 3:
-                    badge_tier = BadgeTier.ADVANCED
-                elif average_review_score >= 2:
-                    badge_tier = BadgeTier.BASIC
-                ProjectTaskService.update_user_badge(request_user, BadgeType.REVIEW_SCORE, badge_tier, "getting great reviews")
-        except:
-            pass # TODO log this exception
-
-
-    @staticmethod
-    def update_user_work_speed(request_user):
-        try:
-            completed_tasks = ProjectTaskRole.objects.filter(task__stage=TaskStatus.COMPLETED, user=request_user)
-            completed_task_count = completed_tasks.count()
-
-            if completed_task_count > 0:
-                # TODO make this query work instead of iterating over all the tasks
-                # ahead_of_time_count = ProjectTaskRole.objects.filter(task__stage=TaskStatus.COMPLETED, user=request_user, \
-                #                             task__actual_end_date__lt=F('task__estimated_end_date') - F('task__estimated_start_date') + F('task__actual_start_date')).count()
-                ahead_of_time_count = 0
-                for task_role in completed_tasks.all():
-                    task = task_role.task
-                    if task and task.estimated_end_date is not None and task.estimated_start_date is not None \
-                        and task.actual_end_date is not None and task.actual_start_date is not None:
-                        if task.estimated_end_date - task.estimated_start_date > task.actual_end_date - task.actual_start_date:
-                            ahead_of_time_count += 1
-
-                percentage_fast = float(ahead_of_time_count) / float(completed_task_count)
-                try:
-                    request_user.volunteerprofile.ahead_of_time_task_ratio = percentage_fast
-                    request_user.volunteerprofile.save()
-                except:
-                    pass
-                badge_tier = None
-                if percentage_fast >= 0.85:
-                    badge_tier = BadgeTier.MASTER
-                elif percentage_fast >= 0.75:
-                    badge_tier = BadgeTier.ADVANCED
-                elif percentage_fast >= 0.5:
-                    badge_tier = BadgeTier.BASIC
-                ProjectTaskService.update_user_badge(request_user, BadgeType.WORK_SPEED, badge_tier, "being ahead of schedule")
-        except:
-            pass # TODO log this exception
+                VolunteerStatsService.recompute_stats(list(project_task.projecttaskrole_set.values_list('user', flat=True)))
 
 
     @staticmethod
@@ -1279,7 +1303,7 @@ class ProjectTaskService():
         if project_task.type == TaskType.SCOPING_TASK:
             if project.status == ProjectStatus.WAITING_DESIGN_APPROVAL:
                 # Move project to status scoping
-                project.status = ProjectStatus.DESIGN
+                change_project_status(project, ProjectStatus.DESIGN)
                 project.save()
                 message = "The status of project {0} has changed to 'Scoping' as the project's staff determined that the scope needs modifications.".format(project.name)
                 NotificationService.add_multiuser_notification(ProjectService.get_public_notification_users(request_user, project),
@@ -1305,7 +1329,11 @@ class ProjectTaskService():
         else:
             project_task = project_task_role.task
             with transaction.atomic():
+                VolunteerStatsService.mark_stats_pending([project_task_role.user])
                 project_task_role.delete()
+                if project_task_role.role == TaskRole.VOLUNTEER:
+                    update_volunteer_counters(project_task, -1)
+                invalidate_project_role_snapshots()
                 if not ProjectTaskService.task_has_volunteers(request_user, taskid):
                     project_task.stage = TaskStatus.STARTED ## or not started?
                     project_task.accepting_volunteers = True
@@ -1391,14 +1419,16 @@ class ProjectTaskService():
                 task_role.task = project_task
                 task_role.user = volunteer_application.volunteer
                 task_role.save()
+                update_volunteer_counters(project_task, 1)
                 if project_task.stage == TaskStatus.NOT_STARTED:
                     project_task.stage = TaskStatus.STARTED
                     project_task.actual_start_date = timezone.now()
                     project_task.save()
+                invalidate_project_role_snapshots()
                 if project.status == ProjectStatus.NEW:
                     if project_task.type == TaskType.SCOPING_TASK:
                         # Move project to status scoping
-                        project.status = ProjectStatus.DESIGN
+                        change_project_status(project, ProjectStatus.DESIGN)
                         project.save()
                         message = "The status of project {0} has changed to 'Scoping', as new volunteers have been accepted to work on the project scope.".format(project.name)
                         NotificationService.add_multiuser_notification(ProjectService.get_public_notification_users(request_user, project),
@@ -1415,7 +1445,7 @@ class ProjectTaskService():
                 elif project.status == ProjectStatus.WAITING_STAFF:
                     if project_task.type == TaskType.DOMAIN_WORK_TASK:
                         # Move project to status in progress
-                        project.status = ProjectStatus.IN_PROGRESS
+                        change_project_status(project, ProjectStatus.IN_PROGRESS)
                         project.save()
                         message = "The status of project {0} has changed to 'In progress', as volunteers have been accepted to work on the project tasks.".format(project.name)
                         NotificationService.add_multiuser_notification(ProjectService.get_public_notification_users(request_user, project),
@@ -1550,6 +1580,7 @@ class ProjectTaskService():
                                                              NotificationSeverity.WARNING,
                                                              NotificationSource.TASK,
                                                              project_task.id)
+        invalidate_project_role_snapshots()
         message = "The staff assignments for task {0} of project {1} have changed.".format(project_task.name, project.name)
         NotificationService.add_multiuser_notification(ProjectService.get_project_members(request_user, project),
                                                  message,
@@ -1570,15 +1601,11 @@ class ProjectTaskService():
         task_requirement_list = ProjectTaskRequirement.objects.filter(task__id=taskid)
         task_requirement_dict = {}
         for requirement in task_requirement_list:
-            task_requirement_dict[requirement.skill.id] = requirement
+            task_requirement_dict[requirement.skill_id] = requirement
 
-        all_skills = Skill.objects.all()
-        all_areas = Skill.objects.values('area').distinct()
         result_requirements = {}
-        for row in all_areas:
-            result_requirements[row['area']] = []
-        for skill in all_skills:
-            result_requirements[skill.area].append({'system_skill': skill, 'task_requirement': task_requirement_dict.get(skill.id)})
+        for area, skills in SkillCatalogService.get_catalog().areas.items():
+            result_requirements[area] = [{'system_skill': skill, 'task_requirement': task_requirement_dict.get(skill.id)} for skill in skills]
         return result_requirements
 
     @staticmethod
@@ -1589,31 +1616,32 @@ class ProjectTaskService():
         task_requirement_list = ProjectTaskRequirement.objects.filter(task__id=taskid)
         task_requirement_dict = {}
         for requirement in task_requirement_list:
-            task_requirement_dict[requirement.skill.id] = requirement
-
-        all_skills = Skill.objects.all()
-        for skill in all_skills:
-            level_form_value = int(post_object.get(str(skill.id)))
-            if post_object.get("i" + str(skill.id)):
-                importance_form_value = int(post_object.get("i" + str(skill.id)))
+            task_requirement_dict[requirement.skill_id] = requirement
+
+        # The skills are read from the database, as the catalog of the
+        # process may not have the latest ones. Skills added after the form
+        # was rendered are not posted.
+        wanted_requirements = {}
+        posted_skill_ids = set()
+        for skill_id in Skill.objects.order_by('id').values_list('id', flat=True):
+            if post_object.get(str(skill_id)) is None:
+                continue
+            posted_skill_ids.add(skill_id)
+            level_form_value = int(post_object.get(str(skill_id)))
+            if post_object.get("i" + str(skill_id)):
+                importance_form_value = int(post_object.get("i" + str(skill_id)))
             else:
                 importance_form_value = TaskRequirementImportance.NICE_TO_HAVE
-            task_requirement = task_requirement_dict.get(skill.id)
-            if level_form_value == -1:
-                if task_requirement:
-                    task_requirement.delete()
-            else:
-                if task_requirement:
-                    task_requirement.level = level_form_value
-                    task_requirement.importance = importance_form_value
-                else:
-                    task_requirement = ProjectTaskRequirement()
-                    task_requirement.skill = skill
-                    task_requirement.level = level_form_value
-                    task_requirement.importance = importance_form_value
-                    task_requirement.task = project_task
-                task_requirement.save()
+            if level_form_value != -1:
+                wanted_requirements[skill_id] = {'level': level_form_value, 'importance': importance_form_value}
+        new_requirement = lambda skill_id, values: ProjectTaskRequirement(task=project_task, skill_id=skill_id, **values)
+        if not apply_row_diff(ProjectTaskRequirement,
+                              *diff_rows(task_requirement_dict, wanted_requirements, new_requirement, posted_skill_ids),
+                              ['level', 'importance']):
+            return
         project = project_task.project
+        ProjectSearchService.update_project(project)
+        MatchingService.update_task_matches(project_task)
         message = "The requirements for task {0} of project {1} have changed.".format(project_task.name, project.name)
         NotificationService.add_multiuser_notification(ProjectService.get_project_members(request_user, project),
                                                  message,
@@ -1644,7 +1672,13 @@ class ProjectTaskService():
         project_task = project_task_role.task
         if project_task.stage == TaskStatus.COMPLETED:
             raise ValueError('Cannot edit the role of a completed task')
-        project_task_role.save()
+        with transaction.atomic():
+            previous_task = ProjectTask.objects.get(projecttaskrole=project_task_role.id)
+            project_task_role.save()
+            if project_task_role.role == TaskRole.VOLUNTEER and previous_task.id != project_task.id:
+                update_volunteer_counters(previous_task, -1)
+                update_volunteer_counters(project_task, 1)
+        invalidate_project_role_snapshots()
         message = "The volunteer {0} of project {1} has been assigned to the task {2}.".format(project_task_role.user.standard_display_name(), project.name, project_task.name)
         NotificationService.add_multiuser_notification(ProjectService.get_project_members(request_user, project),
                                                     message,
@@ -1671,7 +1705,12 @@ class ProjectTaskService():
         project_task = project_task_role.task
         if project_task.stage == TaskStatus.COMPLETED:
             raise ValueError('Cannot delete the role of a completed task')
-        project_task_role.delete()
+        with transaction.atomic():
+            VolunteerStatsService.mark_stats_pending([project_task_role.user])
+            project_task_role.delete()
+            if project_task_role.role == TaskRole.VOLUNTEER:
+                update_volunteer_counters(project_task, -1)
+        invalidate_project_role_snapshots()
         message = "The volunteer {0} has been removed from task {1} of project {2}.".format(project_task_role.user.standard_display_name(), project_task.name, project.name)
         NotificationService.add_multiuser_notification(ProjectService.get_project_members(request_user, project),
                                                     message,
@@ -1762,6 +1801,7 @@ class ProjectTaskService():
         if project_task.stage == TaskStatus.DRAFT:
             project_task.stage = TaskStatus.NOT_STARTED
             project_task.save()
+            invalidate_project_role_snapshots()
             message = "The project task {0} from project {1} was published by {2}.".format(project_task.name, project.name, request_user.standard_display_name())
             NotificationService.add_multiuser_notification(ProjectService.get_project_members(request_user, project),
                                           message,
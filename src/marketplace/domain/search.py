@@ -0,0 +1,180 @@
+import hashlib
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+from django.db.models.expressions import RawSQL
+
+from ..models.proj import Project, ProjectSearchDocument, ProjectTaskRequirement
+from .common import social_cause_view_model_translation, project_status_view_model_translation
+
+
+PROJECT_SEARCH_FIELDS = ('name', 'summary', 'organization', 'skills')
+POSTGRES_SEARCH_CONFIG = 'english'
+# Must match the weights assigned by the trigger created in migration 0083
+POSTGRES_FIELD_WEIGHTS = {'name': 'A', 'organization': 'B', 'skills': 'C', 'summary': 'D'}
+SQLITE_FTS_TABLE = 'marketplace_project_fts'
+# bm25 column weights, in the same order as PROJECT_SEARCH_FIELDS
+SQLITE_FIELD_WEIGHTS = (10.0, 1.0, 5.0, 2.0)
+
+PROJECT_FACETS_CACHE_PREFIX = 'project_facets'
+# Cached facet counts are keyed by this generation, so bumping it discards
+# all of them at once
+PROJECT_FACETS_GENERATION_KEY = 'project_facets_generation'
+
+_sqlite_fts_available = None
+
+def get_search_backend():
+    global _sqlite_fts_available
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        # The FTS5 table is only created if the SQLite library supports it
+        if _sqlite_fts_available is None:
+            _sqlite_fts_available = SQLITE_FTS_TABLE in connection.introspection.table_names()
+        if _sqlite_fts_available:
+            return 'sqlite'
+    return None
+
+def get_search_terms(text):
+    return re.findall(r'[^\W_]+', text.lower())
+
+def normalize_search_config(search_config):
+    # Builds a canonical representation of a search so that equivalent
+    # searches (different case, punctuation, checkbox order...) share the
+    # same cached facet counts.
+    normalized = []
+    for key, value in sorted((search_config or {}).items()):
+        if key in ('social_cause', 'project_status'):
+            if isinstance(value, str):
+                value = [value]
+            if value:
+                normalized.append((key, tuple(sorted(set(value)))))
+        else:
+            terms = get_search_terms(value)
+            if terms:
+                normalized.append((key, ' '.join(terms)))
+    return tuple(normalized)
+
+
+class ProjectSearchService():
+    @staticmethod
+    def build_project_document(project):
+        skills = ProjectTaskRequirement.objects.filter(task__project=project) \
+                                              .values_list('skill__name', flat=True) \
+                                              .distinct()
+        return {
+            'name': project.name or '',
+            'summary': project.short_summary or '',
+            'organization': project.organization.name if project.organization else '',
+            'skills': ' '.join(sorted(skills)),
+        }
+
+    @staticmethod
+    def update_project(project):
+        ProjectSearchDocument.objects.update_or_create(project_id=project.id,
+                                                       defaults=ProjectSearchService.build_project_document(project))
+        ProjectSearchService.invalidate_facet_counts()
+
+    @staticmethod
+    def update_organization_projects(organization):
+        for project in Project.objects.filter(organization=organization).select_related('organization'):
+            ProjectSearchService.update_project(project)
+
+    @staticmethod
+    def rebuild_index():
+        count = 0
+        for project in Project.objects.all().select_related('organization'):
+            ProjectSearchService.update_project(project)
+            count += 1
+        return count
+
+    @staticmethod
+    def search_projects(query_set, search_fields):
+        # search_fields is a list of (field, text) pairs, where field is one
+        # of PROJECT_SEARCH_FIELDS or None to search all of them. Returns the
+        # matching projects ranked by relevance, or None if there is nothing
+        # to search for.
+        search_terms = []
+        for field, text in search_fields:
+            search_terms.extend([(field, term) for term in get_search_terms(text)])
+        if not search_terms:
+            return None
+
+        backend = get_search_backend()
+        if backend == 'postgresql':
+            raw_query = ' & '.join(['{0}:*{1}'.format(term, POSTGRES_FIELD_WEIGHTS[field] if field else '')
+                                    for field, term in search_terms])
+            search_query = SearchQuery(raw_query, config=POSTGRES_SEARCH_CONFIG, search_type='raw')
+            # ts_rank returns a real; it is cast to double precision so that the
+            # rank survives the round trip through a pagination cursor exactly
+            return query_set.filter(projectsearchdocument__search_vector=search_query) \
+                            .annotate(search_rank=Cast(SearchRank(F('projectsearchdocument__search_vector'), search_query), FloatField())) \
+                            .order_by('-search_rank', 'name')
+        elif backend == 'sqlite':
+            match_query = ' AND '.join(['{0}"{1}"*'.format(field + ' : ' if field else '', term)
+                                        for field, term in search_terms])
+            rank_sql = 'SELECT bm25({0}, {1}) FROM {0} WHERE {0} MATCH %s AND rowid = {2}.{3}'.format(
+                            SQLITE_FTS_TABLE,
+                            ', '.join([str(weight) for weight in SQLITE_FIELD_WEIGHTS]),
+                            Project._meta.db_table,
+                            Project._meta.pk.column)
+            return query_set.annotate(search_rank=RawSQL(rank_sql, (match_query,))) \
+                            .filter(search_rank__isnull=False) \
+                            .order_by('search_rank', 'name')
+        else:
+            text_filter = Q()
+            for field, term in search_terms:
+                if field:
+                    text_filter &= Q(**{'projectsearchdocument__{0}__icontains'.format(field): term})
+                else:
+                    term_filter = Q()
+                    for document_field in PROJECT_SEARCH_FIELDS:
+                        term_filter |= Q(**{'projectsearchdocument__{0}__icontains'.format(document_field): term})
+                    text_filter &= term_filter
+            return query_set.filter(text_filter).order_by('name')
+
+    @staticmethod
+    def count_facets(query_set, social_causes=None, project_statuses=None):
+        # Counts the projects of each social cause and status bucket with a
+        # single aggregate query. As usual for facets, the counts of each
+        # group take into account the filters selected in the other group
+        # but not its own, so they tell how many results a checkbox adds.
+        # The counts are computed on a fresh queryset so that the joins used
+        # by the filters of query_set do not restrict the social causes.
+        cause_filter = Q(projectsocialcause__social_cause__in=social_causes) if social_causes else Q()
+        status_filter = Q(status__in=project_statuses) if project_statuses else Q()
+        aggregates = {}
+        for view_name, social_cause in social_cause_view_model_translation.items():
+            aggregates['social_cause_' + view_name] = Count('id', distinct=True,
+                                                            filter=Q(projectsocialcause__social_cause=social_cause) & status_filter)
+        for view_name, statuses in project_status_view_model_translation.items():
+            aggregates['project_status_' + view_name] = Count('id', distinct=True,
+                                                              filter=Q(status__in=statuses) & cause_filter)
+        counts = Project.objects.filter(pk__in=query_set.order_by().values('pk')).aggregate(**aggregates)
+        return {
+            'social_cause': {view_name: counts['social_cause_' + view_name] for view_name in social_cause_view_model_translation},
+            'project_status': {view_name: counts['project_status_' + view_name] for view_name in project_status_view_model_translation},
+        }
+
+    @staticmethod
+    def get_facet_counts(search_config, query_set, social_causes=None, project_statuses=None):
+        generation = cache.get_or_set(PROJECT_FACETS_GENERATION_KEY, 0, None)
+        config_hash = hashlib.md5(repr(normalize_search_config(search_config)).encode('utf-8')).hexdigest()
+        cache_key = '{0}:{1}:{2}'.format(PROJECT_FACETS_CACHE_PREFIX, generation, config_hash)
+        facet_counts = cache.get(cache_key)
+        if facet_counts is None:
+            facet_counts = ProjectSearchService.count_facets(query_set, social_causes, project_statuses)
+            cache.set(cache_key, facet_counts, settings.PROJECT_FACETS_CACHE_TIMEOUT)
+        return facet_counts
+
+    @staticmethod
+    def invalidate_facet_counts():
+        try:
+            cache.incr(PROJECT_FACETS_GENERATION_KEY)
+        except ValueError:
+            cache.set(PROJECT_FACETS_GENERATION_KEY, 1, None)
@@ -0,0 +1,59 @@
+from types import MappingProxyType
+
+from django.db import connection
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+
+from ..models.user import Skill, SkillCatalogVersion
+from .cache import register_tag
+
+
+# Primary key of the single row with the version of the skill table
+SKILL_CATALOG_VERSION_PK = 1
+
+register_tag(Skill)
+current_catalog = None
+
+
+def increase_catalog_version(sender, **kwargs):
+    # The skill catalog is stamped with a version kept in the database, which
+    # changes whenever a skill is saved or deleted (from the admin, init_skills
+    # or anywhere else), so that every process sees it whatever the cache.
+    if not SkillCatalogVersion.objects.filter(pk=SKILL_CATALOG_VERSION_PK).update(version=F('version') + 1):
+        SkillCatalogVersion.objects.get_or_create(pk=SKILL_CATALOG_VERSION_PK)
+
+post_save.connect(increase_catalog_version, sender=Skill, dispatch_uid='skill-catalog-version')
+post_delete.connect(increase_catalog_version, sender=Skill, dispatch_uid='skill-catalog-version')
+
+
+class SkillCatalog():
+    # Read-only snapshot of the skill table, shared by all the requests of the
+    # process. Skills are listed in id order, grouped by area in the order in
+    # which the areas first appear.
+
+    def __init__(self, skills, version=None):
+        self.version = version
+        self.skills = tuple(skills)
+        self.by_id = MappingProxyType({skill.id: skill for skill in self.skills})
+        self.by_name = MappingProxyType({(skill.area, skill.name): skill for skill in self.skills})
+        areas = {}
+        for skill in self.skills:
+            areas.setdefault(skill.area, []).append(skill)
+        self.areas = MappingProxyType({area: tuple(area_skills) for area, area_skills in areas.items()})
+
+
+class SkillCatalogService():
+
+    @staticmethod
+    def get_catalog():
+        global current_catalog
+        # Inside a transaction the skills may not be committed yet, so the
+        # shared catalog is not used.
+        if connection.in_atomic_block:
+            return SkillCatalog(Skill.objects.order_by('id'))
+        version = SkillCatalogVersion.objects.filter(pk=SKILL_CATALOG_VERSION_PK).values_list('version', flat=True).first()
+        catalog = current_catalog
+        if catalog is None or catalog.version != version:
+            catalog = SkillCatalog(Skill.objects.order_by('id'), version)
+            current_catalog = catalog
+        return catalog
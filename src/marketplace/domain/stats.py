@@ -0,0 +1,312 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from ..models.common import ReviewStatus
+from ..models.news import PlatformCounterType, PlatformStatsCounter
+from ..models.proj import Project, ProjectStatus, ProjectTaskRole, ProjectTaskReview, TaskStatus
+from ..models.user import (
+    User, VolunteerProfile, UserBadge, BadgeType, BadgeTier, NotificationSeverity, NotificationSource,
+    VolunteerLeaderboardEntry,
+)
+from .featured import FeaturedContentService
+from .notifications import NotificationService
+
+
+BADGE_NAMES = {
+    BadgeType.NUMBER_OF_PROJECTS: "completing tasks",
+    BadgeType.REVIEW_SCORE: "getting great reviews",
+    BadgeType.WORK_SPEED: "being ahead of schedule",
+}
+STATS_BATCH_SIZE = 500
+# (board, title, ranking field of the volunteer profile)
+LEADERBOARDS = [
+    (BadgeType.REVIEW_SCORE, 'Best reviewed', 'average_review_score'),
+    (BadgeType.NUMBER_OF_PROJECTS, 'Most completed projects', 'completed_task_count'),
+    (BadgeType.WORK_SPEED, 'Meets deadlines', 'ahead_of_time_task_ratio'),
+]
+LEADERBOARD_SIZE = 10
+PLATFORM_STATS_CACHE_KEY = 'platform-stats'
+PLATFORM_STATS_WINDOW_DAYS = 30
+
+
+def get_task_count_badge_tier(completed_task_count):
+    if completed_task_count > 10:
+        return BadgeTier.MASTER
+    elif completed_task_count > 5:
+        return BadgeTier.ADVANCED
+    elif completed_task_count > 0:
+        return BadgeTier.BASIC
+    return None
+
+def get_review_score_badge_tier(average_review_score):
+    if average_review_score >= 4:
+        return BadgeTier.MASTER
+    elif average_review_score >= 3:
+        return BadgeTier.ADVANCED
+    elif average_review_score >= 2:
+        return BadgeTier.BASIC
+    return None
+
+def get_work_speed_badge_tier(ahead_of_time_task_ratio):
+    if ahead_of_time_task_ratio >= 0.85:
+        return BadgeTier.MASTER
+    elif ahead_of_time_task_ratio >= 0.75:
+        return BadgeTier.ADVANCED
+    elif ahead_of_time_task_ratio >= 0.5:
+        return BadgeTier.BASIC
+    return None
+
+def filter_users(query_set, field, user_ids):
+    if user_ids is None:
+        return query_set
+    return query_set.filter(**{field + '__in': user_ids})
+
+
+class VolunteerStatsService():
+
+    @staticmethod
+    def mark_stats_pending(users):
+        VolunteerProfile.objects.filter(user__in=users).update(stats_pending=True)
+
+    @staticmethod
+    def get_completed_task_counts(user_ids=None):
+        # Returns {user id: (completed tasks, tasks completed ahead of time)}.
+        # A task is ahead of time when it took less than estimated; tasks with
+        # missing dates are counted as completed but not as ahead of time.
+        completed_roles = filter_users(ProjectTaskRole.objects.filter(task__stage=TaskStatus.COMPLETED), 'user', user_ids)
+        rows = completed_roles.annotate(estimated_duration=ExpressionWrapper(F('task__estimated_end_date') - F('task__estimated_start_date'), output_field=DurationField()),
+                                        actual_duration=ExpressionWrapper(F('task__actual_end_date') - F('task__actual_start_date'), output_field=DurationField())) \
+                              .values('user') \
+                              .annotate(completed_count=Count('id'),
+                                        ahead_of_time_count=Count('id', filter=Q(estimated_duration__gt=F('actual_duration')))) \
+                              .values_list('user', 'completed_count', 'ahead_of_time_count') \
+                              .order_by()
+        return {user_id: (completed_count, ahead_of_time_count) for user_id, completed_count, ahead_of_time_count in rows}
+
+    @staticmethod
+    def get_average_review_scores(user_ids=None):
+        accepted_reviews = filter_users(ProjectTaskReview.objects.filter(review_result=ReviewStatus.ACCEPTED), 'volunteer', user_ids)
+        return dict(accepted_reviews.values('volunteer')
+                                    .annotate(average_review_score=Avg('review_score'))
+                                    .values_list('volunteer', 'average_review_score')
+                                    .order_by())
+
+    @staticmethod
+    def recompute_stats(user_ids=None):
+        # Recomputes the profile stats and badges of the given users (or of
+        # everybody) with one grouped aggregate per statistic, and writes only
+        # the rows that changed. Returns (profiles updated, badges changed).
+        task_counts = VolunteerStatsService.get_completed_task_counts(user_ids)
+        review_scores = VolunteerStatsService.get_average_review_scores(user_ids)
+        profiles = {profile.user_id: profile for profile in
+                    filter_users(VolunteerProfile.objects.all(), 'user', user_ids)
+                                .only('id', 'user_id', 'completed_task_count', 'average_review_score', 'ahead_of_time_task_ratio')}
+        badges = {(badge.user_id, badge.type): badge for badge in
+                  filter_users(UserBadge.objects.filter(type__in=BADGE_NAMES.keys()), 'user', user_ids)}
+        if user_ids is None:
+            user_ids = set(profiles.keys()) | set(task_counts.keys()) | set(review_scores.keys()) | set(user_id for user_id, badge_type in badges)
+
+        changed_profiles = []
+        badge_tiers = {}
+        for user_id in user_ids:
+            stats = {}
+            completed_task_count, ahead_of_time_count = task_counts.get(user_id, (0, 0))
+            stats['completed_task_count'] = completed_task_count
+            badge_tiers[(user_id, BadgeType.NUMBER_OF_PROJECTS)] = get_task_count_badge_tier(completed_task_count)
+            # As before, the review and speed stats are left untouched until
+            # the volunteer has an accepted review or a completed task
+            average_review_score = review_scores.get(user_id)
+            if average_review_score is not None:
+                stats['average_review_score'] = average_review_score
+                badge_tiers[(user_id, BadgeType.REVIEW_SCORE)] = get_review_score_badge_tier(average_review_score)
+            if completed_task_count > 0:
+                stats['ahead_of_time_task_ratio'] = float(ahead_of_time_count) / float(completed_task_count)
+                badge_tiers[(user_id, BadgeType.WORK_SPEED)] = get_work_speed_badge_tier(stats['ahead_of_time_task_ratio'])
+            profile = profiles.get(user_id)
+            if profile and any(getattr(profile, field) != value for field, value in stats.items()):
+                for field, value in stats.items():
+                    setattr(profile, field, value)
+                changed_profiles.append(profile)
+
+        new_badges = []
+        updated_badges = []
+        deleted_badges = []
+        notifications = []
+        for (user_id, badge_type), badge_tier in badge_tiers.items():
+            current_badge = badges.get((user_id, badge_type))
+            if current_badge is None:
+                if badge_tier is not None:
+                    new_badge = UserBadge(user_id=user_id, type=badge_type, tier=badge_tier)
+                    new_badges.append(new_badge)
+                    notifications.append((user_id, new_badge, "Congratulations! You have been awarded a new badge ({0}) for {1}. Keep up with the good work!"))
+            elif badge_tier is None:
+                deleted_badges.append(current_badge)
+                notifications.append((user_id, current_badge, "Unfortunately your award for {1} was removed."))
+            elif current_badge.tier != badge_tier:
+                if current_badge.tier < badge_tier:
+                    message = "Congratulations! Your award for {1} has increased to {0}. Keep up with the good work!"
+                else:
+                    message = "Unfortunately your award for {1} has decreased to {0}."
+                current_badge.tier = badge_tier
+                updated_badges.append(current_badge)
+                notifications.append((user_id, current_badge, message))
+
+        with transaction.atomic():
+            VolunteerProfile.objects.bulk_update(changed_profiles, ['completed_task_count', 'average_review_score', 'ahead_of_time_task_ratio'],
+                                                 batch_size=STATS_BATCH_SIZE)
+            UserBadge.objects.bulk_create(new_badges, batch_size=STATS_BATCH_SIZE)
+            UserBadge.objects.bulk_update(updated_badges, ['tier'], batch_size=STATS_BATCH_SIZE)
+            UserBadge.objects.filter(id__in=[badge.id for badge in deleted_badges]).delete()
+            if any(badge.id is None for badge in new_badges):
+                # Not all the databases return the ids of bulk created rows
+                new_badge_ids = dict(((user_id, badge_type), badge_id) for badge_id, user_id, badge_type in
+                                     UserBadge.objects.filter(user__in=set(badge.user_id for badge in new_badges))
+                                                      .values_list('id', 'user', 'type'))
+                for badge in new_badges:
+                    badge.id = new_badge_ids[(badge.user_id, badge.type)]
+            if changed_profiles:
+                VolunteerStatsService.refresh_leaderboards()
+                FeaturedContentService.refresh_picks(['volunteer'])
+            users = User.objects.in_bulk(set(user_id for user_id, badge, message in notifications))
+            for user_id, badge, message in notifications:
+                NotificationService.add_user_notification(users[user_id],
+                                                          message.format(badge.get_tier_display(), BADGE_NAMES[badge.type]),
+                                                          NotificationSeverity.INFO,
+                                                          NotificationSource.BADGE,
+                                                          badge.id)
+        return len(changed_profiles), len(notifications)
+
+    @staticmethod
+    def recompute_pending_stats():
+        # Incremental mode: only the volunteers marked with stats_pending since
+        # the last run are processed. The flags are cleared in the same
+        # transaction, so they are restored if the recomputation fails, and
+        # volunteers marked again while it runs are kept for the next run.
+        with transaction.atomic():
+            pending_profiles = VolunteerProfile.objects.select_for_update().filter(stats_pending=True)
+            user_ids = list(pending_profiles.values_list('user_id', flat=True))
+            if not user_ids:
+                return 0, 0, 0
+            VolunteerProfile.objects.filter(user_id__in=user_ids).update(stats_pending=False)
+            profile_count, badge_count = VolunteerStatsService.recompute_stats(user_ids)
+        return len(user_ids), profile_count, badge_count
+
+    @staticmethod
+    def refresh_leaderboards():
+        # The volunteer list shows the top of each leaderboard from this
+        # table, so the volunteer profiles are only sorted when their stats
+        # or their review status change.
+        entries = []
+        ranked_volunteers = VolunteerProfile.objects.exclude(volunteer_status__in=[ReviewStatus.NEW, ReviewStatus.REJECTED])
+        for board, title, field in LEADERBOARDS:
+            user_ids = ranked_volunteers.order_by(F(field).desc(nulls_last=True), 'user_id') \
+                                        .values_list('user_id', flat=True)[:LEADERBOARD_SIZE]
+            entries.extend(VolunteerLeaderboardEntry(board=board, position=position, user_id=user_id)
+                           for position, user_id in enumerate(user_ids, start=1))
+        try:
+            with transaction.atomic():
+                # Concurrent refreshes wait for each other on the current
+                # entries, so each one replaces the entries of the last
+                list(VolunteerLeaderboardEntry.objects.select_for_update().values_list('id', flat=True))
+                VolunteerLeaderboardEntry.objects.all().delete()
+                VolunteerLeaderboardEntry.objects.bulk_create(entries)
+        except IntegrityError:
+            # The first entries were stored concurrently, when there was
+            # nothing to lock yet; they are as recent as these ones.
+            return 0
+        return len(entries)
+
+    @staticmethod
+    def get_leaderboards():
+        entries = VolunteerLeaderboardEntry.objects.select_related('user').prefetch_related('user__userbadge_set')
+        if not entries:
+            # Never refreshed yet
+            VolunteerStatsService.refresh_leaderboards()
+            entries = entries.all()
+        boards = {}
+        for entry in entries:
+            boards.setdefault(entry.board, []).append(entry.user)
+        return [{'title': title,
+                 'data': boards.get(board, []),
+                 'type': 'review',
+                 'badge': UserBadge(type=board, tier=BadgeTier.MASTER),
+                } for board, title, field in LEADERBOARDS]
+
+
+class PlatformStatsService():
+
+    @staticmethod
+    def increment_counter(counter, delta=1, status=''):
+        day = timezone.localdate()
+        buckets = PlatformStatsCounter.objects.filter(day=day, counter=counter, status=status)
+        if not buckets.update(value=F('value') + delta):
+            try:
+                with transaction.atomic():
+                    PlatformStatsCounter.objects.create(day=day, counter=counter, status=status, value=delta)
+            except IntegrityError:
+                # The bucket of the day was created concurrently
+                buckets.update(value=F('value') + delta)
+
+    @staticmethod
+    def record_project_created():
+        PlatformStatsService.increment_counter(PlatformCounterType.PROJECT_CREATED)
+        PlatformStatsService.increment_counter(PlatformCounterType.PROJECT_STATUS, 1, ProjectStatus.DRAFT)
+
+    @staticmethod
+    def record_project_status_change(old_status, new_status):
+        # The status buckets hold the projects entering minus the projects
+        # leaving each status, so their total is the current project count.
+        if old_status != new_status:
+            PlatformStatsService.increment_counter(PlatformCounterType.PROJECT_STATUS, -1, old_status)
+            PlatformStatsService.increment_counter(PlatformCounterType.PROJECT_STATUS, 1, new_status)
+
+    @staticmethod
+    def record_volunteer_signup():
+        PlatformStatsService.increment_counter(PlatformCounterType.VOLUNTEER_SIGNUP)
+
+    @staticmethod
+    def get_platform_stats():
+        stats = cache.get(PLATFORM_STATS_CACHE_KEY)
+        if stats is None:
+            window_start = timezone.localdate() - timedelta(days=PLATFORM_STATS_WINDOW_DAYS - 1)
+            def total(**filters):
+                return Coalesce(Sum('value', filter=Q(**filters)), 0)
+            stats = PlatformStatsCounter.objects.aggregate(
+                projects_in_design=total(counter=PlatformCounterType.PROJECT_STATUS, status=ProjectStatus.DESIGN),
+                projects_this_month=total(counter=PlatformCounterType.PROJECT_CREATED, day__gte=window_start),
+                volunteers_this_month=total(counter=PlatformCounterType.VOLUNTEER_SIGNUP, day__gte=window_start),
+            )
+            cache.set(PLATFORM_STATS_CACHE_KEY, stats, settings.PLATFORM_STATS_CACHE_TIMEOUT)
+        return stats
+
+    @staticmethod
+    def rebuild_counters():
+        # Recomputes all the buckets from the projects and volunteer profiles,
+        # for counters that drifted (e.g. after deleting projects by hand).
+        # Current project statuses are counted on the project creation day.
+        buckets = {}
+        def add_counts(counter, rows):
+            for day, status, count in rows:
+                buckets[(day, counter, status)] = buckets.get((day, counter, status), 0) + count
+        def count_by_day(query_set, *fields):
+            return query_set.annotate(day=TruncDate('creation_date')) \
+                            .values('day', *fields) \
+                            .annotate(count=Count('id')) \
+                            .values_list('day', *fields, 'count') \
+                            .order_by()
+        add_counts(PlatformCounterType.PROJECT_CREATED, ((day, '', count) for day, count in count_by_day(Project.objects.all())))
+        add_counts(PlatformCounterType.PROJECT_STATUS, count_by_day(Project.objects.all(), 'status'))
+        add_counts(PlatformCounterType.VOLUNTEER_SIGNUP, ((day, '', count) for day, count in count_by_day(VolunteerProfile.objects.all())))
+        with transaction.atomic():
+            PlatformStatsCounter.objects.all().delete()
+            PlatformStatsCounter.objects.bulk_create([PlatformStatsCounter(day=day, counter=counter, status=status, value=value)
+                                                      for (day, counter, status), value in buckets.items()],
+                                                     batch_size=STATS_BATCH_SIZE)
+        cache.delete(PLATFORM_STATS_CACHE_KEY)
+        return len(buckets)
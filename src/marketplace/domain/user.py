@@ -16,7 +16,6 @@ from marketplace.models.user import (
     UserType,
     VolunteerProfile,
     VolunteerSkill,
-    UserBadge,
     BadgeType,
     BadgeTier,
     Skill,
@@ -27,10 +26,20 @@ from marketplace.models.user import (
     UserTaskPreference,
 )
 
-from .common import validate_consistent_keys, award_view_model_translation, task_preferences_model_translation
+from .common import validate_consistent_keys, diff_rows, apply_row_diff, award_view_model_translation, task_preferences_model_translation
 from .org import OrganizationService
-from .proj import ProjectService
+from .proj import ProjectService, apply_fetch_profile
+from .matching import MatchingService
+from .cache import cached, invalidate
+from .featured import FeaturedContentService, get_featured_candidates
 from .notifications import NotificationService
+from .skills import SkillCatalogService
+from .stats import PlatformStatsService, VolunteerStatsService
+
+
+VOLUNTEER_PROFILE_FETCH_PROFILES = {
+    'list': (['user'], ['user__userbadge_set']),
+}
 
 
 # Namespace declaration #
@@ -174,6 +183,7 @@ def ensure_profile(self, user):
 
     if not created:
         return volunteer_profile
+    PlatformStatsService.record_volunteer_signup()
 
     if (
         settings.AUTOMATICALLY_ACCEPT_VOLUNTEERS or
@@ -211,7 +221,7 @@ def ensure_profile(self, user):
 class UserService():
 
     @staticmethod
-    def get_all_approved_volunteer_profiles(request_user, search_config=None):
+    def get_all_approved_volunteer_profiles(request_user, search_config=None, fetch_profile=None):
         base_query = VolunteerProfile.objects.filter(volunteer_status=ReviewStatus.ACCEPTED)
         if search_config:
             if 'username' in search_config:
@@ -238,6 +248,7 @@ class UserService():
             #     for project_status_from_view in project_status_list:
             #         project_statuses.append(project_status_view_model_translation[project_status_from_view])
             #     base_query = base_query.filter(status__in=project_statuses).distinct()
+        base_query = apply_fetch_profile(base_query, VOLUNTEER_PROFILE_FETCH_PROFILES, fetch_profile)
         return base_query.distinct().order_by('user__first_name', 'user__last_name')
 
 
@@ -247,10 +258,8 @@ class UserService():
 
     @staticmethod
     def get_featured_volunteer():
-        return VolunteerProfile.objects.filter(volunteer_status=ReviewStatus.ACCEPTED) \
-            .annotate(taskcount=Count('user__projecttaskrole')) \
-            .order_by('-average_review_score', '-taskcount') \
-            .first()
+        return FeaturedContentService.get_featured('volunteer',
+            get_featured_candidates('volunteer').select_related('user').annotate(taskcount=Count('user__projecttaskrole')))
 
     @staticmethod
     def save_user(request_user, user_pk, user):
@@ -277,6 +286,8 @@ class UserService():
                     NotificationSeverity.INFO,
                     NotificationSource.VOLUNTEER_APPLICATION,
                     volunteer_profile.id)
+            VolunteerStatsService.refresh_leaderboards()
+            FeaturedContentService.refresh_picks(['volunteer'])
         else:
             raise KeyError("Volunteer profile not found.")
 
@@ -293,6 +304,8 @@ class UserService():
                     NotificationSeverity.INFO,
                     NotificationSource.VOLUNTEER_APPLICATION,
                     volunteer_profile.id)
+            VolunteerStatsService.refresh_leaderboards()
+            FeaturedContentService.refresh_picks(['volunteer'])
         else:
             raise KeyError("Volunteer profile not found.")
 
@@ -301,19 +314,16 @@ class UserService():
         return SkillLevel.get_choices()
 
     @staticmethod
+    @cached(tags=[(VolunteerSkill, 'user_pk', 'user'), Skill], vary_on=['user_pk'])
     def get_volunteer_skills(request_user, user_pk):
         volunteer_skill_list = VolunteerSkill.objects.filter(user__id=user_pk)
         volunteer_skill_dict = {}
         for skill in volunteer_skill_list:
-            volunteer_skill_dict[skill.skill.id] = skill
+            volunteer_skill_dict[skill.skill_id] = skill
 
-        all_skills = Skill.objects.all()
-        all_areas = Skill.objects.values('area').distinct()
         result_skills = {}
-        for row in all_areas:
-            result_skills[row['area']] = []
-        for skill in all_skills:
-            result_skills[skill.area].append({'system_skill': skill, 'volunteer_skill': volunteer_skill_dict.get(skill.id)})
+        for area, skills in SkillCatalogService.get_catalog().areas.items():
+            result_skills[area] = [{'system_skill': skill, 'volunteer_skill': volunteer_skill_dict.get(skill.id)} for skill in skills]
         return result_skills
 
     @staticmethod
@@ -323,24 +333,24 @@ class UserService():
         volunteer_skill_list = VolunteerSkill.objects.filter(user__id=user_pk)
         volunteer_skill_dict = {}
         for skill in volunteer_skill_list:
-            volunteer_skill_dict[skill.skill.id] = skill
-
-        all_skills = Skill.objects.all()
-        for skill in all_skills:
-            form_value = int(post_object.get(str(skill.id)))
-            volunteer_value = volunteer_skill_dict.get(skill.id)
-            if form_value == -1:
-                if volunteer_value:
-                    volunteer_value.delete()
-            else:
-                if volunteer_value:
-                    volunteer_value.level = form_value
-                else:
-                    volunteer_value = VolunteerSkill()
-                    volunteer_value.skill = skill
-                    volunteer_value.level = form_value
-                    volunteer_value.user = target_user
-                volunteer_value.save()
+            volunteer_skill_dict[skill.skill_id] = skill
+
+        # The skills are read from the database, as the catalog of the
+        # process may not have the latest ones. Skills added after the form
+        # was rendered are not posted.
+        wanted_skills = {}
+        posted_skill_ids = set()
+        for skill_id in Skill.objects.order_by('id').values_list('id', flat=True):
+            if post_object.get(str(skill_id)) is None:
+                continue
+            posted_skill_ids.add(skill_id)
+            form_value = int(post_object.get(str(skill_id)))
+            if form_value != -1:
+                wanted_skills[skill_id] = {'level': form_value}
+        new_skill = lambda skill_id, values: VolunteerSkill(user=target_user, skill_id=skill_id, **values)
+        if apply_row_diff(VolunteerSkill, *diff_rows(volunteer_skill_dict, wanted_skills, new_skill, posted_skill_ids), ['level']):
+            invalidate(VolunteerSkill, user=target_user.id)
+            MatchingService.update_volunteer_matches(target_user)
 
     @staticmethod
     def user_has_skills(request_user):
@@ -392,24 +402,4 @@ class UserService():
 
     @staticmethod
     def get_volunteer_leaderboards(request_user):
-        return [{'title': 'Best reviewed',
-                 'data': User.objects.exclude(volunteerprofile__isnull=True) \
-                                     .exclude(volunteerprofile__volunteer_status__in=[ReviewStatus.NEW, ReviewStatus.REJECTED]) \
-                                     .order_by('-volunteerprofile__average_review_score')[0:10],
-                 'type': 'review',
-                 'badge': UserBadge(type=BadgeType.REVIEW_SCORE, tier=BadgeTier.MASTER),
-                },
-                {'title': 'Most completed projects',
-                 'data': User.objects.exclude(volunteerprofile__isnull=True) \
-                                     .exclude(volunteerprofile__volunteer_status__in=[ReviewStatus.NEW, ReviewStatus.REJECTED]) \
-                                     .order_by('-volunteerprofile__completed_task_count')[0:10],
-                 'type': 'review',
-                 'badge':  UserBadge(type=BadgeType.NUMBER_OF_PROJECTS, tier=BadgeTier.MASTER),
-                },
-                {'title': 'Meets deadlines',
-                 'data': User.objects.exclude(volunteerprofile__isnull=True) \
-                                     .exclude(volunteerprofile__volunteer_status__in=[ReviewStatus.NEW, ReviewStatus.REJECTED]) \
-                                     .order_by('-volunteerprofile__ahead_of_time_task_ratio')[0:10],
-                 'type': 'review',
-                 'badge': UserBadge(type=BadgeType.WORK_SPEED, tier=BadgeTier.MASTER),
-                }, ]
+        return VolunteerStatsService.get_leaderboards()
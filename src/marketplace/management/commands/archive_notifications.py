@@ -0,0 +1,38 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from marketplace.domain.notifications import NotificationService
+
+
+class Command(BaseCommand):
+
+    help = 'Moves the read notifications older than the retention period to the archive, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+                            help='Number of days read notifications are kept')
+        parser.add_argument('--batch-size', type=int, default=settings.NOTIFICATION_ARCHIVE_BATCH_SIZE,
+                            help='Number of notifications moved in a single transaction')
+        parser.add_argument('--delete', action='store_true',
+                            help='Delete the notifications instead of archiving them')
+
+    def handle(self, **options):
+        cutoff_date = timezone.now() - timedelta(days=options['days'])
+        action = 'Deleted' if options['delete'] else 'Archived'
+        total_count = 0
+        last_id = 0
+        start = time.perf_counter()
+        while True:
+            count, last_id = NotificationService.archive_read_notifications(cutoff_date, options['batch_size'], options['delete'], last_id)
+            if not count:
+                break
+            total_count += count
+            elapsed = time.perf_counter() - start
+            self.stdout.write('{0} {1} notifications ({2:.0f} rows/s)'.format(action, total_count, total_count / elapsed))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS('{0} {1} read notifications from before {2:%Y-%m-%d} in {3:.1f}s ({4:.0f} rows/s).'.format(
+            action, total_count, cutoff_date, elapsed, total_count / elapsed if elapsed else 0)))
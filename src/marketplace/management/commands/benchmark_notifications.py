@@ -0,0 +1,52 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from marketplace.domain.notifications import NotificationService
+from marketplace.models.user import User, NotificationSeverity, NotificationSource
+
+
+class Command(BaseCommand):
+
+    help = ('Measures the time it takes to notify a group of users, one by one and in bulk. Both use the email outbox, '
+            'so the one by one time is not the time of the former per-user email sending. All the data is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000],
+                            help='Numbers of recipients to benchmark')
+
+    def notify_one_by_one(self, users):
+        for user in users:
+            NotificationService.add_user_notification(user, "Benchmark notification", NotificationSeverity.INFO, NotificationSource.GENERIC, None)
+
+    def notify_in_bulk(self, users):
+        NotificationService.add_multiuser_notification(users, "Benchmark notification", NotificationSeverity.INFO, NotificationSource.GENERIC, None)
+
+    def measure(self, operation, users):
+        with transaction.atomic():
+            start = time.perf_counter()
+            operation(users)
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed
+
+    def handle(self, **options):
+        self.stdout.write('{0:>10} {1:>14} {2:>14} {3:>8}'.format('Recipients', 'One by one (s)', 'Bulk (s)', 'Speedup'))
+        for size in options['sizes']:
+            # The prefix is unique so that existing users are neither
+            # notified nor clashing with the benchmark ones
+            prefix = 'benchmark-{0}-'.format(uuid.uuid4().hex)
+            with transaction.atomic():
+                User.objects.bulk_create([
+                    User(username='{0}{1}'.format(prefix, i), email='{0}{1}@example.com'.format(prefix, i), first_name='Benchmark', last_name=str(i))
+                    for i in range(size)
+                ])
+                users = User.objects.filter(username__startswith=prefix)
+                before = self.measure(self.notify_one_by_one, list(users))
+                after = self.measure(self.notify_in_bulk, users)
+                transaction.set_rollback(True)
+            self.stdout.write('{0:>10} {1:>14.4f} {2:>14.4f} {3:>7.1f}x'.format(size, before, after, before / after))
+        self.stdout.write('Both notify through the email outbox: the one by one column is not the former path, which sent every email synchronously.')
+        self.stdout.write(self.style.SUCCESS('Finished benchmark.'))
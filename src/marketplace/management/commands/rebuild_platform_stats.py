@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.domain.stats import PlatformStatsService
+
+
+class Command(BaseCommand):
+
+    help = 'Rebuilds the daily platform stats counters shown in the home page'
+
+    def handle(self, **options):
+        count = PlatformStatsService.rebuild_counters()
+        self.stdout.write(self.style.SUCCESS('Stored {0} platform stats buckets.'.format(count)))
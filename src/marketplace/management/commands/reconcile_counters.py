@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.domain.notifications import NotificationService
+from marketplace.domain.proj import ProjectService
+
+
+class Command(BaseCommand):
+
+    help = 'Repairs the follower and volunteer counters of the projects and tasks, and the unread notification counters of the users, that drifted from the actual counts'
+
+    def handle(self, **options):
+        follower_count, project_volunteer_count, task_volunteer_count = ProjectService.reconcile_counters()
+        unread_count = NotificationService.reconcile_unread_counters()
+        self.stdout.write(self.style.SUCCESS('Repaired {0} project follower counters, {1} project volunteer counters, {2} task volunteer counters and {3} unread notification counters.'.format(
+            follower_count, project_volunteer_count, task_volunteer_count, unread_count)))
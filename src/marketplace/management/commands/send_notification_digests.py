@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.domain.notifications import NotificationService
+from marketplace.models.user import EmailNotificationFrequency
+
+
+class Command(BaseCommand):
+
+    help = 'Queues the notification digest emails of the users who chose hourly or daily digests. Schedule it to run every hour and every day.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('frequency', choices=['hourly', 'daily'])
+
+    def handle(self, **options):
+        if options['frequency'] == 'hourly':
+            frequency = EmailNotificationFrequency.HOURLY
+        else:
+            frequency = EmailNotificationFrequency.DAILY
+        digest_count = NotificationService.send_notification_digests(frequency)
+        self.stdout.write(self.style.SUCCESS('Queued {0} {1} notification digests.'.format(digest_count, options['frequency'])))
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from marketplace.domain.notifications import NotificationService
+
+
+class Command(BaseCommand):
+
+    help = 'Delivers the notification emails queued in the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.NOTIFICATION_EMAIL_BATCH_SIZE,
+                            help='Number of emails sent over a single connection')
+        parser.add_argument('--max-attempts', type=int, default=settings.NOTIFICATION_EMAIL_MAX_ATTEMPTS,
+                            help='Number of attempts before an email is marked as failed')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the outbox instead of exiting when it is empty')
+        parser.add_argument('--interval', type=int, default=settings.NOTIFICATION_EMAIL_POLL_INTERVAL,
+                            help='Seconds to wait between polls when the outbox is empty')
+
+    def handle(self, **options):
+        total_sent = 0
+        total_failed = 0
+        while True:
+            (sent, failed) = NotificationService.deliver_pending_emails(options['batch_size'], options['max_attempts'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write('Sent {0} emails, {1} failed'.format(sent, failed))
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        if total_failed:
+            self.stdout.write(self.style.WARNING('Finished delivering emails: {0} sent, {1} failed.'.format(total_sent, total_failed)))
+        else:
+            self.stdout.write(self.style.SUCCESS('Finished delivering emails: {0} sent.'.format(total_sent)))
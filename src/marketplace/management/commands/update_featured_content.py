@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.domain.featured import FeaturedContentService
+
+
+class Command(BaseCommand):
+
+    help = 'Recomputes the featured project, organization and volunteer shown in the home page'
+
+    def handle(self, **options):
+        picks = FeaturedContentService.refresh_picks()
+        self.stdout.write(self.style.SUCCESS('Featured content updated: project {project_id}, organization {organization_id}, volunteer {volunteer_id}.'.format(**picks)))
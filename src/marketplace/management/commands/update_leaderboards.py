@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.domain.stats import VolunteerStatsService
+
+
+class Command(BaseCommand):
+
+    help = 'Rebuilds the volunteer leaderboards shown in the volunteer list'
+
+    def handle(self, **options):
+        count = VolunteerStatsService.refresh_leaderboards()
+        self.stdout.write(self.style.SUCCESS('Stored {0} leaderboard entries.'.format(count)))
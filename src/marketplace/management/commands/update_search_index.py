@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.domain.search import ProjectSearchService
+
+
+class Command(BaseCommand):
+
+    help = 'Rebuilds the full-text search documents of all the projects'
+
+    def handle(self, **options):
+        count = ProjectSearchService.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Updated the search documents of {0} projects.'.format(count)))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.domain.matching import MatchingService
+
+
+class Command(BaseCommand):
+
+    help = 'Recomputes the skill match scores between all the volunteers and all the open tasks'
+
+    def handle(self, **options):
+        count = MatchingService.rebuild_matches()
+        self.stdout.write(self.style.SUCCESS('Stored {0} volunteer-task matches.'.format(count)))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.domain.stats import VolunteerStatsService
+
+
+class Command(BaseCommand):
+
+    help = 'Recomputes the profile stats and badges of the volunteers whose tasks changed since the last run, or of all the volunteers with --all'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute the stats of all the volunteers')
+
+    def handle(self, **options):
+        if options['all']:
+            profile_count, badge_count = VolunteerStatsService.recompute_stats()
+            self.stdout.write(self.style.SUCCESS('Updated {0} volunteer profiles and {1} badges.'.format(profile_count, badge_count)))
+        else:
+            user_count, profile_count, badge_count = VolunteerStatsService.recompute_pending_stats()
+            self.stdout.write(self.style.SUCCESS('Processed {0} pending volunteers: updated {1} volunteer profiles and {2} badges.'.format(user_count, profile_count, badge_count)))
@@ -1,6 +1,19 @@
+import hashlib
+import logging
+import re
+import sys
+import time
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.db import connection
+
 from marketplace import utils
 
 
+LOG = logging.getLogger(__name__)
+
+
 class UserTypeMiddleware:
 
     selector_url_name = 'marketplace:user_type_select'
@@ -23,3 +36,131 @@ class UserTypeMiddleware:
                     self.selector_url_name,
                     params={'next': request.get_full_path()},
                 )
+
+
+def query_budget(max_queries):
+    """Declares the maximum number of queries a function view may run."""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def get_view_query_budget(view_func):
+    # Function views are decorated with query_budget, class based views set a
+    # query_budget class attribute.
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        budget = getattr(getattr(view_func, 'view_class', None), 'query_budget', None)
+    return budget
+
+
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+SQL_LISTS = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+
+def get_query_fingerprint(sql):
+    # Queries that only differ in their parameters share the same fingerprint
+    normalized = SQL_LISTS.sub('(?)', SQL_LITERALS.sub('?', sql.replace('%s', '?')))
+    return hashlib.md5(' '.join(normalized.split()).encode('utf-8')).hexdigest()[:12]
+
+
+def get_query_origin():
+    # The innermost domain function that ran the query, or else the innermost
+    # template being rendered, or else the innermost function of the app
+    origin = None
+    template_name = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module.startswith('marketplace.domain.'):
+            return '{0}.{1}'.format(module, frame.f_code.co_name)
+        elif module == 'django.template.base' and frame.f_code.co_name == 'render' and template_name is None:
+            template = frame.f_locals.get('self')
+            template_name = getattr(getattr(template, 'origin', None), 'template_name', None)
+        elif module.startswith('marketplace.') and not module.startswith('marketplace.tests.') and module != __name__ and origin is None:
+            origin = '{0}.{1}'.format(module, frame.f_code.co_name)
+        frame = frame.f_back
+    if template_name:
+        return 'template ' + template_name
+    return origin or 'django'
+
+
+QueryRecord = namedtuple('QueryRecord', ['fingerprint', 'duration', 'origin', 'sql'])
+
+
+class QueryReport():
+
+    def __init__(self):
+        self.queries = []
+        self.budget = None
+        self.view_name = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(QueryRecord(get_query_fingerprint(sql), time.perf_counter() - start, get_query_origin(), sql))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(query.duration for query in self.queries)
+
+    def is_over_budget(self):
+        return self.budget is not None and self.count > self.budget
+
+    def get_repeated_queries(self, threshold=None):
+        # Fingerprints run at least threshold times are N+1 suspects.
+        # Returns [(fingerprint, times, origin, sql)], most repeated first.
+        if threshold is None:
+            threshold = settings.QUERY_REPEAT_THRESHOLD
+        counts = Counter(query.fingerprint for query in self.queries)
+        first_queries = {}
+        for query in self.queries:
+            first_queries.setdefault(query.fingerprint, query)
+        return [(fingerprint, times, first_queries[fingerprint].origin, first_queries[fingerprint].sql)
+                for fingerprint, times in counts.most_common() if times >= threshold]
+
+    def get_summary(self):
+        summary = 'count={0} time={1:.1f}ms repeated={2}'.format(self.count, self.total_time * 1000, len(self.get_repeated_queries()))
+        if self.budget is not None:
+            summary += ' budget={0}'.format(self.budget)
+        return summary
+
+
+class QueryInspectionMiddleware:
+    """Records the queries run by every request when QUERY_INSPECTION_ENABLED
+    is set, and reports them in the X-Query-Stats response header and in a log
+    line that flags the requests over their view's budget or with repeated
+    queries (N+1 suspects)."""
+
+    def __init__(self, next_handler):
+        self.next_handler = next_handler
+
+    def __call__(self, request):
+        if not settings.QUERY_INSPECTION_ENABLED:
+            return self.next_handler(request)
+        report = QueryReport()
+        request.query_report = report
+        with connection.execute_wrapper(report):
+            response = self.next_handler(request)
+        response['X-Query-Stats'] = report.get_summary()
+        response.query_report = report
+        repeated_queries = report.get_repeated_queries()
+        if report.is_over_budget() or repeated_queries:
+            LOG.warning("Query budget [view: %s] [path: %s] %s%s", report.view_name, request.path, report.get_summary(),
+                        ''.join(' [repeated: {0} x{1} from {2}]'.format(fingerprint, times, origin)
+                                for fingerprint, times, origin, sql in repeated_queries))
+        else:
+            LOG.info("Query budget [view: %s] [path: %s] %s", report.view_name, request.path, report.get_summary())
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        report = getattr(request, 'query_report', None)
+        if report is not None:
+            report.budget = get_view_query_budget(view_func)
+            report.view_name = request.resolver_match.view_name if request.resolver_match else view_func.__name__
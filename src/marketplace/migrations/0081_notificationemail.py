@@ -0,0 +1,34 @@
+# Generated by Django 2.2.1 on 2026-10-18 17:35
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0080_auto_20181025_1422'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creation_date', models.DateTimeField(auto_now_add=True)),
+                ('from_email', models.CharField(max_length=254)),
+                ('to_email', models.CharField(max_length=254)),
+                ('subject', models.CharField(max_length=300)),
+                ('message', models.TextField()),
+                ('status', models.IntegerField(choices=[(0, 'Pending'), (1, 'Sent'), (2, 'Failed')], default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sent_date', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.CharField(blank=True, max_length=500, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notificationemail',
+            index=models.Index(fields=['status', 'next_attempt_date'], name='marketplace_status_b4e047_idx'),
+        ),
+    ]
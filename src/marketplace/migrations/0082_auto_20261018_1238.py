@@ -0,0 +1,23 @@
+# Generated by Django 2.2.1 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0081_notificationemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='notification_email_frequency',
+            field=models.IntegerField(choices=[(0, 'Send an email for every notification'), (1, 'Send an hourly digest'), (2, 'Send a daily digest')], default=0, help_text='Choose how often you want to receive emails about your notifications.', verbose_name='Email notifications'),
+        ),
+        migrations.AddField(
+            model_name='usernotification',
+            name='email_pending',
+            field=models.BooleanField(default=False, help_text='The notification is waiting to be included in an email digest'),
+        ),
+    ]
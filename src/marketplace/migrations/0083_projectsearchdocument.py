@@ -0,0 +1,132 @@
+# Generated by Django 2.2.1 on 2026-10-18 17:39
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+POSTGRESQL_CREATE_SQL = [
+    """
+    CREATE FUNCTION marketplace_projectsearchdocument_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.organization, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.skills, '')), 'C') ||
+            setweight(to_tsvector('english', coalesce(NEW.summary, '')), 'D');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER marketplace_projectsearchdocument_vector_trigger
+    BEFORE INSERT OR UPDATE ON marketplace_projectsearchdocument
+    FOR EACH ROW EXECUTE PROCEDURE marketplace_projectsearchdocument_vector_update()
+    """,
+    """
+    CREATE INDEX marketplace_projectsearchdocument_vector_idx
+    ON marketplace_projectsearchdocument USING gin(search_vector)
+    """,
+]
+
+POSTGRESQL_DROP_SQL = [
+    "DROP INDEX IF EXISTS marketplace_projectsearchdocument_vector_idx",
+    "DROP TRIGGER IF EXISTS marketplace_projectsearchdocument_vector_trigger ON marketplace_projectsearchdocument",
+    "DROP FUNCTION IF EXISTS marketplace_projectsearchdocument_vector_update()",
+]
+
+SQLITE_CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE marketplace_project_fts USING fts5(
+        name, summary, organization, skills,
+        content='marketplace_projectsearchdocument', content_rowid='project_id'
+    )
+    """,
+    """
+    CREATE TRIGGER marketplace_project_fts_insert AFTER INSERT ON marketplace_projectsearchdocument BEGIN
+        INSERT INTO marketplace_project_fts(rowid, name, summary, organization, skills)
+        VALUES (new.project_id, new.name, new.summary, new.organization, new.skills);
+    END
+    """,
+    """
+    CREATE TRIGGER marketplace_project_fts_delete AFTER DELETE ON marketplace_projectsearchdocument BEGIN
+        INSERT INTO marketplace_project_fts(marketplace_project_fts, rowid, name, summary, organization, skills)
+        VALUES ('delete', old.project_id, old.name, old.summary, old.organization, old.skills);
+    END
+    """,
+    """
+    CREATE TRIGGER marketplace_project_fts_update AFTER UPDATE ON marketplace_projectsearchdocument BEGIN
+        INSERT INTO marketplace_project_fts(marketplace_project_fts, rowid, name, summary, organization, skills)
+        VALUES ('delete', old.project_id, old.name, old.summary, old.organization, old.skills);
+        INSERT INTO marketplace_project_fts(rowid, name, summary, organization, skills)
+        VALUES (new.project_id, new.name, new.summary, new.organization, new.skills);
+    END
+    """,
+]
+
+SQLITE_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS marketplace_project_fts_insert",
+    "DROP TRIGGER IF EXISTS marketplace_project_fts_delete",
+    "DROP TRIGGER IF EXISTS marketplace_project_fts_update",
+    "DROP TABLE IF EXISTS marketplace_project_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for sql in POSTGRESQL_CREATE_SQL:
+            schema_editor.execute(sql)
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            fts5_available = ('ENABLE_FTS5',) in cursor.fetchall()
+        # Without FTS5 the search falls back to plain text filters
+        if fts5_available:
+            for sql in SQLITE_CREATE_SQL:
+                schema_editor.execute(sql)
+
+    Project = apps.get_model('marketplace', 'Project')
+    ProjectSearchDocument = apps.get_model('marketplace', 'ProjectSearchDocument')
+    ProjectTaskRequirement = apps.get_model('marketplace', 'ProjectTaskRequirement')
+    for project in Project.objects.all().select_related('organization'):
+        skills = ProjectTaskRequirement.objects.filter(task__project=project) \
+                                               .values_list('skill__name', flat=True) \
+                                               .distinct()
+        ProjectSearchDocument.objects.create(project=project,
+                                             name=project.name or '',
+                                             summary=project.short_summary or '',
+                                             organization=project.organization.name if project.organization else '',
+                                             skills=' '.join(sorted(skills)))
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for sql in POSTGRESQL_DROP_SQL:
+            schema_editor.execute(sql)
+    elif vendor == 'sqlite':
+        for sql in SQLITE_DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0082_auto_20261018_1238'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectSearchDocument',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='marketplace.Project')),
+                ('name', models.TextField(blank=True)),
+                ('summary', models.TextField(blank=True)),
+                ('organization', models.TextField(blank=True)),
+                ('skills', models.TextField(blank=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
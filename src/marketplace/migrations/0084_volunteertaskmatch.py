@@ -0,0 +1,36 @@
+# Generated by Django 2.2.1 on 2026-10-18 17:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0083_projectsearchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VolunteerTaskMatch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Match score')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='marketplace.ProjectTask', verbose_name='Task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Volunteer')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='volunteertaskmatch',
+            index=models.Index(fields=['user', '-score'], name='marketplace_user_id_29cc88_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='volunteertaskmatch',
+            index=models.Index(fields=['task', '-score'], name='marketplace_task_id_761b81_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='volunteertaskmatch',
+            unique_together={('task', 'user')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.1 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0084_volunteertaskmatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='volunteerprofile',
+            name='stats_pending',
+            field=models.BooleanField(db_index=True, default=False, help_text="Set when the volunteer's tasks or reviews change, until the profile stats and badges are recomputed.", verbose_name='Stats pending'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.1 on 2026-10-18 17:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0085_volunteerprofile_stats_pending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VolunteerLeaderboardEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(choices=[('SP', 'Fast work'), ('RS', 'Great reviews'), ('PC', 'Completed projects'), ('EU', 'Early user')], help_text='The badge type whose statistic ranks the volunteers of this leaderboard.', max_length=2, verbose_name='Leaderboard')),
+                ('position', models.IntegerField(help_text='Position of the volunteer in the leaderboard, starting at 1.', verbose_name='Position')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'ordering': ['board', 'position'],
+                'unique_together': {('board', 'position')},
+            },
+        ),
+    ]
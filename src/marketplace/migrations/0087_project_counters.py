@@ -0,0 +1,52 @@
+# Generated by Django 2.2.1 on 2026-10-18 18:01
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_rows(query_set, field):
+    return Coalesce(Subquery(query_set.filter(**{field: OuterRef('pk')})
+                                      .order_by()
+                                      .values(field)
+                                      .annotate(row_count=Count('id'))
+                                      .values('row_count'), output_field=IntegerField()), 0)
+
+
+def initialize_counters(apps, schema_editor):
+    Project = apps.get_model('marketplace', 'Project')
+    ProjectTask = apps.get_model('marketplace', 'ProjectTask')
+    ProjectFollower = apps.get_model('marketplace', 'ProjectFollower')
+    ProjectTaskRole = apps.get_model('marketplace', 'ProjectTaskRole')
+
+    # TaskRole.VOLUNTEER
+    volunteer_roles = ProjectTaskRole.objects.filter(role=0)
+    Project.objects.update(follower_count=count_rows(ProjectFollower.objects.all(), 'project'),
+                           volunteer_count=count_rows(volunteer_roles, 'task__project'))
+    ProjectTask.objects.update(volunteer_count=count_rows(volunteer_roles, 'task'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0086_volunteerleaderboardentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='follower_count',
+            field=models.IntegerField(default=0, editable=False, help_text='Number of users following this project.', verbose_name='Follower count'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='volunteer_count',
+            field=models.IntegerField(default=0, editable=False, help_text='Number of volunteer roles in the tasks of this project.', verbose_name='Volunteer count'),
+        ),
+        migrations.AddField(
+            model_name='projecttask',
+            name='volunteer_count',
+            field=models.IntegerField(default=0, editable=False, help_text='Number of volunteers working on this task.', verbose_name='Volunteer count'),
+        ),
+        migrations.RunPython(initialize_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.1 on 2026-10-18 18:07
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def initialize_counters(apps, schema_editor):
+    # Same buckets as PlatformStatsService.rebuild_counters
+    Project = apps.get_model('marketplace', 'Project')
+    VolunteerProfile = apps.get_model('marketplace', 'VolunteerProfile')
+    PlatformStatsCounter = apps.get_model('marketplace', 'PlatformStatsCounter')
+
+    def count_by_day(query_set, *fields):
+        return query_set.annotate(day=TruncDate('creation_date')) \
+                        .values('day', *fields) \
+                        .annotate(count=Count('id')) \
+                        .values_list('day', *fields, 'count') \
+                        .order_by()
+
+    counters = []
+    # PlatformCounterType.PROJECT_CREATED, PROJECT_STATUS and VOLUNTEER_SIGNUP
+    for day, count in count_by_day(Project.objects.all()):
+        counters.append(PlatformStatsCounter(day=day, counter='PC', status='', value=count))
+    for day, status, count in count_by_day(Project.objects.all(), 'status'):
+        counters.append(PlatformStatsCounter(day=day, counter='PS', status=status, value=count))
+    for day, count in count_by_day(VolunteerProfile.objects.all()):
+        counters.append(PlatformStatsCounter(day=day, counter='VS', status='', value=count))
+    PlatformStatsCounter.objects.bulk_create(counters, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0088_featured_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformStatsCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('counter', models.CharField(choices=[('PC', 'Projects created'), ('PS', 'Projects entering minus leaving a status'), ('VS', 'Volunteer signups')], max_length=2)),
+                ('status', models.CharField(blank=True, choices=[('DR', 'Draft'), ('NW', 'New'), ('DE', 'In scoping phase'), ('DA', 'Waiting for design review'), ('WS', 'Waiting for volunteers'), ('IP', 'In progress'), ('WR', 'Waiting review'), ('CO', 'Completed'), ('EX', 'Expired'), ('RM', 'Deleted')], default='', max_length=2)),
+                ('value', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('day', 'counter', 'status')},
+            },
+        ),
+        migrations.RunPython(initialize_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.1 on 2026-10-18 18:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0089_platform_stats_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectBlueprint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope_version_notes', models.TextField(default='Initial scope at project creation time.', help_text='Version notes of the scope that is created along with every project.', max_length=1000, verbose_name='Initial scope notes')),
+                ('organization', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='marketplace.Organization')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProjectBlueprintTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('name', models.CharField(max_length=50)),
+                ('short_summary', models.TextField(max_length=1000)),
+                ('description', models.TextField(max_length=5000)),
+                ('type', models.CharField(choices=[('SCT', 'Project scoping'), ('PMT', 'Project management'), ('DWT', 'Data science'), ('QAT', 'QA')], default='DWT', max_length=3)),
+                ('stage', models.CharField(choices=[('DRF', 'Draft'), ('NOT', 'Not started'), ('STA', 'Started'), ('PRW', 'Pending review'), ('COM', 'Completed'), ('DEL', 'Deleted')], default='DRF', max_length=3)),
+                ('onboarding_instructions', models.TextField(max_length=5000)),
+                ('channel_name', models.TextField(blank=True, help_text='Name of the discussion channel of the task. No channel is created for the task if empty.', max_length=100, verbose_name='Discussion channel name')),
+                ('channel_description', models.TextField(blank=True, max_length=200)),
+                ('blueprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='marketplace.ProjectBlueprint')),
+            ],
+            options={
+                'ordering': ['blueprint', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProjectBlueprintChannel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('name', models.TextField(max_length=100)),
+                ('description', models.TextField(blank=True, max_length=200)),
+                ('blueprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='marketplace.ProjectBlueprint')),
+            ],
+            options={
+                'ordering': ['blueprint', 'position'],
+            },
+        ),
+    ]
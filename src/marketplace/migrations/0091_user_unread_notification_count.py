@@ -0,0 +1,32 @@
+# Generated by Django 2.2.1 on 2026-10-18 18:18
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def initialize_counters(apps, schema_editor):
+    User = apps.get_model('marketplace', 'User')
+    UserNotification = apps.get_model('marketplace', 'UserNotification')
+    unread_counts = UserNotification.objects.filter(user=OuterRef('pk'), is_read=False) \
+                                            .order_by() \
+                                            .values('user') \
+                                            .annotate(count=Count('id')) \
+                                            .values('count')
+    User.objects.update(unread_notification_count=Coalesce(Subquery(unread_counts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0090_project_blueprints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notification_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of notifications this user has not read yet.', verbose_name='Unread notification count'),
+        ),
+        migrations.RunPython(initialize_counters, migrations.RunPython.noop),
+    ]
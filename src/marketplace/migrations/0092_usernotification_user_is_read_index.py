@@ -0,0 +1,17 @@
+# Generated by Django 2.2.1 on 2026-10-18 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0091_user_unread_notification_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usernotification',
+            index=models.Index(fields=['user', 'is_read'], name='marketplace_user_id_d65282_idx'),
+        ),
+    ]
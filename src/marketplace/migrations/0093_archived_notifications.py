@@ -0,0 +1,26 @@
+# Generated by Django 2.2.1 on 2026-10-18 18:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0092_usernotification_user_is_read_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_date', models.DateTimeField()),
+                ('notification_description', models.CharField(max_length=500)),
+                ('source', models.CharField(choices=[('GN', 'Generic'), ('OR', 'Organization'), ('PJ', 'Project'), ('TK', 'Task'), ('VA', 'Volunteer application'), ('OM', 'Organization membership request'), ('BA', 'Award')], default='GN', max_length=2)),
+                ('target_id', models.IntegerField(blank=True, help_text='ID of the target entity that is related to this notification', null=True, verbose_name='Target ID')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
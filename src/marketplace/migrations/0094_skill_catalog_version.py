@@ -0,0 +1,26 @@
+# Generated by Django 2.2.1 on 2026-10-18 18:51
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    SkillCatalogVersion = apps.get_model('marketplace', 'SkillCatalogVersion')
+    SkillCatalogVersion.objects.create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0093_archived_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkillCatalogVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
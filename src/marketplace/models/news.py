@@ -1,5 +1,6 @@
 from django.db import models
 
+from .proj import ProjectStatus
 
 
 class NewsPiece(models.Model):
@@ -23,3 +24,62 @@ class NewsPiece(models.Model):
     )
     creation_date = models.DateTimeField(auto_now_add=True)
     last_modified_date = models.DateTimeField(auto_now= True)
+
+
+class FeaturedContent(models.Model):
+    # Single row with the picks shown in the home page, kept up to date by
+    # FeaturedContentService
+    project = models.ForeignKey(
+        'Project',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+    )
+    organization = models.ForeignKey(
+        'Organization',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+    )
+    volunteer = models.ForeignKey(
+        'VolunteerProfile',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+    )
+    computed_date = models.DateTimeField()
+
+
+class PlatformCounterType():
+    PROJECT_CREATED = 'PC'
+    PROJECT_STATUS = 'PS'
+    VOLUNTEER_SIGNUP = 'VS'
+
+    def get_choices():
+        return (
+                    (PlatformCounterType.PROJECT_CREATED, 'Projects created'),
+                    (PlatformCounterType.PROJECT_STATUS, 'Projects entering minus leaving a status'),
+                    (PlatformCounterType.VOLUNTEER_SIGNUP, 'Volunteer signups'),
+                )
+
+
+class PlatformStatsCounter(models.Model):
+    # Daily bucket of a platform counter, see PlatformStatsService
+    day = models.DateField()
+    counter = models.CharField(
+        max_length=2,
+        choices=PlatformCounterType.get_choices(),
+    )
+    status = models.CharField(
+        max_length=2,
+        choices=ProjectStatus.get_choices(),
+        blank=True,
+        default='',
+    )
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('day', 'counter', 'status')
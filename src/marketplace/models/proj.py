@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django_countries.fields import CountryField
 
@@ -36,7 +37,23 @@ class ProjectStatus():
                     (ProjectStatus.DELETED, 'Deleted')
                 )
 
-class Project(models.Model):
+class CounterFieldsMixin():
+    # Counter columns are only changed with F() updates, so saving an instance
+    # that was loaded before the update must not write its stale value back.
+    # They are left out of the UPDATE that Django builds from the fields it
+    # saves anyway (all of them, the loaded ones of deferred instances or the
+    # update_fields), unless they are listed in update_fields. Rows that no
+    # longer exist are still inserted with all their fields.
+    counter_fields = ()
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        if update_fields is None:
+            values = [value for value in values if value[0].name not in self.counter_fields]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+class Project(CounterFieldsMixin, models.Model):
+    counter_fields = ('follower_count', 'volunteer_count')
+
     name = models.CharField(
         verbose_name="Name",
         help_text="Name of this project. Make sure it is distinctive and recognizable on its own.",
@@ -224,6 +241,18 @@ class Project(models.Model):
         help_text="Specifies if this is a demonstration project",
         default=False,
     )
+    follower_count = models.IntegerField(
+        verbose_name="Follower count",
+        help_text="Number of users following this project.",
+        default=0,
+        editable=False,
+    )
+    volunteer_count = models.IntegerField(
+        verbose_name="Volunteer count",
+        help_text="Number of volunteer roles in the tasks of this project.",
+        default=0,
+        editable=False,
+    )
     creation_date = models.DateTimeField(
         verbose_name="Creation date",
         auto_now_add=True,
@@ -352,6 +381,22 @@ class ProjectSocialCause(models.Model):
     class Meta:
         unique_together = ('social_cause','project')
 
+class ProjectSearchDocument(models.Model):
+    # Denormalized text of a project used by the full-text search. On
+    # PostgreSQL a trigger keeps search_vector up to date and it is indexed
+    # with GIN; on SQLite an FTS5 table is kept in sync with triggers. Both
+    # are created in migration 0083.
+    project = models.OneToOneField(
+        Project,
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    name = models.TextField(blank=True)
+    summary = models.TextField(blank=True)
+    organization = models.TextField(blank=True)
+    skills = models.TextField(blank=True)
+    search_vector = SearchVectorField(blank=True, null=True)
+
 class ProjectScope(models.Model):
     # ==========================
     scope_goals = models.TextField(
@@ -561,7 +606,9 @@ class TaskStatus():
                     (TaskStatus.DELETED, 'Deleted')
                 )
 
-class ProjectTask(models.Model):
+class ProjectTask(CounterFieldsMixin, models.Model):
+    counter_fields = ('volunteer_count',)
+
     name = models.CharField(
         verbose_name="Name",
         help_text="Descriptive name that identifies the task within the project.",
@@ -601,6 +648,12 @@ class ProjectTask(models.Model):
         verbose_name="Accepting volunteers?",
         help_text="Specify if volunteers can apply to this task at the moment or not.",
     )
+    volunteer_count = models.IntegerField(
+        verbose_name="Volunteer count",
+        help_text="Number of volunteers working on this task.",
+        default=0,
+        editable=False,
+    )
     estimated_start_date = models.DateField(
         verbose_name="Start date",
         help_text="The planned start date for this specific task.",
@@ -736,6 +789,87 @@ class ProjectComment(models.Model):
     def __str__(self):
         return self.comment_date.strftime('%Y-%m-%d %H:%M') + self.author.username + ": " + self.comment[:100]
 
+class ProjectBlueprint(models.Model):
+    # Default tasks and channels of the projects created by an organization.
+    # Organizations without a blueprint use DEFAULT_PROJECT_BLUEPRINT (see
+    # marketplace.domain.proj).
+    organization = models.OneToOneField(
+        Organization,
+        on_delete=models.CASCADE,
+    )
+    scope_version_notes = models.TextField(
+        max_length=1000,
+        verbose_name="Initial scope notes",
+        help_text="Version notes of the scope that is created along with every project.",
+        default="Initial scope at project creation time.",
+    )
+
+    def __str__(self):
+        return "Project blueprint of {0}".format(self.organization)
+
+
+class ProjectBlueprintTask(models.Model):
+    blueprint = models.ForeignKey(
+        ProjectBlueprint,
+        on_delete=models.CASCADE,
+    )
+    position = models.PositiveSmallIntegerField()
+    name = models.CharField(
+        max_length=50,
+    )
+    short_summary = models.TextField(
+        max_length=1000,
+    )
+    description = models.TextField(
+        max_length=5000,
+    )
+    type = models.CharField(
+        max_length=3,
+        choices=TaskType.get_choices(),
+        default=TaskType.DOMAIN_WORK_TASK,
+    )
+    stage = models.CharField(
+        max_length=3,
+        choices=TaskStatus.get_choices(),
+        default=TaskStatus.DRAFT,
+    )
+    onboarding_instructions = models.TextField(
+        max_length=5000,
+    )
+    channel_name = models.TextField(
+        max_length=100,
+        verbose_name="Discussion channel name",
+        help_text="Name of the discussion channel of the task. No channel is created for the task if empty.",
+        blank=True,
+    )
+    channel_description = models.TextField(
+        max_length=200,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ['blueprint', 'position']
+
+
+class ProjectBlueprintChannel(models.Model):
+    # Discussion channels that are not related to a task
+    blueprint = models.ForeignKey(
+        ProjectBlueprint,
+        on_delete=models.CASCADE,
+    )
+    position = models.PositiveSmallIntegerField()
+    name = models.TextField(
+        max_length=100,
+    )
+    description = models.TextField(
+        max_length=200,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ['blueprint', 'position']
+
+
 class ProjectTaskReview(models.Model):
     volunteer_comment = models.TextField(
         verbose_name="Volunteer's comments",
@@ -907,6 +1041,33 @@ class ProjectTaskRequirement(models.Model):
         ordering = ['-level']
 
 
+class VolunteerTaskMatch(models.Model):
+    # Precomputed score of how well the skills of a volunteer match the
+    # requirements of a task, between 0 and 1. Maintained by the matching
+    # engine in marketplace.domain.matching; only scores above a threshold
+    # are stored.
+    task = models.ForeignKey(
+        ProjectTask,
+        on_delete=models.CASCADE,
+        verbose_name="Task",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name="Volunteer",
+    )
+    score = models.FloatField(
+        verbose_name="Match score",
+    )
+
+    class Meta:
+        unique_together = ('task', 'user')
+        indexes = [
+            models.Index(fields=['user', '-score']),
+            models.Index(fields=['task', '-score']),
+        ]
+
+
 class VolunteerApplication(models.Model):
     application_date = models.DateTimeField(
         verbose_name="Application Date",
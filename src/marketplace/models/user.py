@@ -5,6 +5,7 @@ from django.contrib.auth.models import (
 )
 from django.contrib.postgres.fields import CIEmailField
 from django.db import models
+from django.utils import timezone
 
 from .common import (
     ReviewStatus,
@@ -27,6 +28,19 @@ class UserType():
                 )
 
 
+class EmailNotificationFrequency():
+    IMMEDIATE = 0
+    HOURLY = 1
+    DAILY = 2
+
+    def get_choices():
+        return (
+                (EmailNotificationFrequency.IMMEDIATE, 'Send an email for every notification'),
+                (EmailNotificationFrequency.HOURLY, 'Send an hourly digest'),
+                (EmailNotificationFrequency.DAILY, 'Send a daily digest'),
+                )
+
+
 class UserManager(AuthUserManager):
 
     def create_superuser(self, *args, **kwargs):
@@ -77,6 +91,17 @@ class User(AbstractUser):
         null=True,
         validators=[validate_image_size],
     )
+    notification_email_frequency = models.IntegerField(
+        verbose_name="Email notifications",
+        help_text="Choose how often you want to receive emails about your notifications.",
+        choices=EmailNotificationFrequency.get_choices(),
+        default=EmailNotificationFrequency.IMMEDIATE,
+    )
+    unread_notification_count = models.PositiveIntegerField(
+        verbose_name="Unread notification count",
+        help_text="Number of notifications this user has not read yet.",
+        default=0,
+    )
 
     objects = UserManager()
 
@@ -198,6 +223,10 @@ class UserNotification(models.Model):
     notification_date = models.DateTimeField(auto_now_add=True)
     notification_description = models.CharField(max_length=500)
     is_read = models.BooleanField()
+    email_pending = models.BooleanField(
+        help_text="The notification is waiting to be included in an email digest",
+        default=False,
+    )
     severity = models.IntegerField(
         choices=NotificationSeverity.get_choices(),
         default=NotificationSeverity.INFO,
@@ -218,6 +247,11 @@ class UserNotification(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_read']),
+        ]
+
     def is_source_organization(self):
         return self.source == NotificationSource.ORGANIZATION
 
@@ -236,6 +270,63 @@ class UserNotification(models.Model):
     def is_source_badge(self):
         return self.source == NotificationSource.BADGE
 
+class ArchivedNotification(models.Model):
+    # Read notifications past the retention period are moved here by the
+    # archive_notifications command, keeping only what a history needs.
+    notification_date = models.DateTimeField()
+    notification_description = models.CharField(max_length=500)
+    source = models.CharField(
+        max_length=2,
+        choices=NotificationSource.get_choices(),
+        default=NotificationSource.GENERIC,
+    )
+    target_id = models.IntegerField(
+        verbose_name="Target ID",
+        help_text="ID of the target entity that is related to this notification",
+        blank=True,
+        null=True,
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+
+class EmailDeliveryStatus():
+    PENDING = 0
+    SENT = 1
+    FAILED = 2
+
+    def get_choices():
+        return (
+                    (EmailDeliveryStatus.PENDING, 'Pending'),
+                    (EmailDeliveryStatus.SENT, 'Sent'),
+                    (EmailDeliveryStatus.FAILED, 'Failed'),
+                )
+
+class NotificationEmail(models.Model):
+    creation_date = models.DateTimeField(auto_now_add=True)
+    from_email = models.CharField(max_length=254)
+    to_email = models.CharField(max_length=254)
+    subject = models.CharField(max_length=300)
+    message = models.TextField()
+    status = models.IntegerField(
+        choices=EmailDeliveryStatus.get_choices(),
+        default=EmailDeliveryStatus.PENDING,
+    )
+    attempts = models.IntegerField(default=0)
+    next_attempt_date = models.DateTimeField(default=timezone.now)
+    sent_date = models.DateTimeField(blank=True, null=True)
+    last_error = models.CharField(max_length=500, blank=True, null=True)
+
+    def __str__(self):
+        return self.to_email + "-" + self.subject
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_date']),
+        ]
+
 class Skill(models.Model):
     area = models.CharField(max_length=100)
     name = models.CharField(max_length=100)
@@ -250,6 +341,12 @@ class Skill(models.Model):
         unique_together = ('area','name')
 
 
+class SkillCatalogVersion(models.Model):
+    # Single row with the version of the skill table, increased whenever a
+    # skill is saved or deleted (see SkillCatalogService)
+    version = models.PositiveIntegerField(default=0)
+
+
 class EducationLevel():
     OTHER = 0
     PRIMARY = 1
@@ -362,6 +459,12 @@ class VolunteerProfile(models.Model):
         blank=True,
         null=True,
     )
+    stats_pending = models.BooleanField(
+        verbose_name="Stats pending",
+        help_text="Set when the volunteer's tasks or reviews change, until the profile stats and badges are recomputed.",
+        default=False,
+        db_index=True,
+    )
     is_edited = models.BooleanField(
         verbose_name="Is edited?",
         help_text="Specifies if the user has edited the profile or if it has the default initial settings.",
@@ -484,3 +587,25 @@ class UserBadge(models.Model):
 
     class Meta:
         unique_together = ('user','type')
+
+
+class VolunteerLeaderboardEntry(models.Model):
+    board = models.CharField(
+        verbose_name="Leaderboard",
+        help_text="The badge type whose statistic ranks the volunteers of this leaderboard.",
+        max_length=2,
+        choices=BadgeType.get_choices(),
+    )
+    position = models.IntegerField(
+        verbose_name="Position",
+        help_text="Position of the volunteer in the leaderboard, starting at 1.",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name="User",
+    )
+
+    class Meta:
+        unique_together = ('board', 'position')
+        ordering = ['board', 'position']
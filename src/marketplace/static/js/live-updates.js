@@ -0,0 +1,31 @@
+  // Polls the updates URL of a list (its data-updates-url attribute) for the
+  // rows newer than data-updates-after, and adds them at the top of the list.
+
+  function pollLiveUpdates(listId, emptyId) {
+    var list = $("#"+listId);
+    var url = list.data("updates-url");
+    if (!url) {
+      return;
+    }
+
+    function poll() {
+      $.getJSON(url, {after: list.data("updates-after")})
+        .done(function (data) {
+          if (data.reload) {
+            window.location.reload();
+            return;
+          }
+          if (data.html) {
+            $("#"+emptyId).remove();
+            list.prepend(data.html);
+          }
+          list.data("updates-after", data.last_id);
+          setTimeout(poll, data.retry * 1000);
+        })
+        .fail(function () {
+          setTimeout(poll, 30000);
+        });
+    };
+
+    poll();
+  };
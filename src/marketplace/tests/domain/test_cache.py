@@ -0,0 +1,136 @@
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete
+from django.test import TransactionTestCase, override_settings
+
+from marketplace.domain import marketplace
+from marketplace.domain.cache import get_tag, get_tag_versions, invalidate_tags
+from marketplace.domain.live import LiveUpdatesService
+from marketplace.domain.notifications import NotificationService
+from marketplace.domain.org import OrganizationService
+from marketplace.domain.proj import ProjectService
+from marketplace.domain.skills import SkillCatalogService
+from marketplace.domain.user import UserService
+
+from marketplace.models.common import SkillLevel
+from marketplace.models.proj import ProjectComment
+from marketplace.models.user import Skill, SkillCatalogVersion, UserNotification, NotificationSeverity, NotificationSource
+
+from marketplace.tests.domain.common import (
+    example_organization_user, example_volunteer_user, example_organization, example_project,
+)
+
+
+# The cache is bypassed inside transactions, so these tests cannot run in the
+# transaction of a TestCase. The local memory cache of the tests is shared by
+# the whole test run, so the domain cache can be enabled with it.
+@override_settings(DOMAIN_CACHE_ENABLED=True)
+class DomainCacheTestCase(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner_user = example_organization_user()
+        marketplace.user.add_user(self.owner_user, 'organization')
+        self.volunteer_user = example_volunteer_user()
+        marketplace.user.add_user(self.volunteer_user, 'volunteer')
+        self.organization = example_organization()
+        OrganizationService.create_organization(self.owner_user, self.organization)
+        self.project = example_project()
+        OrganizationService.create_project(self.owner_user, self.organization.id, self.project)
+        ProjectService.publish_project(self.owner_user, self.project.id, self.project)
+        self.skill = Skill.objects.create(area="Programming", name="Python")
+
+    def test_cached_getters(self):
+        with self.subTest(stage='Entries are shared by all users'):
+            self.assertEqual(OrganizationService.get_organization(self.owner_user, self.organization.id), self.organization)
+            with self.assertNumQueries(0):
+                self.assertEqual(OrganizationService.get_organization(self.volunteer_user, self.organization.id), self.organization)
+
+        with self.subTest(stage='Saving an object invalidates its entries'):
+            self.organization.name = "Renamed organization"
+            OrganizationService.save_organization_info(self.owner_user, self.organization.id, self.organization)
+            self.assertEqual(OrganizationService.get_organization(self.owner_user, self.organization.id).name, "Renamed organization")
+
+        with self.subTest(stage='Updates without signals invalidate their entries'):
+            self.assertEqual(ProjectService.get_project(self.owner_user, self.project.id).follower_count, 0)
+            ProjectService.toggle_follower(self.volunteer_user, self.project.id)
+            self.assertEqual(ProjectService.get_project(self.owner_user, self.project.id).follower_count, 1)
+
+        with self.subTest(stage='Entries tagged by field and by model'):
+            UserService.set_volunteer_skills(self.volunteer_user, self.volunteer_user.id, {str(self.skill.id): SkillLevel.EXPERT})
+            skills = UserService.get_volunteer_skills(self.volunteer_user, self.volunteer_user.id)
+            self.assertEqual(skills['Programming'][0]['volunteer_skill'].level, SkillLevel.EXPERT)
+            with self.assertNumQueries(0):
+                UserService.get_volunteer_skills(self.volunteer_user, self.volunteer_user.id)
+            UserService.set_volunteer_skills(self.volunteer_user, self.volunteer_user.id, {str(self.skill.id): SkillLevel.BEGINNER})
+            skills = UserService.get_volunteer_skills(self.volunteer_user, self.volunteer_user.id)
+            self.assertEqual(skills['Programming'][0]['volunteer_skill'].level, SkillLevel.BEGINNER)
+            Skill.objects.create(area="Programming", name="SQL")
+            self.assertEqual(len(UserService.get_volunteer_skills(self.volunteer_user, self.volunteer_user.id)['Programming']), 2)
+
+        with self.subTest(stage='The cache is bypassed in transactions'):
+            with transaction.atomic():
+                with self.assertNumQueries(1):
+                    OrganizationService.get_organization(self.owner_user, self.organization.id)
+
+    def test_skill_catalog(self):
+        with self.subTest(stage='The catalog is loaded once'):
+            catalog = SkillCatalogService.get_catalog()
+            self.assertEqual(catalog.areas, {'Programming': (self.skill,)})
+            self.assertEqual(catalog.by_id[self.skill.id], self.skill)
+            self.assertEqual(catalog.by_name[('Programming', 'Python')], self.skill)
+            # Only the version is read
+            with self.assertNumQueries(1):
+                self.assertIs(SkillCatalogService.get_catalog(), catalog)
+
+        with self.subTest(stage='Changing a skill changes the version'):
+            sql_skill = Skill.objects.create(area="Programming", name="SQL")
+            new_catalog = SkillCatalogService.get_catalog()
+            self.assertNotEqual(new_catalog.version, catalog.version)
+            self.assertEqual(new_catalog.areas, {'Programming': (self.skill, sql_skill)})
+            sql_skill.delete()
+            self.assertEqual(SkillCatalogService.get_catalog().skills, (self.skill,))
+
+        with self.subTest(stage='The version is kept in the database'):
+            catalog = SkillCatalogService.get_catalog()
+            cache.clear()
+            self.assertIs(SkillCatalogService.get_catalog(), catalog)
+            SkillCatalogVersion.objects.update(version=F('version') + 1)
+            self.assertIsNot(SkillCatalogService.get_catalog(), catalog)
+
+    @override_settings(LIVE_UPDATES_POLL_INTERVAL=0.01)
+    def test_live_updates(self):
+        notifications_tag = get_tag(UserNotification, 'user', self.volunteer_user)
+
+        with self.subTest(stage='New notifications and comments change the tags'):
+            versions = get_tag_versions([notifications_tag])
+            NotificationService.add_multiuser_notification([self.volunteer_user], "Live", NotificationSeverity.INFO, NotificationSource.GENERIC, None)
+            self.assertNotEqual(get_tag_versions([notifications_tag]), versions)
+            versions = get_tag_versions([notifications_tag])
+            NotificationService.add_user_notification(self.volunteer_user, "Single", NotificationSeverity.INFO, NotificationSource.GENERIC, None)
+            self.assertNotEqual(get_tag_versions([notifications_tag]), versions)
+            channel = ProjectService.get_project_channels(self.owner_user, self.project)[0]
+            channel_tag = get_tag(ProjectComment, 'channel', channel.id)
+            versions = get_tag_versions([channel_tag])
+            ProjectService.add_project_comment(self.owner_user, self.project.id, channel.id, ProjectComment(comment="Live"))
+            self.assertNotEqual(get_tag_versions([channel_tag]), versions)
+
+        with self.subTest(stage='Deleting notifications does not send signals'):
+            self.assertFalse(post_delete.has_listeners(UserNotification))
+            self.assertFalse(post_delete.has_listeners(ProjectComment))
+
+        with self.subTest(stage='Rows are returned right away'):
+            notifications = LiveUpdatesService.get_notification_updates(self.volunteer_user, 0, timeout=10)
+            self.assertEqual([notification.notification_description for notification in notifications], ["Single", "Live"])
+            self.assertEqual(LiveUpdatesService.get_notification_updates(self.volunteer_user, notifications[0].id), [])
+
+        with self.subTest(stage='Waiting requests only query again when the tags change'):
+            fetched_rows = [['row'], []]
+            timer = threading.Timer(0.1, invalidate_tags, [[notifications_tag]])
+            timer.start()
+            self.assertEqual(LiveUpdatesService.wait_for_rows([notifications_tag], fetched_rows.pop, 10), ['row'])
+            self.assertEqual(fetched_rows, [])
+            timer.join()
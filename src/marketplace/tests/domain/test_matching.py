@@ -0,0 +1,84 @@
+from django.core.exceptions import PermissionDenied
+from django.test import TestCase
+
+from marketplace.domain import marketplace
+from marketplace.domain.matching import MatchingService
+from marketplace.domain.org import OrganizationService
+from marketplace.domain.proj import ProjectService, ProjectTaskService
+from marketplace.domain.user import UserService
+
+from marketplace.models.common import SkillLevel
+from marketplace.models.proj import TaskRequirementImportance, VolunteerTaskMatch
+from marketplace.models.user import SignupCodeType, SignupCode, Skill
+
+from marketplace.tests.domain.common import (
+    example_organization_user, example_volunteer_user, example_organization, example_project,
+)
+
+
+class MatchingTestCase(TestCase):
+
+    def setUp(self):
+        code = SignupCode()
+        code.name = "AUTOMATICVOLUNTEER"
+        code.type = SignupCodeType.VOLUNTEER_AUTOMATIC_ACCEPT
+        code.save()
+
+        self.owner_user = example_organization_user()
+        marketplace.user.add_user(self.owner_user, 'organization')
+        self.expert_user = example_volunteer_user(special_code="AUTOMATICVOLUNTEER")
+        marketplace.user.add_user(self.expert_user, 'volunteer')
+        self.beginner_user = example_volunteer_user(username="beginner", email="beginner@email.com", special_code="AUTOMATICVOLUNTEER")
+        marketplace.user.add_user(self.beginner_user, 'volunteer')
+
+        self.python_skill = Skill.objects.create(area="Programming", name="Python")
+        self.sql_skill = Skill.objects.create(area="Programming", name="SQL")
+
+        self.organization = example_organization()
+        OrganizationService.create_organization(self.owner_user, self.organization)
+        self.project = example_project()
+        OrganizationService.create_project(self.owner_user, self.organization.id, self.project)
+        ProjectService.publish_project(self.owner_user, self.project.id, self.project)
+        self.task = ProjectTaskService.get_all_tasks(self.owner_user, self.project).first()
+        if not self.task.accepting_volunteers:
+            ProjectTaskService.toggle_task_accepting_volunteers(self.owner_user, self.project.id, self.task.id)
+            self.task.refresh_from_db()
+
+    def set_skills(self, user, python_level, sql_level):
+        UserService.set_volunteer_skills(user, user.id,
+            {str(self.python_skill.id): python_level, str(self.sql_skill.id): sql_level})
+
+    def set_requirements(self, python_level, sql_level):
+        ProjectTaskService.set_task_requirements(self.owner_user, self.project.id, self.task.id, {
+            str(self.python_skill.id): python_level, "i" + str(self.python_skill.id): TaskRequirementImportance.REQUIRED,
+            str(self.sql_skill.id): sql_level, "i" + str(self.sql_skill.id): TaskRequirementImportance.NICE_TO_HAVE,
+        })
+
+    def test_task_matching(self):
+        self.set_skills(self.expert_user, SkillLevel.EXPERT, SkillLevel.EXPERT)
+        self.set_skills(self.beginner_user, SkillLevel.BEGINNER, -1)
+
+        with self.subTest(stage='Scores are computed when requirements change'):
+            self.set_requirements(SkillLevel.EXPERT, SkillLevel.BEGINNER)
+            scores = dict(VolunteerTaskMatch.objects.filter(task=self.task).values_list('user', 'score'))
+            self.assertEqual(scores[self.expert_user.id], 1.0)
+            # One third of the required Python level, weighted 4 to 1 against SQL
+            self.assertAlmostEqual(scores[self.beginner_user.id], (4.0 / 3) / 5, places=4)
+            self.assertEqual(list(MatchingService.recommended_tasks(self.expert_user, self.expert_user)), [self.task])
+            self.assertEqual(list(MatchingService.recommended_volunteers(self.owner_user, self.task)),
+                             [self.expert_user, self.beginner_user])
+            with self.assertRaises(PermissionDenied):
+                MatchingService.recommended_volunteers(self.expert_user, self.task)
+
+        with self.subTest(stage='Scores are updated when skills change'):
+            self.set_skills(self.beginner_user, SkillLevel.EXPERT, SkillLevel.BEGINNER)
+            self.set_skills(self.expert_user, -1, -1)
+            self.assertEqual(list(VolunteerTaskMatch.objects.filter(task=self.task).values_list('user', 'score')),
+                             [(self.beginner_user.id, 1.0)])
+            self.assertEqual(list(MatchingService.recommended_tasks(self.expert_user, self.expert_user)), [])
+
+        with self.subTest(stage='A full rebuild gives the same scores'):
+            self.set_skills(self.expert_user, SkillLevel.INTERMEDIATE, SkillLevel.INTERMEDIATE)
+            scores = set(VolunteerTaskMatch.objects.values_list('task', 'user', 'score'))
+            self.assertEqual(MatchingService.rebuild_matches(), len(scores))
+            self.assertEqual(set(VolunteerTaskMatch.objects.values_list('task', 'user', 'score')), scores)
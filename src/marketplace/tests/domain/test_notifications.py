@@ -0,0 +1,214 @@
+from datetime import timedelta
+from smtplib import SMTPException
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from marketplace.domain import marketplace
+from marketplace.domain.notifications import NotificationService
+
+from marketplace.models.user import (
+    User, NotificationSeverity, NotificationSource, NotificationEmail, EmailDeliveryStatus, UserNotification,
+    ArchivedNotification,
+    EmailNotificationFrequency,
+)
+
+from marketplace.tests.domain.common import example_volunteer_user
+
+
+class FailingEmailBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        raise SMTPException('Relay unavailable')
+
+
+class CrashingEmailBackend(BaseEmailBackend):
+    # Sends the first message and raises an unexpected error on the next one
+
+    sent_count = 0
+
+    def send_messages(self, email_messages):
+        if CrashingEmailBackend.sent_count:
+            raise RuntimeError('Worker stopped')
+        CrashingEmailBackend.sent_count += 1
+        return len(email_messages)
+
+
+class NotificationTestCase(TestCase):
+
+    volunteer_user = None
+
+    def setUp(self):
+        self.volunteer_user = example_volunteer_user()
+        marketplace.user.add_user(self.volunteer_user, 'volunteer')
+        NotificationEmail.objects.all().delete()
+
+    def add_notification(self, description="Test notification"):
+        NotificationService.add_user_notification(self.volunteer_user,
+                                                  description,
+                                                  NotificationSeverity.INFO,
+                                                  NotificationSource.GENERIC,
+                                                  None)
+
+    def test_email_outbox(self):
+        with self.subTest(stage='Emails are queued, not sent'):
+            self.add_notification()
+            self.assertEqual(len(mail.outbox), 0)
+            self.assertEqual(NotificationEmail.objects.filter(status=EmailDeliveryStatus.PENDING).count(), 1)
+
+        with self.subTest(stage='Outbox rows follow the caller transaction'):
+            try:
+                with transaction.atomic():
+                    self.add_notification("Rolled back")
+                    raise ValueError()
+            except ValueError:
+                pass
+            self.assertEqual(NotificationEmail.objects.count(), 1)
+            self.assertFalse(UserNotification.objects.filter(notification_description="Rolled back").exists())
+
+        with self.subTest(stage='Deliver pending emails'):
+            self.add_notification("Second notification")
+            self.assertEqual(NotificationService.deliver_pending_emails(), (2, 0))
+            self.assertEqual(len(mail.outbox), 2)
+            self.assertEqual(mail.outbox[0].to, [self.volunteer_user.email])
+            self.assertEqual(NotificationEmail.objects.filter(status=EmailDeliveryStatus.SENT).count(), 2)
+            self.assertEqual(NotificationService.deliver_pending_emails(), (0, 0))
+
+    @override_settings(EMAIL_BACKEND='marketplace.tests.domain.test_notifications.FailingEmailBackend')
+    def test_email_retries(self):
+        self.add_notification()
+        email = NotificationEmail.objects.get()
+
+        with self.subTest(stage='Failed deliveries are retried later'):
+            self.assertEqual(NotificationService.deliver_pending_emails(max_attempts=2), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual(email.status, EmailDeliveryStatus.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertGreater(email.next_attempt_date, timezone.now())
+            self.assertEqual(NotificationService.deliver_pending_emails(max_attempts=2), (0, 0))
+
+        with self.subTest(stage='Emails are marked as failed after the last attempt'):
+            NotificationEmail.objects.update(next_attempt_date=timezone.now())
+            self.assertEqual(NotificationService.deliver_pending_emails(max_attempts=2), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual(email.status, EmailDeliveryStatus.FAILED)
+            self.assertEqual(email.last_error, 'Relay unavailable')
+
+    @override_settings(EMAIL_BACKEND='marketplace.tests.domain.test_notifications.CrashingEmailBackend',
+                       NOTIFICATION_EMAIL_CLAIM_TIMEOUT=7200)
+    def test_email_delivery_errors(self):
+        self.add_notification("First notification")
+        self.add_notification("Second notification")
+        CrashingEmailBackend.sent_count = 0
+        with self.assertRaises(RuntimeError):
+            NotificationService.deliver_pending_emails()
+        # The email already sent is kept as sent and the other one is only
+        # retried once its claim expires
+        self.assertEqual(NotificationEmail.objects.filter(status=EmailDeliveryStatus.SENT).count(), 1)
+        self.assertEqual(NotificationService.deliver_pending_emails(), (0, 0))
+        claimed_email = NotificationEmail.objects.get(status=EmailDeliveryStatus.PENDING)
+        self.assertGreater(claimed_email.next_attempt_date, timezone.now() + timedelta(seconds=7000))
+
+    def test_multiuser_notification(self):
+        other_user = example_volunteer_user(username="OtherUser", email="other@email.com")
+        marketplace.user.add_user(other_user, 'volunteer')
+        users = [self.volunteer_user, other_user, self.volunteer_user]
+
+        with self.subTest(stage='Recipient lists are deduplicated'):
+            with self.assertNumQueries(3):
+                NotificationService.add_multiuser_notification(users, "List", NotificationSeverity.INFO, NotificationSource.GENERIC, None)
+            self.assertEqual(UserNotification.objects.filter(notification_description="List").count(), 2)
+            self.assertEqual(User.objects.get(pk=self.volunteer_user.id).unread_notification_count, 1)
+            self.assertEqual(NotificationEmail.objects.count(), 2)
+
+        with self.subTest(stage='Recipient querysets are deduplicated in the database'):
+            query_set = User.objects.filter(Q(pk=self.volunteer_user.id) | Q(pk=other_user.id) | Q(username__startswith="Vol"))
+            with self.assertNumQueries(4):
+                NotificationService.add_multiuser_notification(query_set, "Query", NotificationSeverity.INFO, NotificationSource.GENERIC, None)
+            self.assertEqual(set(UserNotification.objects.filter(notification_description="Query").values_list('user', flat=True)),
+                             set([self.volunteer_user.id, other_user.id]))
+
+    def test_notification_digests(self):
+        daily_user = example_volunteer_user(username="DailyUser", email="daily@email.com",
+                                            notification_email_frequency=EmailNotificationFrequency.DAILY)
+        marketplace.user.add_user(daily_user, 'volunteer')
+        users = [self.volunteer_user, daily_user]
+
+        with self.subTest(stage='Digest users do not get immediate emails'):
+            for i in range(3):
+                NotificationService.add_multiuser_notification(users, "Multi " + str(i), NotificationSeverity.INFO, NotificationSource.GENERIC, None)
+            NotificationService.add_user_notification(daily_user, "Single", NotificationSeverity.INFO, NotificationSource.GENERIC, None)
+            self.assertEqual(NotificationEmail.objects.filter(to_email=self.volunteer_user.email).count(), 3)
+            self.assertEqual(NotificationEmail.objects.filter(to_email=daily_user.email).count(), 0)
+            self.assertEqual(UserNotification.objects.filter(user=daily_user, email_pending=True).count(), 4)
+
+        with self.subTest(stage='Digests are sent once per period'):
+            self.assertEqual(NotificationService.send_notification_digests(EmailNotificationFrequency.HOURLY), 0)
+            self.assertEqual(NotificationService.send_notification_digests(EmailNotificationFrequency.DAILY), 1)
+            digest = NotificationEmail.objects.get(to_email=daily_user.email)
+            self.assertIn("4 new notifications", digest.subject)
+            self.assertIn("Multi 2", digest.message)
+            self.assertIn("Single", digest.message)
+            self.assertFalse(UserNotification.objects.filter(email_pending=True).exists())
+            self.assertEqual(NotificationService.send_notification_digests(EmailNotificationFrequency.DAILY), 0)
+
+    def test_mark_as_read(self):
+        def unread_count():
+            return User.objects.get(pk=self.volunteer_user.id).unread_notification_count
+
+        for i in range(5):
+            self.add_notification("Notification {0}".format(i))
+        notification_ids = list(UserNotification.objects.filter(user=self.volunteer_user).order_by('id').values_list('id', flat=True))
+        self.assertEqual(unread_count(), 5)
+
+        with self.subTest(stage='Mark a set of notifications as read'):
+            with self.assertNumQueries(4):
+                self.assertEqual(NotificationService.mark_notifications_as_read(self.volunteer_user, notification_ids[:2]), 2)
+            self.assertEqual(unread_count(), 3)
+            with self.assertNumQueries(3):
+                self.assertEqual(NotificationService.mark_notifications_as_read(self.volunteer_user, notification_ids[:2]), 0)
+            with self.assertNumQueries(0):
+                self.assertEqual(NotificationService.mark_notifications_as_read(self.volunteer_user, []), 0)
+
+        with self.subTest(stage='Mark all as read up to a notification'):
+            self.assertEqual(NotificationService.mark_notifications_as_read(self.volunteer_user, up_to_id=notification_ids[3]), 2)
+            self.assertEqual(unread_count(), 1)
+            self.assertFalse(UserNotification.objects.get(pk=notification_ids[4]).is_read)
+            self.assertEqual(NotificationService.mark_notifications_as_read(self.volunteer_user), 1)
+            self.assertEqual(unread_count(), 0)
+
+        with self.subTest(stage='Reconcile drifted counters'):
+            self.add_notification()
+            User.objects.filter(pk=self.volunteer_user.id).update(unread_notification_count=7)
+            self.assertEqual(NotificationService.reconcile_unread_counters(), 1)
+            self.assertEqual(unread_count(), 1)
+            self.assertEqual(NotificationService.reconcile_unread_counters(), 0)
+
+    def test_archive_notifications(self):
+        for i in range(5):
+            self.add_notification("Notification {0}".format(i))
+        notification_ids = list(UserNotification.objects.filter(user=self.volunteer_user).order_by('id').values_list('id', flat=True))
+        NotificationService.mark_notifications_as_read(self.volunteer_user, notification_ids[:3])
+        UserNotification.objects.filter(id__in=notification_ids[1:]).update(notification_date=timezone.now() - timedelta(days=200))
+        cutoff_date = timezone.now() - timedelta(days=180)
+
+        with self.subTest(stage='Old read notifications are archived in batches'):
+            self.assertEqual(NotificationService.archive_read_notifications(cutoff_date, batch_size=1), (1, notification_ids[1]))
+            self.assertEqual(NotificationService.archive_read_notifications(cutoff_date, batch_size=1, after_id=notification_ids[1]),
+                             (1, notification_ids[2]))
+            self.assertEqual(NotificationService.archive_read_notifications(cutoff_date, batch_size=1, after_id=notification_ids[2]),
+                             (0, notification_ids[2]))
+            self.assertEqual(list(UserNotification.objects.order_by('id').values_list('id', flat=True)),
+                             [notification_ids[0]] + notification_ids[3:])
+            self.assertEqual(set(ArchivedNotification.objects.values_list('notification_description', flat=True)),
+                             set(["Notification 1", "Notification 2"]))
+
+        with self.subTest(stage='Old read notifications are deleted'):
+            NotificationService.mark_notifications_as_read(self.volunteer_user)
+            self.assertEqual(NotificationService.archive_read_notifications(cutoff_date, delete=True), (2, notification_ids[-1]))
+            self.assertEqual(list(UserNotification.objects.values_list('id', flat=True)), [notification_ids[0]])
+            self.assertEqual(ArchivedNotification.objects.count(), 2)
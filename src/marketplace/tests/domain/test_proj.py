@@ -1,18 +1,34 @@
-from django.test import TestCase
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.http import Http404, QueryDict
+from django.db import transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase
 from django.core.exceptions import PermissionDenied
 from django.contrib.auth.models import AnonymousUser
+from django.utils import timezone
 
 from marketplace.domain import marketplace
 from marketplace.domain.org import OrganizationService
-from marketplace.domain.proj import ProjectService, ProjectTaskService
+from marketplace.domain.proj import ProjectService, ProjectTaskService, DEFAULT_PROJECT_BLUEPRINT
 
-from marketplace.models.common import ReviewStatus, SkillLevel, Score, TaskType
+from marketplace.models.common import ReviewStatus, SkillLevel, Score, TaskType, SocialCause
 from marketplace.models.proj import (
-    ProjectRole, ProjRole, VolunteerApplication, ProjectScope,
-    TaskStatus, ProjectComment, ProjectTaskRole, ProjectTaskReview,
+    Project, ProjectRole, ProjRole, VolunteerApplication, ProjectScope,
+    TaskRole, TaskStatus, ProjectComment, ProjectTask, ProjectTaskRole, ProjectTaskReview,
     ProjectStatus, TaskRequirementImportance, ProjectTaskRequirement,
+    ProjectLog, ProjectLogType, ProjectLogSource, ProjectDiscussionChannel,
+    ProjectBlueprint, ProjectBlueprintTask, ProjectBlueprintChannel,
+)
+from marketplace.models.news import FeaturedContent, PlatformStatsCounter
+from marketplace.models.user import (
+    SignupCodeType, SignupCode, Skill, UserBadge, UserNotification, BadgeType, BadgeTier, VolunteerProfile, NotificationSource,
 )
-from marketplace.models.user import SignupCodeType, SignupCode, Skill
+from marketplace.domain.featured import FeaturedContentService
+from marketplace.domain.stats import PlatformStatsService, VolunteerStatsService, BADGE_NAMES, PLATFORM_STATS_CACHE_KEY
+from marketplace.views.common import KeysetPaginator
+from marketplace.views.org import get_organization
+from marketplace.views.proj import get_project, get_project_task, project_getter
 
 from marketplace.tests.domain.common import (
     example_organization_user, example_staff_user, example_volunteer_user,
@@ -21,6 +37,10 @@ from marketplace.tests.domain.common import (
 )
 
 
+def newest_project_scorer(projects):
+    return projects.order_by('-id')
+
+
 class ProjectTestCase(TestCase):
 
     owner_user = None
@@ -128,6 +148,178 @@ class ProjectTestCase(TestCase):
         self.assertEqual(ProjectService.get_featured_project(), self.project)
         self.assertEqual(list(ProjectService.get_user_projects_in_draft_status(self.owner_user)), [])
 
+    def test_project_search(self):
+        skill = Skill()
+        skill.area = "Data"
+        skill.name = "Geospatial analysis"
+        skill.save()
+
+        OrganizationService.create_project(self.owner_user, self.organization.id, self.project)
+        ProjectService.publish_project(self.owner_user, self.project.id, self.project)
+        task = ProjectTaskService.get_all_tasks(self.owner_user, self.project).first()
+        ProjectTaskService.set_task_requirements(self.owner_user, self.project.id, task.id,
+            {str(skill.id): SkillLevel.EXPERT, "i" + str(skill.id): TaskRequirementImportance.REQUIRED})
+
+        other_project = example_project()
+        other_project.name = "Water quality monitoring"
+        other_project.short_summary = "Predicting the demo sites that need inspections"
+        OrganizationService.create_project(self.owner_user, self.organization.id, other_project)
+        ProjectService.publish_project(self.owner_user, other_project.id, other_project)
+
+        with self.subTest(stage='Search by keywords'):
+            self.assertEqual(list(ProjectService.get_all_public_projects(self.owner_user, {'keywords': 'water'})), [other_project])
+            self.assertEqual(list(ProjectService.get_all_public_projects(self.owner_user, {'keywords': 'monitor'})), [other_project])
+            self.assertEqual(list(ProjectService.get_all_public_projects(self.owner_user, {'keywords': 'nothing'})), [])
+
+        with self.subTest(stage='Search by field'):
+            self.assertEqual(list(ProjectService.get_all_public_projects(self.owner_user, {'projname': 'demo'})), [self.project])
+            self.assertEqual(list(ProjectService.get_all_public_projects(self.owner_user, {'skills': 'geospatial'})), [self.project])
+            self.assertEqual(set(ProjectService.get_all_public_projects(self.owner_user, {'orgname': 'organization'})), set([self.project, other_project]))
+
+        with self.subTest(stage='Results are ranked'):
+            self.assertEqual(list(ProjectService.get_all_public_projects(self.owner_user, {'keywords': 'demo'})), [self.project, other_project])
+
+        with self.subTest(stage='Index is updated on save'):
+            self.project.name = "Renamed project"
+            ProjectService.save_project(self.owner_user, self.project.id, self.project)
+            self.assertEqual(list(ProjectService.get_all_public_projects(self.owner_user, {'projname': 'renamed'})), [self.project])
+            self.assertEqual(list(ProjectService.get_all_public_projects(self.owner_user, {'projname': 'demo'})), [])
+            self.organization.name = "Renamed organization"
+            OrganizationService.save_organization_info(self.owner_user, self.organization.id, self.organization)
+            self.assertEqual(set(ProjectService.get_all_public_projects(self.owner_user, {'orgname': 'organization renamed'})), set([self.project, other_project]))
+
+    def test_project_facet_counts(self):
+        OrganizationService.create_project(self.owner_user, self.organization.id, self.project)
+        ProjectService.publish_project(self.owner_user, self.project.id, self.project)
+        ProjectService.save_project_social_causes(self.owner_user, self.project.id, self.project,
+            QueryDict('id_social_causes={0}&id_social_causes={1}'.format(SocialCause.HEALTH, SocialCause.EDUCATION)))
+        other_project = example_project()
+        other_project.name = "Water quality monitoring"
+        OrganizationService.create_project(self.owner_user, self.organization.id, other_project)
+        ProjectService.publish_project(self.owner_user, other_project.id, other_project)
+        ProjectService.save_project_social_causes(self.owner_user, other_project.id, other_project,
+            QueryDict('id_social_causes={0}'.format(SocialCause.HEALTH)))
+        draft_project = example_project()
+        OrganizationService.create_project(self.owner_user, self.organization.id, draft_project)
+
+        with self.subTest(stage='Counts come from a single query'):
+            with self.assertNumQueries(1):
+                projects, facet_counts = ProjectService.get_all_public_projects(self.owner_user, with_facet_counts=True)
+            self.assertEqual(facet_counts['social_cause']['health'], 2)
+            self.assertEqual(facet_counts['social_cause']['education'], 1)
+            self.assertEqual(facet_counts['social_cause']['energy'], 0)
+            self.assertEqual(facet_counts['project_status'], {'new': 2, 'in_progress': 0, 'completed': 0})
+
+        with self.subTest(stage='Counts follow the search'):
+            projects, facet_counts = ProjectService.get_all_public_projects(self.owner_user, {'keywords': 'water', 'social_cause': ['health']}, with_facet_counts=True)
+            self.assertEqual(list(projects), [other_project])
+            self.assertEqual(facet_counts['social_cause']['health'], 1)
+            self.assertEqual(facet_counts['social_cause']['education'], 0)
+            self.assertEqual(facet_counts['project_status']['new'], 1)
+            projects, facet_counts = ProjectService.get_all_public_projects(self.owner_user, {'social_cause': ['education']}, with_facet_counts=True)
+            self.assertEqual(list(projects), [self.project])
+            self.assertEqual(facet_counts['social_cause']['health'], 2)
+            self.assertEqual(facet_counts['project_status']['new'], 1)
+
+        with self.subTest(stage='Equivalent searches share the cache'):
+            with self.assertNumQueries(0):
+                ProjectService.get_all_public_projects(self.owner_user, {'social_cause': 'education', 'keywords': ' '}, with_facet_counts=True)
+            with self.assertNumQueries(0):
+                ProjectService.get_all_public_projects(self.owner_user, {'keywords': 'Water!', 'social_cause': ['health']}, with_facet_counts=True)
+
+        with self.subTest(stage='Counts are invalidated when projects change'):
+            ProjectService.publish_project(self.owner_user, draft_project.id, draft_project)
+            projects, facet_counts = ProjectService.get_all_public_projects(self.owner_user, with_facet_counts=True)
+            self.assertEqual(facet_counts['project_status']['new'], 3)
+
+    def test_keyset_pagination(self):
+        OrganizationService.create_project(self.owner_user, self.organization.id, self.project)
+        for i in range(7):
+            ProjectService.add_project_change(self.owner_user, self.project, ProjectLogType.EDIT, ProjectLogSource.INFORMATION, self.project.id, "Change " + str(i))
+        project_changes = list(ProjectService.get_project_changes(self.owner_user, self.project).order_by('-change_date', '-id'))
+        # Some of the changes share the same date, so ties are broken by id
+        paginator = KeysetPaginator(ProjectService.get_project_changes(self.owner_user, self.project), 3)
+
+        with self.subTest(stage='Walk forwards'):
+            pages = []
+            cursor = None
+            while True:
+                with self.assertNumQueries(1):
+                    page = paginator.get_page(cursor)
+                pages.append(page)
+                if not page.has_next():
+                    break
+                cursor = page.next_cursor
+            self.assertGreater(len(pages), 2)
+            self.assertTrue(all(len(page) == 3 for page in pages[:-1]))
+            self.assertEqual([change for page in pages for change in page], project_changes)
+            self.assertFalse(pages[0].has_previous())
+            self.assertTrue(pages[-1].has_previous())
+
+        with self.subTest(stage='Walk backwards'):
+            page = pages[-1]
+            for previous_page in reversed(pages[:-1]):
+                page = paginator.get_page(page.previous_cursor)
+                self.assertEqual(list(page), list(previous_page))
+                self.assertTrue(page.has_next())
+            self.assertFalse(page.has_previous())
+
+        with self.subTest(stage='Optional count and invalid cursors'):
+            page = KeysetPaginator(ProjectLog.objects.filter(project=self.project).order_by('-change_date'), 3, with_count=True).get_page('not a cursor')
+            self.assertEqual(page.count, len(project_changes))
+            self.assertEqual(list(page), project_changes[:3])
+            self.assertIsNone(pages[0].count)
+
+    def test_fetch_profiles(self):
+        skill = Skill.objects.create(area="Data", name="Geospatial analysis")
+        for i in range(4):
+            project = example_project()
+            project.name = "Fetched project " + str(i)
+            OrganizationService.create_project(self.owner_user, self.organization.id, project)
+            ProjectService.publish_project(self.owner_user, project.id, project)
+            ProjectService.save_project_social_causes(self.owner_user, project.id, project,
+                QueryDict('id_social_causes={0}&id_social_causes={1}'.format(SocialCause.HEALTH, SocialCause.EDUCATION)))
+            for task in ProjectTaskService.get_all_tasks(self.owner_user, project):
+                ProjectTaskService.set_task_requirements(self.owner_user, project.id, task.id,
+                    {str(skill.id): SkillLevel.EXPERT, "i" + str(skill.id): TaskRequirementImportance.REQUIRED})
+
+        def render_projects(page_size):
+            projects = ProjectService.get_all_public_projects(self.owner_user, fetch_profile='list')
+            return [(project.organization.name, [sc.get_social_cause_display() for sc in project.projectsocialcause_set.all()])
+                    for project in KeysetPaginator(projects, page_size).get_page(None)]
+
+        def render_tasks(project):
+            return [[requirement.skill.name for requirement in task.projecttaskrequirement_set.all()]
+                    for task in ProjectTaskService.get_public_tasks(self.owner_user, project, fetch_profile='info')]
+
+        for page_size in [1, 4]:
+            with self.subTest(page_size=page_size):
+                with self.assertNumQueries(2):
+                    self.assertEqual(len(render_projects(page_size)), page_size)
+                with self.assertNumQueries(2):
+                    self.assertEqual(render_tasks(project)[0], ["Geospatial analysis"])
+        with self.assertRaises(KeyError):
+            ProjectService.get_all_public_projects(self.owner_user, fetch_profile='unknown')
+
+    def test_request_identity_map(self):
+        OrganizationService.create_project(self.owner_user, self.organization.id, self.project)
+        task = ProjectTaskService.get_all_tasks(self.owner_user, self.project).first()
+        request = RequestFactory().get('/')
+        request.user = self.owner_user
+
+        with self.assertNumQueries(2):
+            project = get_project(request, self.project.id)
+        self.assertEqual(project.follower_count, 0)
+        with self.assertNumQueries(1):
+            project_task = get_project_task(request, str(self.project.id), task.id)
+        with self.assertNumQueries(0):
+            self.assertIs(project_getter(request, proj_pk=self.project.id, task_pk=task.id), project)
+            self.assertIs(project_task.project, project)
+            self.assertIs(get_project_task(request, self.project.id, task.id), project_task)
+            self.assertIs(get_organization(request, self.organization.id), project.organization)
+        with self.assertRaises(Http404):
+            get_project(request, 0)
+
     def create_standard_project_structure(self, publish_project=True, accept_volunteers=True):
         OrganizationService.create_project(self.owner_user, self.organization.id, self.project)
         if publish_project:
@@ -285,6 +477,30 @@ class ProjectTestCase(TestCase):
             with self.assertRaisesMessage(ValueError, ''):
                 ProjectService.delete_project_role(self.owner_user, self.project.id, owner_user_role)
 
+    def test_project_role_snapshot(self):
+        scoping_task, project_management_task, domain_work_task, qa_task = self.create_standard_project_structure()
+
+        # Every role predicate is answered from a single query per project
+        with self.subTest(stage='Single query per project'):
+            self.scoping_user._project_role_snapshots = None
+            with self.assertNumQueries(1):
+                ProjectService.user_is_project_owner(self.scoping_user, self.project)
+                ProjectService.user_is_project_member(self.scoping_user, self.project)
+                ProjectService.user_is_project_official(self.scoping_user, self.project)
+                ProjectService.user_is_task_editor(self.scoping_user, self.project)
+                ProjectService.user_is_project_commenter(self.scoping_user, self.project)
+                ProjectTaskService.user_is_task_volunteer(self.scoping_user, scoping_task)
+
+        # Role changes made through the domain layer invalidate the snapshot,
+        # even if they are made through a different instance of the user
+        with self.subTest(stage='Invalidate on role changes'):
+            self.assertTrue(ProjectService.user_is_project_scoper(self.scoping_user, self.project))
+            scoping_role = ProjectTaskRole.objects.get(user=self.scoping_user, task=scoping_task)
+            ProjectTaskService.delete_project_task_role(self.owner_user, self.project.id, scoping_task.id, scoping_role)
+            self.assertFalse(ProjectService.user_is_project_scoper(self.scoping_user, self.project))
+            self.assertFalse(ProjectTaskService.user_is_task_volunteer(self.scoping_user, scoping_task))
+            self.assertFalse(ProjectService.user_is_task_editor(self.scoping_user, self.project))
+
 
     def test_project_followers(self):
         OrganizationService.create_project(self.owner_user, self.organization.id, self.project)
@@ -315,6 +531,145 @@ class ProjectTestCase(TestCase):
             self.assertEqual(set(ProjectService.get_public_notification_users(self.owner_user, self.project.id)), set([self.owner_user]))
 
 
+    def test_project_counters(self):
+        scoping_task, project_management_task, domain_work_task, qa_task = self.create_standard_project_structure()
+
+        def get_counters():
+            project = Project.objects.get(pk=self.project.id)
+            return (project.follower_count, project.volunteer_count,
+                    ProjectTask.objects.get(pk=scoping_task.id).volunteer_count, ProjectTask.objects.get(pk=domain_work_task.id).volunteer_count)
+
+        with self.subTest(stage='Counters follow the accepted volunteers and followers'):
+            self.assertEqual(get_counters(), (0, 4, 1, 1))
+            for user in [self.owner_user, self.volunteer_user, self.owner_user]:
+                ProjectService.toggle_follower(user, self.project.id)
+            self.assertEqual(get_counters(), (1, 4, 1, 1))
+            self.assertEqual(ProjectService.get_featured_project(), self.project)
+
+        with self.subTest(stage='Saving a stale instance keeps the counters'):
+            stale_project = Project.objects.get(pk=self.project.id)
+            ProjectService.toggle_follower(self.staff_user, self.project.id)
+            stale_project.name = "Renamed project"
+            stale_project.save()
+            self.assertEqual(get_counters(), (2, 4, 1, 1))
+            self.assertEqual(Project.objects.get(pk=self.project.id).name, "Renamed project")
+
+        with self.subTest(stage='Saving a deferred instance only writes its loaded fields'):
+            deferred_project = Project.objects.only('name').get(pk=self.project.id)
+            deferred_project.name = "Deferred project"
+            with self.assertNumQueries(1):
+                deferred_project.save()
+            self.assertEqual(Project.objects.get(pk=self.project.id).name, "Deferred project")
+            self.assertEqual(get_counters(), (2, 4, 1, 1))
+
+        with self.subTest(stage='Counters follow the removed volunteers'):
+            task_role = ProjectTaskRole.objects.get(task=domain_work_task, role=TaskRole.VOLUNTEER)
+            ProjectTaskService.delete_project_task_role(self.owner_user, self.project.id, domain_work_task.id, task_role)
+            self.assertEqual(get_counters(), (2, 3, 1, 0))
+
+        with self.subTest(stage='Reconcile drifted counters'):
+            self.assertEqual(ProjectService.reconcile_counters(), (0, 0, 0))
+            Project.objects.filter(pk=self.project.id).update(follower_count=10)
+            ProjectTask.objects.filter(pk=scoping_task.id).update(volunteer_count=5)
+            self.assertEqual(ProjectService.reconcile_counters(), (1, 0, 1))
+            self.assertEqual(get_counters(), (2, 3, 1, 0))
+
+        with self.subTest(stage='Saving an instance whose row was deleted inserts it'):
+            deleted_task = ProjectTask.objects.get(pk=qa_task.id)
+            ProjectTask.objects.filter(pk=qa_task.id).delete()
+            deleted_task.save()
+            self.assertEqual(ProjectTask.objects.get(pk=qa_task.id).name, deleted_task.name)
+
+    def test_featured_content(self):
+        self.create_standard_project_structure()
+        other_project = example_project()
+        other_project.name = "Other project"
+        OrganizationService.create_project(self.owner_user, self.organization.id, other_project)
+        ProjectService.publish_project(self.owner_user, other_project.id, other_project)
+
+        with self.subTest(stage='The stored pick is served without scoring'):
+            self.assertEqual(ProjectService.get_featured_project(), self.project)
+            with self.assertNumQueries(2):
+                self.assertEqual(ProjectService.get_featured_project(), self.project)
+
+        with self.settings(FEATURED_PROJECT_SCORER='marketplace.tests.domain.test_proj.newest_project_scorer'):
+            with self.subTest(stage='The scorer is pluggable'):
+                self.assertEqual(ProjectService.get_featured_project(), self.project)
+                FeaturedContentService.refresh_picks(['project'])
+                self.assertEqual(ProjectService.get_featured_project(), other_project)
+
+            with self.subTest(stage='A pick that is no longer eligible is replaced'):
+                Project.objects.filter(pk=other_project.id).update(status=ProjectStatus.DELETED)
+                with self.assertNumQueries(4):
+                    self.assertEqual(ProjectService.get_featured_project(), self.project)
+                self.assertEqual(FeaturedContent.objects.get().project_id, other_project.id)
+                FeaturedContentService.refresh_picks(['project'])
+                self.assertEqual(FeaturedContent.objects.get().project_id, self.project.id)
+
+            with self.subTest(stage='Old picks are served without scoring'):
+                FeaturedContent.objects.update(computed_date=timezone.now() - timedelta(days=30))
+                with self.assertNumQueries(2):
+                    self.assertEqual(ProjectService.get_featured_project(), self.project)
+
+    def test_platform_stats(self):
+        scoping_task, project_management_task, domain_work_task, qa_task = self.create_standard_project_structure()
+
+        def get_stats():
+            cache.delete(PLATFORM_STATS_CACHE_KEY)
+            return PlatformStatsService.get_platform_stats()
+        expected_stats = {
+            'projects_in_design': Project.objects.filter(status=ProjectStatus.DESIGN).count(),
+            'projects_this_month': Project.objects.count(),
+            'volunteers_this_month': VolunteerProfile.objects.count(),
+        }
+
+        with self.subTest(stage='Counters follow the domain events'):
+            self.assertEqual(get_stats(), expected_stats)
+            self.assertEqual(expected_stats['projects_in_design'], 1)
+            with self.assertNumQueries(0):
+                PlatformStatsService.get_platform_stats()
+
+        with self.subTest(stage='Status changes move the project between buckets'):
+            task_review = ProjectTaskReview()
+            task_review.volunteer_comment = "Completed."
+            task_review.volunteer_effort_hours = 1
+            ProjectTaskService.mark_task_as_completed(self.scoping_user, self.project.id, scoping_task.id, task_review)
+            ProjectTaskService.accept_task_review(self.owner_user, self.project.id, scoping_task.id, task_review)
+            self.assertNotEqual(Project.objects.get(pk=self.project.id).status, ProjectStatus.DESIGN)
+            self.assertEqual(get_stats()['projects_in_design'], 0)
+
+        with self.subTest(stage='Rebuild drifted counters'):
+            PlatformStatsCounter.objects.update(value=10)
+            PlatformStatsService.rebuild_counters()
+            self.assertEqual(get_stats(), dict(expected_stats, projects_in_design=0))
+
+    def test_project_blueprints(self):
+        OrganizationService.create_project(self.owner_user, self.organization.id, self.project)
+
+        with self.subTest(stage='Default blueprint'):
+            self.assertEqual([(task.name, task.type) for task in ProjectTask.objects.filter(project=self.project).order_by('id')],
+                             [(task['name'], task['type']) for task in DEFAULT_PROJECT_BLUEPRINT['tasks']])
+            self.assertEqual(ProjectDiscussionChannel.objects.filter(project=self.project).count(), 6)
+            self.assertEqual(set(ProjectDiscussionChannel.objects.filter(project=self.project, related_task__isnull=False).values_list('related_task__name', 'name')),
+                             set((task['name'], task['channel_name']) for task in DEFAULT_PROJECT_BLUEPRINT['tasks']))
+
+        with self.subTest(stage='Organization blueprint'):
+            blueprint = ProjectBlueprint.objects.create(organization=self.organization, scope_version_notes="Blueprint scope")
+            ProjectBlueprintTask.objects.create(blueprint=blueprint, position=2, name="Data cleaning", short_summary="Clean the data",
+                                                description="Cleaning", onboarding_instructions="None", type=TaskType.DOMAIN_WORK_TASK)
+            ProjectBlueprintTask.objects.create(blueprint=blueprint, position=1, name="Scoping", short_summary="Scope the project",
+                                                description="Scoping", onboarding_instructions="None", type=TaskType.SCOPING_TASK,
+                                                stage=TaskStatus.NOT_STARTED, channel_name="Scoping talk")
+            ProjectBlueprintChannel.objects.create(blueprint=blueprint, position=1, name="Everything")
+            project = example_project()
+            project.name = "Blueprint project"
+            OrganizationService.create_project(self.owner_user, self.organization.id, project)
+            self.assertEqual(list(ProjectTask.objects.filter(project=project).order_by('id').values_list('name', 'type', 'stage')),
+                             [("Scoping", TaskType.SCOPING_TASK, TaskStatus.NOT_STARTED), ("Data cleaning", TaskType.DOMAIN_WORK_TASK, TaskStatus.DRAFT)])
+            self.assertEqual(set(ProjectDiscussionChannel.objects.filter(project=project).values_list('name', 'related_task__name')),
+                             {("Everything", None), ("Scoping talk", "Scoping")})
+            self.assertEqual(ProjectScope.objects.get(project=project).version_notes, "Blueprint scope")
+
     def test_project_scopes(self):
         self.create_standard_project_structure()
 
@@ -721,6 +1076,22 @@ class ProjectTestCase(TestCase):
                         self.assertEqual(new_requirements,
                             {skill1.area: [{'system_skill': skill1, 'task_requirement': saved_task_requirement}],
                              skill2.area: [{'system_skill': skill2, 'task_requirement': None}]})
+            with self.subTest(stage='Unchanged task requirements'):
+                notification_count = UserNotification.objects.count()
+                change_count = ProjectLog.objects.count()
+                with self.assertNumQueries(4):
+                    ProjectTaskService.set_task_requirements(self.owner_user, self.project.id, task.id, post_object)
+                self.assertEqual(UserNotification.objects.count(), notification_count)
+                self.assertEqual(ProjectLog.objects.count(), change_count)
+            with self.subTest(stage='Skills missing from the form'):
+                ProjectTaskService.set_task_requirements(self.owner_user, self.project.id, task.id,
+                                                         {str(skill1.id): SkillLevel.BEGINNER})
+                self.assertEqual(ProjectTaskRequirement.objects.get(task=task, skill=skill1).level, SkillLevel.BEGINNER)
+                # Requirements are only removed for the skills in the form
+                ProjectTaskService.set_task_requirements(self.owner_user, self.project.id, task.id,
+                                                         {str(skill2.id): SkillLevel.EXPERT})
+                self.assertEqual(set(ProjectTaskRequirement.objects.filter(task=task).values_list('skill', flat=True)),
+                                 set([skill1.id, skill2.id]))
 
     def test_project_status(self):
         scoping_task, project_management_task, domain_work_task, qa_task = self.create_standard_project_structure(False, False)
@@ -804,6 +1175,85 @@ class ProjectTestCase(TestCase):
         project_changes += 1
         self.assertEqual(len(ProjectService.get_project_changes(self.owner_user, self.project)), project_changes)
 
+    def test_volunteer_stats(self):
+        scoping_task, project_management_task, domain_work_task, qa_task = self.create_standard_project_structure(True, False)
+        scoping_application = scoping_task.volunteerapplication_set.first()
+        ProjectTaskService.accept_volunteer(self.owner_user, self.project.id, scoping_task.id, scoping_application)
+        ProjectTask.objects.filter(pk=scoping_task.pk).update(estimated_start_date=date(2019, 1, 1), estimated_end_date=date(2019, 2, 1),
+                                                              actual_start_date=date(2019, 1, 1))
+        task_review = ProjectTaskReview()
+        task_review.volunteer_comment = "Completed."
+        task_review.volunteer_effort_hours = 1
+        ProjectTaskService.mark_task_as_completed(self.scoping_user, self.project.id, scoping_task.id, task_review)
+        task_review.review_score = 4
+        ProjectTaskService.accept_task_review(self.owner_user, self.project.id, scoping_task.id, task_review)
+        ProjectTask.objects.filter(pk=scoping_task.pk).update(actual_end_date=date(2019, 1, 15))
+
+        with self.subTest(stage='Reviews update the stats of the task volunteers'):
+            profile = VolunteerProfile.objects.get(user=self.scoping_user)
+            self.assertEqual(profile.completed_task_count, 1)
+            self.assertEqual(profile.average_review_score, 4)
+            self.assertEqual(profile.ahead_of_time_task_ratio, 0.0)
+            self.assertEqual(dict(UserBadge.objects.filter(user=self.scoping_user, type__in=BADGE_NAMES).values_list('type', 'tier')), {
+                BadgeType.NUMBER_OF_PROJECTS: BadgeTier.BASIC,
+                BadgeType.REVIEW_SCORE: BadgeTier.MASTER,
+            })
+
+        with self.subTest(stage='Incremental update'):
+            ProjectTask.objects.filter(pk=scoping_task.pk).update(actual_end_date=date(2019, 1, 15))
+            VolunteerStatsService.mark_stats_pending([self.scoping_user])
+            self.assertEqual(VolunteerStatsService.recompute_pending_stats(), (1, 1, 1))
+            profile = VolunteerProfile.objects.get(user=self.scoping_user)
+            self.assertFalse(profile.stats_pending)
+            self.assertEqual(profile.ahead_of_time_task_ratio, 1.0)
+            self.assertEqual(UserBadge.objects.get(user=self.scoping_user, type=BadgeType.WORK_SPEED).tier, BadgeTier.MASTER)
+            self.assertEqual(VolunteerStatsService.recompute_pending_stats(), (0, 0, 0))
+
+        with self.subTest(stage='Full update'):
+            VolunteerStatsService.recompute_stats()
+            self.assertEqual(VolunteerStatsService.recompute_stats(), (0, 0))
+            ProjectTask.objects.filter(pk=scoping_task.pk).update(actual_end_date=date(2019, 3, 1))
+            with self.assertNumQueries(22):
+                self.assertEqual(VolunteerStatsService.recompute_stats(), (1, 1))
+            self.assertFalse(UserBadge.objects.filter(user=self.scoping_user, type=BadgeType.WORK_SPEED).exists())
+
+# The notifications of a new project are only added once its transaction is
+# committed, which never happens in the transaction of a TestCase.
+class ProjectCreationNotificationTestCase(TransactionTestCase):
+
+    def setUp(self):
+        self.owner_user = example_organization_user()
+        marketplace.user.add_user(self.owner_user, 'organization')
+        self.staff_user = example_staff_user()
+        marketplace.user.add_user(self.staff_user, 'organization')
+        self.organization = example_organization()
+        OrganizationService.create_organization(self.owner_user, self.organization)
+        OrganizationService.add_staff_member_by_id(self.owner_user, self.organization.id, self.staff_user.id, None)
+
+    def get_project_notifications(self, user):
+        return UserNotification.objects.filter(user=user, source=NotificationSource.PROJECT).order_by('id')
+
+    def test_create_project_notifications(self):
+        with self.subTest(stage='Members and the creator are notified after the commit'):
+            project = example_project()
+            with transaction.atomic():
+                OrganizationService.create_project(self.owner_user, self.organization.id, project)
+                self.assertFalse(UserNotification.objects.filter(source=NotificationSource.PROJECT).exists())
+            self.assertEqual([notification.target_id for notification in self.get_project_notifications(self.staff_user)], [project.id])
+            owner_notifications = self.get_project_notifications(self.owner_user)
+            self.assertEqual([notification.target_id for notification in owner_notifications], [project.id, project.id])
+            self.assertIn("made project administrator", owner_notifications[1].notification_description)
+
+        with self.subTest(stage='Nobody is notified when the creation is rolled back'):
+            try:
+                with transaction.atomic():
+                    OrganizationService.create_project(self.owner_user, self.organization.id, example_project())
+                    raise ValueError()
+            except ValueError:
+                pass
+            self.assertEqual(UserNotification.objects.filter(source=NotificationSource.PROJECT).count(), 3)
+
+
 # TODO check that notifications are generated correctly on every action
 
 # TODO check that all the paths within ProjectTaskService.save_task_internal are covered by tests
@@ -7,8 +7,9 @@ from marketplace.domain import marketplace
 from marketplace.domain.user import UserService
 
 from marketplace.models.common import SkillLevel
+from marketplace.models.common import ReviewStatus
 from marketplace.models.user import (
-    SignupCodeType, SignupCode, User, Skill, VolunteerSkill, )
+    SignupCodeType, SignupCode, User, Skill, VolunteerSkill, VolunteerProfile, BadgeType, )
 
 
 class UserTestCase(TestCase):
@@ -196,8 +197,36 @@ class UserTestCase(TestCase):
             (self.code_repeated_1, self.code_repeated_2),
         )
 
+    def test_volunteer_leaderboards(self):
+        volunteers = []
+        for i in range(3):
+            volunteer_user = User()
+            volunteer_user.username = "LeaderUser{0}".format(i)
+            volunteer_user.email = "leader{0}@email.com".format(i)
+            if i < 2:
+                volunteer_user.special_code = "AUTOMATICVOLUNTEER"
+            marketplace.user.add_user(volunteer_user, 'volunteer')
+            VolunteerProfile.objects.filter(user=volunteer_user).update(completed_task_count=i + 1, average_review_score=5 - i)
+            volunteers.append(volunteer_user)
+
+        def get_boards():
+            return {board['badge'].type: board['data'] for board in UserService.get_volunteer_leaderboards(AnonymousUser())}
+
+        with self.subTest(stage='Leaderboards are built on the first read'):
+            boards = get_boards()
+            self.assertEqual(boards[BadgeType.REVIEW_SCORE], [volunteers[0], volunteers[1]])
+            self.assertEqual(boards[BadgeType.NUMBER_OF_PROJECTS], [volunteers[1], volunteers[0]])
+            with self.assertNumQueries(2):
+                get_boards()
+
+        with self.subTest(stage='Leaderboards are refreshed when volunteers are reviewed'):
+            self.assertEqual(volunteers[2].volunteerprofile.volunteer_status, ReviewStatus.NEW)
+            UserService.accept_volunteer_profile(self.dssg_staff_user, volunteers[2].volunteerprofile.id)
+            self.assertEqual(get_boards()[BadgeType.NUMBER_OF_PROJECTS], [volunteers[2], volunteers[1], volunteers[0]])
+            UserService.reject_volunteer_profile(self.dssg_staff_user, volunteers[1].volunteerprofile.id)
+            self.assertEqual(get_boards()[BadgeType.REVIEW_SCORE], [volunteers[0], volunteers[2]])
+
 # TODO test these methods:
 # UserService.get_user_todos(request_user, user)
-# UserService.get_volunteer_leaderboards(request_user)
 # UserService.get_featured_volunteer()
 # marketplace.user.verify_captcha(captcha_response)
@@ -0,0 +1,92 @@
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from marketplace.domain import marketplace
+from marketplace.domain.org import OrganizationService
+from marketplace.domain.proj import ProjectService, ProjectTaskService
+from marketplace.middleware import get_query_fingerprint
+
+from marketplace.models.common import SkillLevel, SocialCause
+from marketplace.models.proj import ProjectComment, TaskRequirementImportance
+from marketplace.models.user import SignupCodeType, SignupCode, Skill
+
+from marketplace.tests.domain.common import (
+    example_organization_user, example_volunteer_user, example_organization, example_project,
+)
+
+
+@override_settings(QUERY_INSPECTION_ENABLED=True)
+class QueryBudgetTestCase(TestCase):
+
+    def setUp(self):
+        code = SignupCode()
+        code.name = "AUTOMATICVOLUNTEER"
+        code.type = SignupCodeType.VOLUNTEER_AUTOMATIC_ACCEPT
+        code.save()
+
+        self.owner_user = example_organization_user()
+        marketplace.user.add_user(self.owner_user, 'organization')
+        self.organization = example_organization()
+        OrganizationService.create_organization(self.owner_user, self.organization)
+        skill = Skill.objects.create(area="Data", name="Geospatial analysis")
+
+        # Every page lists several rows, so that a query run once per row
+        # shows up as a repeated fingerprint
+        self.volunteers = []
+        for i in range(6):
+            volunteer_user = example_volunteer_user(username="volunteer{0}".format(i), email="volunteer{0}@email.com".format(i),
+                                                    special_code="AUTOMATICVOLUNTEER")
+            marketplace.user.add_user(volunteer_user, 'volunteer')
+            self.volunteers.append(volunteer_user)
+        self.projects = []
+        for i in range(6):
+            project = example_project()
+            project.name = "Budget project {0}".format(i)
+            OrganizationService.create_project(self.owner_user, self.organization.id, project)
+            ProjectService.publish_project(self.owner_user, project.id, project)
+            ProjectService.save_project_social_causes(self.owner_user, project.id, project,
+                QueryDict('id_social_causes={0}&id_social_causes={1}'.format(SocialCause.HEALTH, SocialCause.EDUCATION)))
+            for task in ProjectTaskService.get_all_tasks(self.owner_user, project):
+                ProjectTaskService.set_task_requirements(self.owner_user, project.id, task.id,
+                    {str(skill.id): SkillLevel.EXPERT, "i" + str(skill.id): TaskRequirementImportance.REQUIRED})
+            self.projects.append(project)
+
+    def assertWithinBudget(self, url_name, *args):
+        response = self.client.get(reverse(url_name, args=args))
+        self.assertEqual(response.status_code, 200)
+        report = response.query_report
+        self.assertIsNotNone(report.budget, 'No query budget declared for ' + url_name)
+        self.assertLessEqual(report.count, report.budget, 'Over the query budget: ' + response['X-Query-Stats'])
+        self.assertEqual(report.get_repeated_queries(), [])
+
+    def test_query_budgets(self):
+        for user in [None, self.owner_user, self.volunteers[0]]:
+            with self.subTest(user=user):
+                if user:
+                    self.client.force_login(user)
+                self.assertWithinBudget('marketplace:proj_list')
+                self.assertWithinBudget('marketplace:proj_info', self.projects[0].id)
+                self.assertWithinBudget('marketplace:volunteer_list')
+                self.assertWithinBudget('marketplace:org_info', self.organization.id)
+
+    @override_settings(LIVE_UPDATES_TIMEOUT=0)
+    def test_live_update_budgets(self):
+        project = self.projects[0]
+        channel = ProjectService.get_project_channels(self.owner_user, project)[0]
+        for i in range(6):
+            comment = ProjectComment(comment="Comment {0}".format(i))
+            ProjectService.add_project_comment(self.owner_user, project.id, channel.id, comment)
+        self.client.force_login(self.owner_user)
+        self.assertWithinBudget('marketplace:proj_discussion_updates', project.id, channel.id)
+        self.assertWithinBudget('marketplace:user_notification_updates')
+        response = self.client.get(reverse('marketplace:proj_discussion_updates', args=[project.id, channel.id]), {'after': comment.id})
+        self.assertEqual(response.json(), {'html': '', 'last_id': comment.id, 'retry': 0, 'reload': False})
+
+    def test_query_fingerprints(self):
+        self.assertEqual(get_query_fingerprint('SELECT * FROM t WHERE id = %s AND name = \'a\''),
+                         get_query_fingerprint('SELECT *  FROM t WHERE id = 12 AND name = \'b\''))
+        self.assertEqual(get_query_fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+                         get_query_fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'))
+        self.assertNotEqual(get_query_fingerprint('SELECT * FROM t WHERE id = %s'),
+                            get_query_fingerprint('SELECT * FROM u WHERE id = %s'))
@@ -0,0 +1,66 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from marketplace.domain import marketplace
+from marketplace.domain.notifications import NotificationService
+from marketplace.domain.org import OrganizationService
+from marketplace.domain.proj import ProjectTaskService
+from marketplace.models.org import OrganizationMembershipRequest
+from marketplace.models.proj import VolunteerApplication
+from marketplace.models.user import (
+    NotificationSeverity, NotificationSource, SignupCodeType, SignupCode, UserNotification,
+)
+from marketplace.views.user import get_urls_for_notifications
+
+from marketplace.tests.domain.common import (
+    example_organization_user, example_volunteer_user, example_organization, example_project,
+)
+
+
+class UserViewsTestCase(TestCase):
+
+    def setUp(self):
+        code = SignupCode()
+        code.name = "AUTOMATICVOLUNTEER"
+        code.type = SignupCodeType.VOLUNTEER_AUTOMATIC_ACCEPT
+        code.save()
+
+        self.volunteer_user = example_volunteer_user(special_code="AUTOMATICVOLUNTEER")
+        marketplace.user.add_user(self.volunteer_user, 'volunteer')
+
+    def test_user_dashboard(self):
+        NotificationService.add_user_notification(self.volunteer_user, "A notification",
+                                                  NotificationSeverity.INFO, NotificationSource.GENERIC, None)
+        self.client.force_login(self.volunteer_user)
+        response = self.client.get(reverse('marketplace:user_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "A notification")
+        # The notifications shown in the dashboard are marked as read once it is rendered
+        self.assertFalse(UserNotification.objects.filter(user=self.volunteer_user, is_read=False).exists())
+
+    def test_notification_urls(self):
+        owner_user = example_organization_user()
+        marketplace.user.add_user(owner_user, 'organization')
+        organization = example_organization()
+        OrganizationService.create_organization(owner_user, organization)
+        project = example_project()
+        OrganizationService.create_project(owner_user, organization.id, project)
+        task = ProjectTaskService.get_all_tasks(owner_user, project)[0]
+        application = VolunteerApplication.objects.create(task=task, volunteer=self.volunteer_user, volunteer_application_letter="Letter")
+        membership_request = OrganizationMembershipRequest.objects.create(organization=organization, user=self.volunteer_user)
+        targets = [
+            (NotificationSource.GENERIC, None, None),
+            (NotificationSource.ORGANIZATION, organization.id, reverse('marketplace:org_info', args=[organization.id])),
+            (NotificationSource.PROJECT, project.id, reverse('marketplace:proj_info', args=[project.id])),
+            (NotificationSource.TASK, task.id, reverse('marketplace:proj_info', args=[project.id])),
+            (NotificationSource.VOLUNTEER_APPLICATION, application.id,
+             reverse('marketplace:proj_volunteer_application_review', args=[project.id, task.id, application.id])),
+            (NotificationSource.ORGANIZATION_MEMBERSHIP_REQUEST, membership_request.id,
+             reverse('marketplace:org_staff_request_review', args=[organization.id, membership_request.id])),
+            (NotificationSource.PROJECT, project.id + 1000, None),
+        ]
+        notifications = [UserNotification(source=source, target_id=target_id) for source, target_id, url in targets]
+        # One query per source type, whatever the number of notifications
+        with self.assertNumQueries(5):
+            urls = get_urls_for_notifications(notifications * 3)
+        self.assertEqual(urls, [url for source, target_id, url in targets] * 3)
@@ -91,6 +91,7 @@ urlpatterns = [
     path('volunteers/', user.volunteer_list_view, name='volunteer_list'),
     path('user/', user.my_user_profile_view, name='my_user_profile'),
     path('user/dashboard/', user.UserHomeView.as_view(), name='user_dashboard'),
+    path('user/dashboard/notifications/read', user.mark_all_notifications_read_view, name='user_notifications_read'),
     path('user/select/', user.select_user_type_after, name='user_type_select'),
     path('user/<int:user_pk>', user.UserProfileView.as_view(), name='user_profile'),
     path('user/<int:user_pk>/edit', user.UserProfileEdit.as_view(), name='user_profile_edit'),
@@ -104,4 +105,6 @@ urlpatterns = [
 
     path('ajax/org/<int:org_pk>/candidates/', org.get_all_users_not_organization_members_json, name='validate_username'),
     path('ajax/org/<int:org_pk>/candidates/<str:query>', org.get_all_users_not_organization_members_json, name='validate_username_do'),
+    path('ajax/user/notifications/', user.notification_updates_view, name='user_notification_updates'),
+    path('ajax/proj/<int:proj_pk>/discussion/<int:channel_pk>/comments/', proj.channel_comment_updates_view, name='proj_discussion_updates'),
 ]
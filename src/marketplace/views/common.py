@@ -1,9 +1,18 @@
+import base64
+import binascii
+import datetime
+import json
+import threading
 from itertools import repeat, zip_longest
 
-from django.http import Http404, HttpResponseRedirect
+from django.conf import settings
+from django.http import Http404, HttpResponseRedirect, JsonResponse
 from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
 from django.urls import reverse, reverse_lazy
 from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
 
 
 def home_view(request):
@@ -31,6 +40,141 @@ def paginate(request, query_set, page_size=25, request_key='page'):
     return paginator.get_page(request.GET.get(request_key, 1))
 
 
+class KeysetCursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder truncates datetimes to milliseconds, and cursors
+        # must keep the exact value to find the rows after it.
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPage():
+    def __init__(self, object_list, next_cursor, previous_cursor, count=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator():
+    """Paginates a queryset using the values of its ordering fields.
+
+    Instead of an OFFSET, each page is requested with an opaque cursor that
+    encodes the ordering values of the last (or first) row of the adjacent
+    page, so every page costs the same no matter how deep it is. The primary
+    key is appended to the ordering to make it unique, and the ordering
+    fields must not be null. Counting all the rows is optional.
+    """
+
+    def __init__(self, query_set, page_size, with_count=False):
+        ordering = list(query_set.query.order_by or query_set.model._meta.ordering)
+        for field in ordering:
+            if not isinstance(field, str) or field == '?':
+                raise ValueError('Keyset pagination requires an ordering by field names')
+        if not any(field.lstrip('-') in ('pk', query_set.model._meta.pk.name) for field in ordering):
+            # Ties are broken in the same direction as the last field so that
+            # a single composite index can serve the whole ordering
+            ordering.append('-pk' if ordering and ordering[-1].startswith('-') else 'pk')
+        self.ordering = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        self.query_set = query_set
+        self.page_size = page_size
+        self.with_count = with_count
+
+    def get_key(self, obj):
+        key = []
+        for field, descending in self.ordering:
+            value = obj
+            for attribute in field.split('__'):
+                value = getattr(value, attribute)
+            key.append(value)
+        return key
+
+    def encode_cursor(self, obj, backwards):
+        cursor = json.dumps({'k': self.get_key(obj), 'b': backwards}, cls=KeysetCursorEncoder)
+        return base64.urlsafe_b64encode(cursor.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            key = cursor['k']
+            backwards = bool(cursor['b'])
+        except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+            return None, False
+        if not isinstance(key, list) or len(key) != len(self.ordering):
+            return None, False
+        return key, backwards
+
+    def get_keyset_filter(self, key, backwards):
+        # (a, b) > (x, y) is expanded as a > x OR (a = x AND b > y), as not
+        # all the databases support row comparisons with mixed directions.
+        keyset_filter = Q()
+        equal_filter = Q()
+        for (field, descending), value in zip(self.ordering, key):
+            lookup = 'lt' if descending != backwards else 'gt'
+            keyset_filter |= equal_filter & Q(**{'{0}__{1}'.format(field, lookup): value})
+            equal_filter &= Q(**{field: value})
+        return keyset_filter
+
+    def get_page(self, cursor=None):
+        key, backwards = self.decode_cursor(cursor) if cursor else (None, False)
+        query_set = self.query_set
+        if key is not None:
+            query_set = query_set.filter(self.get_keyset_filter(key, backwards))
+        if backwards:
+            query_set = query_set.order_by(*[field if descending else '-' + field for field, descending in self.ordering])
+        else:
+            query_set = query_set.order_by(*['-' + field if descending else field for field, descending in self.ordering])
+        # One extra row tells whether there is another page after this one
+        object_list = list(query_set[:self.page_size + 1])
+        has_more = len(object_list) > self.page_size
+        object_list = object_list[:self.page_size]
+        if backwards:
+            object_list.reverse()
+        has_next = (has_more and not backwards) or (backwards and key is not None)
+        has_previous = (has_more and backwards) or (not backwards and key is not None)
+        next_cursor = self.encode_cursor(object_list[-1], False) if has_next and object_list else None
+        previous_cursor = self.encode_cursor(object_list[0], True) if has_previous and object_list else None
+        count = self.query_set.count() if self.with_count else None
+        return KeysetPage(object_list, next_cursor, previous_cursor, count)
+
+
+def keyset_paginate(request, query_set, page_size=25, request_key='page', with_count=False):
+    paginator = KeysetPaginator(query_set, page_size, with_count)
+    return paginator.get_page(request.GET.get(request_key))
+
+
+def get_request_object(request, key, loader):
+    # Identity map scoped to the request: objects loaded by the getters of the
+    # views are kept on the request, so the view, the permission checks and
+    # the templates share one instance instead of querying it again.
+    identity_map = getattr(request, '_identity_map', None)
+    if identity_map is None:
+        identity_map = {}
+        request._identity_map = identity_map
+    if key not in identity_map:
+        identity_map[key] = loader()
+    return identity_map[key]
+
+
 def generic_getter(domain_function, *args):
     try:
         result_object = domain_function(*args)
@@ -40,3 +184,40 @@ def generic_getter(domain_function, *args):
         return result_object
     else:
         raise Http404
+
+
+# Long-poll requests hold a thread of the web worker while they wait, so each
+# worker process holds a bounded number of them. The others are answered right
+# away and told to poll again later.
+held_live_requests = threading.BoundedSemaphore(settings.LIVE_UPDATES_MAX_CONNECTIONS)
+
+def get_live_updates_after(page):
+    # Live updates are only added to the first page of a list, and start
+    # after its newest row
+    if page.previous_cursor:
+        return None
+    return max([row.id for row in page], default=0)
+
+def live_updates_response(request, get_updates, template_name, row_name):
+    # get_updates(after_id, timeout) returns the new rows, newest first. They
+    # are rendered with the template of a single row of the list.
+    try:
+        after_id = int(request.GET.get('after', 0))
+    except ValueError:
+        raise Http404
+    if held_live_requests.acquire(blocking=False):
+        try:
+            rows = get_updates(after_id, settings.LIVE_UPDATES_TIMEOUT)
+        finally:
+            held_live_requests.release()
+        retry = 0
+    else:
+        rows = get_updates(after_id, 0)
+        retry = settings.LIVE_UPDATES_RETRY_DELAY
+    return JsonResponse({
+        'html': ''.join(render_to_string(template_name, {row_name: row}, request) for row in rows),
+        'last_id': max([row.id for row in rows], default=after_id),
+        'retry': retry,
+        # Rows were left out, so the page has to be reloaded
+        'reload': len(rows) >= settings.LIVE_UPDATES_MAX_ROWS,
+    })
@@ -21,7 +21,7 @@ from ..models.org import (
 )
 from marketplace.domain.org import OrganizationService
 from marketplace.domain.common import get_social_causes
-from .common import build_breadcrumb, home_link, paginate, generic_getter
+from .common import build_breadcrumb, home_link, paginate, generic_getter, get_request_object
 
 
 logger = logging.getLogger(__name__)
@@ -48,7 +48,11 @@ def organization_breadcrumb(organization, *items):
 
 
 def get_organization(request, org_pk):
-    return generic_getter(OrganizationService.get_organization,request.user, org_pk)
+    return get_request_object(request, (Organization, int(org_pk)),
+                              lambda: generic_getter(OrganizationService.get_organization,request.user, org_pk))
+
+def organization_getter(request, org_pk, **kwargs):
+    return get_organization(request, org_pk)
 
 def get_organization_membership_request(request, org_pk, request_pk):
     return generic_getter(OrganizationService.get_organization_membership_request, request.user, org_pk, request_pk)
@@ -114,6 +118,7 @@ class OrganizationView(generic.DetailView):
     model = Organization
     template_name = 'marketplace/org_info.html'
     pk_url_kwarg = 'org_pk'
+    query_budget = 18
 
     def get_object(self):
         return get_organization(self.request, self.kwargs['org_pk'])
@@ -128,7 +133,7 @@ class OrganizationView(generic.DetailView):
             members = OrganizationService.get_organization_members(self.request.user, organization)
         context['members'] = paginate(self.request, members, request_key='members_page', page_size=25)
 
-        projects = OrganizationService.get_organization_projects(self.request.user, organization)
+        projects = OrganizationService.get_organization_projects(self.request.user, organization, fetch_profile='list')
         context['projects'] = paginate(self.request, projects, request_key='projects_page', page_size=25)
 
         add_organization_common_context(self.request, self.object, 'info', context)
@@ -183,7 +188,7 @@ class CreateOrganizationRoleForm(ModelForm):
         model = OrganizationRole
         fields = ['role', 'user']
 
-@permission_required('organization.staff_view', raise_exception=True, fn=objectgetter(Organization, 'org_pk'))
+@permission_required('organization.staff_view', raise_exception=True, fn=organization_getter)
 def organization_staff_view(request, org_pk):
     if request.method == 'POST':
         form = CreateOrganizationRoleForm(request.POST)
@@ -220,7 +225,7 @@ def organization_staff_view(request, org_pk):
                         }))
 
 
-@permission_required('organization.staff_view', raise_exception=True, fn=objectgetter(Organization, 'org_pk'))
+@permission_required('organization.staff_view', raise_exception=True, fn=organization_getter)
 def add_organization_staff_view(request, org_pk):
     if request.method == 'POST':
         form_errors = []
@@ -21,10 +21,12 @@ from ..models.proj import (
     ProjectTask, ProjectTaskRequirement, ProjectStatus, TaskStatus,
     ProjectTaskReview, ProjectTaskRole, VolunteerApplication, ProjectScope,
 )
-from .common import build_breadcrumb, home_link, paginate, generic_getter
+from .common import build_breadcrumb, home_link, paginate, keyset_paginate, generic_getter, get_request_object, get_live_updates_after, live_updates_response
 from .org import organizations_link, organization_link, get_organization, add_organization_common_context
 
 from marketplace.domain.proj import ProjectService, ProjectTaskService
+from marketplace.domain.live import LiveUpdatesService
+from marketplace.middleware import query_budget
 from marketplace.domain.common import get_social_causes
 from marketplace.domain.org import OrganizationService
 from marketplace.domain.user import UserService
@@ -92,14 +94,27 @@ def project_volunteer_task_breadcrumb(project_task, *items):
     breadcrumb_items += items
     return build_breadcrumb(breadcrumb_items)
 
+def load_project(request, proj_pk):
+    project = generic_getter(ProjectService.get_project, request.user, proj_pk)
+    project.organization = get_organization(request, project.organization_id)
+    return project
+
 def get_project(request, proj_pk):
-    return generic_getter(ProjectService.get_project, request.user, proj_pk)
+    return get_request_object(request, (Project, int(proj_pk)), lambda: load_project(request, proj_pk))
+
+def project_getter(request, proj_pk, **kwargs):
+    return get_project(request, proj_pk)
 
 def get_project_scope(request, proj_pk, scope_pk):
     return generic_getter(ProjectService.get_project_scope, request.user, proj_pk, scope_pk)
 
+def load_project_task(request, proj_pk, task_pk):
+    project_task = generic_getter(ProjectTaskService.get_project_task,request.user, proj_pk, task_pk)
+    project_task.project = get_project(request, proj_pk)
+    return project_task
+
 def get_project_task(request, proj_pk, task_pk):
-    return generic_getter(ProjectTaskService.get_project_task,request.user, proj_pk, task_pk)
+    return get_request_object(request, (ProjectTask, int(proj_pk), int(task_pk)), lambda: load_project_task(request, proj_pk, task_pk))
 
 def get_project_task_role(request, proj_pk, task_pk, role_pk):
     return generic_getter(ProjectTaskService.get_project_task_role, request.user, proj_pk, task_pk, role_pk)
@@ -120,14 +135,19 @@ def get_project_role(request, proj_pk, role_pk):
     return generic_getter(ProjectService.get_project_role, request.user, proj_pk, role_pk)
 
 
+@query_budget(10)
 def project_list_view(request):
     checked_social_cause_fields = {}
     checked_project_fields = {}
+    filter_keywords = ""
     filter_projname = ""
     filter_orgname = ""
     filter_skills = ""
     if request.method == 'POST':
         search_config = {}
+        if 'keywords' in request.POST and request.POST.get('keywords'):
+            search_config['keywords'] = request.POST.get('keywords')
+            filter_keywords = request.POST.get('keywords')
         if 'projname' in request.POST and request.POST.get('projname'):
             search_config['projname'] = request.POST.get('projname')
             filter_projname = request.POST.get('projname')
@@ -145,14 +165,11 @@ def project_list_view(request):
             search_config['project_status'] = request.POST.getlist('projectstatus')
             for f in request.POST.getlist('projectstatus'):
                 checked_project_fields[f] = True
-        projects =  ProjectService.get_all_public_projects(request.user, search_config)
+        projects, facet_counts = ProjectService.get_all_public_projects(request.user, search_config, with_facet_counts=True, fetch_profile='list')
     elif request.method == 'GET':
-        projects =  ProjectService.get_all_public_projects(request.user)
+        projects, facet_counts = ProjectService.get_all_public_projects(request.user, with_facet_counts=True, fetch_profile='list')
 
-    if projects:
-        projects_page = paginate(request, projects, page_size=15)
-    else:
-        projects_page = []
+    projects_page = keyset_paginate(request, projects, page_size=15)
 
     any_org_member = OrganizationService.user_is_any_organization_member(request.user)
     organizations = OrganizationService.get_organizations_with_user_create_project_permission(request.user)
@@ -168,9 +185,11 @@ def project_list_view(request):
                             'proj_list': projects_page,
                             'checked_social_cause_fields': checked_social_cause_fields,
                             'checked_project_fields': checked_project_fields,
+                            'filter_keywords': filter_keywords,
                             'filter_projname': filter_projname,
                             'filter_orgname': filter_orgname,
                             'filter_skills': filter_skills,
+                            'facet_counts': facet_counts,
                             'user_is_any_organization_member': any_org_member,
                             'single_org_membership': single_org_membership,
                             'organization_memberships': organization_memberships,
@@ -197,17 +216,18 @@ class ProjectView(PermissionRequiredMixin, generic.ListView): ## This is a listv
     context_object_name = 'project_tasks'
     paginate_by = 25
     permission_required = 'project.view'
+    query_budget = 16
     raise_exception = True
     allow_empty = True
 
     def get_queryset(self):
-        return ProjectTaskService.get_public_tasks(self.request.user, self.kwargs['proj_pk'])
+        return ProjectTaskService.get_public_tasks(self.request.user, self.kwargs['proj_pk'], fetch_profile='info')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         project = get_project(self.request, self.kwargs['proj_pk'])
         context['breadcrumb'] = project_breadcrumb(project)
-        context['volunteers'] = ProjectService.get_project_public_volunteer_list(self.request.user, self.kwargs['proj_pk'])
+        context['volunteers'] = ProjectService.get_project_public_volunteer_list(self.request.user, self.kwargs['proj_pk'], fetch_profile='display')
         add_project_common_context(self.request, project, 'info', context)
         return context
 
@@ -217,7 +237,6 @@ class ProjectView(PermissionRequiredMixin, generic.ListView): ## This is a listv
 class ProjectLogView(PermissionRequiredMixin, generic.ListView):
     template_name = 'marketplace/proj_log.html'
     context_object_name = 'project_logs'
-    paginate_by = 20
     permission_required = 'project.log_view'
     raise_exception = True
     allow_empty = True
@@ -228,6 +247,7 @@ class ProjectLogView(PermissionRequiredMixin, generic.ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['project_logs'] = keyset_paginate(self.request, context['object_list'], page_size=20)
         project = get_project(self.request, self.kwargs['proj_pk'])
         context['breadcrumb'] = project_breadcrumb(project, ('Change log', None))
         add_project_common_context(self.request, project, 'log', context)
@@ -278,7 +298,7 @@ def project_channel_comments_view(request, proj_pk, channel_pk):
         form = CreateProjectCommentForm()
     project = get_project(request, proj_pk)
     project_comments = ProjectService.get_project_comments(request.user, channel_pk, project)
-    project_comments_page = paginate(request, project_comments, page_size=20)
+    project_comments_page = keyset_paginate(request, project_comments, page_size=20)
     channel = ProjectService.get_project_channel(request.user, project, channel_pk)
     discussion_channels = ProjectService.get_project_channels(request.user, project)
     return render(request, 'marketplace/proj_discussion.html',
@@ -291,9 +311,16 @@ def project_channel_comments_view(request, proj_pk, channel_pk):
                             'project_comments': project_comments_page,
                             'form': form,
                             'channel': channel,
-                            'discussion_channels': discussion_channels
+                            'discussion_channels': discussion_channels,
+                            'live_updates_after': get_live_updates_after(project_comments_page),
                         }))
 
+@query_budget(6)
+def channel_comment_updates_view(request, proj_pk, channel_pk):
+    project = get_project(request, proj_pk)
+    get_updates = lambda after_id, timeout: LiveUpdatesService.get_comment_updates(request.user, project, channel_pk, after_id, timeout)
+    return live_updates_response(request, get_updates, 'marketplace/components/project_comment.html', 'log')
+
 class ProjectDeliverablesView(generic.DetailView):
     model = Project
     template_name = 'marketplace/proj_deliverables.html'
@@ -310,7 +337,7 @@ class ProjectDeliverablesView(generic.DetailView):
         return context
 
 
-@permission_required('project.scope_view', raise_exception=True, fn=objectgetter(Project, 'proj_pk'))
+@permission_required('project.scope_view', raise_exception=True, fn=project_getter)
 def project_scope_view(request, proj_pk, scope_pk=None):
     if request.method == 'GET':
         project = get_project(request, proj_pk)
@@ -339,7 +366,7 @@ class EditProjectScopeForm(ModelForm):
         model = ProjectScope
         fields = ['version_notes', 'scope_goals', 'scope_interventions', 'scope_available_data', 'scope_analysis', 'scope_validation_methodology', 'scope_implementation',]
 
-@permission_required('project.scope_edit', raise_exception=True, fn=objectgetter(Project, 'proj_pk'))
+@permission_required('project.scope_edit', raise_exception=True, fn=project_getter)
 def project_edit_scope_view(request, proj_pk, scope_pk):
     project = get_project(request, proj_pk)
     project_scope = get_project_scope(request, proj_pk, scope_pk)
@@ -700,7 +727,7 @@ class ProjectEdit(PermissionRequiredMixin, UpdateView):
 
 
 
-@permission_required('project.task_requirements_view', raise_exception=True, fn=objectgetter(Project, 'proj_pk'))
+@permission_required('project.task_requirements_view', raise_exception=True, fn=project_getter)
 def project_task_requirements_edit_view(request, proj_pk, task_pk):
     task = get_project_task(request, proj_pk, task_pk)
     project = get_project(request, proj_pk)
@@ -727,7 +754,7 @@ def project_task_requirements_edit_view(request, proj_pk, task_pk):
                             'importance_levels': ProjectTaskService.get_project_task_requirement_importance_levels(),
                         }))
 
-@permission_required('project.task_staff_view', raise_exception=True, fn=objectgetter(Project, 'proj_pk'))
+@permission_required('project.task_staff_view', raise_exception=True, fn=project_getter)
 def project_task_staff_edit_view(request, proj_pk, task_pk):
     task = get_project_task(request, proj_pk, task_pk)
     project = get_project(request, proj_pk)
@@ -808,7 +835,7 @@ class CreateProjectRoleForm(ModelForm):
         model = ProjectRole
         fields = ['role', 'user']
 
-@permission_required('project.staff_view', raise_exception=True, fn=objectgetter(Project, 'proj_pk'))
+@permission_required('project.staff_view', raise_exception=True, fn=project_getter)
 def project_staff_view(request, proj_pk):
     project = get_project(request, proj_pk)
     if request.method == 'POST':
@@ -837,7 +864,7 @@ def project_staff_view(request, proj_pk):
                         }))
 
 
-@permission_required('project.volunteers_view', raise_exception=True, fn=objectgetter(Project, 'proj_pk'))
+@permission_required('project.volunteers_view', raise_exception=True, fn=project_getter)
 def project_volunteers_view(request, proj_pk):
     if request.method == 'GET':
         project = get_project(request, proj_pk)
@@ -901,7 +928,7 @@ class DeleteProjectRoleForm(ModelForm):
         model = ProjectRole
         fields = []
 
-@permission_required('project.staff_remove', raise_exception=True, fn=objectgetter(Project, 'proj_pk'))
+@permission_required('project.staff_remove', raise_exception=True, fn=project_getter)
 def project_role_delete_view(request, proj_pk, role_pk):
     project_role = get_project_role(request, proj_pk, role_pk)
     if request.method == 'POST':
@@ -1074,7 +1101,7 @@ def follow_project_view(request, proj_pk):
             return redirect('marketplace:proj_info', proj_pk=proj_pk)
 
 
-@permission_required('project.publish', raise_exception=True, fn=objectgetter(Project, 'proj_pk'))
+@permission_required('project.publish', raise_exception=True, fn=project_getter)
 def publish_project_view(request, proj_pk):
     project = get_project(request, proj_pk)
     if request.method == 'POST':
@@ -1100,7 +1127,7 @@ def publish_project_view(request, proj_pk):
         raise Http404
 
 
-@permission_required('project.approve_as_completed', raise_exception=True, fn=objectgetter(Project, 'proj_pk'))
+@permission_required('project.approve_as_completed', raise_exception=True, fn=project_getter)
 def finish_project_view(request, proj_pk):
     project = get_project(request, proj_pk)
     if request.method == 'POST':
@@ -1125,7 +1152,7 @@ def finish_project_view(request, proj_pk):
     else:
         raise Http404
 
-@permission_required('project.task_edit', raise_exception=True, fn=objectgetter(Project, 'proj_pk'))
+@permission_required('project.task_edit', raise_exception=True, fn=project_getter)
 def toggle_task_accepting_volunteers_view(request, proj_pk, task_pk):
     if request.method == 'GET':
         raise Http404
@@ -1221,7 +1248,7 @@ def pin_task_review_view(request, proj_pk, task_pk, review_pk):
             return redirect('marketplace:proj_instructions_task', proj_pk=proj_pk, task_pk=task_pk)
 
 
-@permission_required('project.task_edit', raise_exception=True, fn=objectgetter(Project, 'proj_pk'))
+@permission_required('project.task_edit', raise_exception=True, fn=project_getter)
 def publish_project_task_view(request, proj_pk, task_pk):
     project_task = get_project_task(request, proj_pk, task_pk)
     project = project_task.project
@@ -1,4 +1,4 @@
-from datetime import timedelta
+from collections import defaultdict
 
 from allauth.account.models import EmailAddress
 from allauth.account.utils import perform_login
@@ -15,7 +15,6 @@ from django.contrib.auth.decorators import login_required
 from django.http import Http404, HttpResponseForbidden
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
-from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views import generic
 from django.views.decorators.csrf import csrf_protect
@@ -27,17 +26,21 @@ from rules.contrib.views import (
 )
 
 from ..models.org import Organization, OrganizationMembershipRequest
-from ..models.proj import Project, ProjectStatus, ProjectTask, VolunteerApplication
+from ..models.proj import Project, ProjectTask, VolunteerApplication
 from ..models.user import SkillLevel, User, UserType, VolunteerProfile, UserNotification, NotificationSource
-from .common import build_breadcrumb, home_link, paginate
+from .common import build_breadcrumb, home_link, paginate, keyset_paginate, get_live_updates_after, live_updates_response
 
 from marketplace import utils
 from marketplace.domain import marketplace
 from marketplace.domain.user import UserService
 from marketplace.domain.proj import ProjectService, ProjectTaskService
 from marketplace.domain.org import OrganizationService
+from marketplace.domain.matching import MatchingService
 from marketplace.domain.notifications import NotificationService
+from marketplace.domain.live import LiveUpdatesService
 from marketplace.domain.news import NewsService
+from marketplace.domain.stats import PlatformStatsService
+from marketplace.middleware import query_budget
 
 
 def dashboard_link(include_link=True):
@@ -59,39 +62,37 @@ def edit_my_preferences_link(user_pk, include_link=True):
     return ("Edit my interests" , reverse('marketplace:user_preferences_edit', args=[user_pk]) if include_link else None)
 
 
-def get_or_none(classmodel, **kwargs):
-    try:
-        return classmodel.objects.get(**kwargs)
-    except classmodel.DoesNotExist:
-        return None
-
-
-def get_url_for_notification(source_type, source_id):
-    url = None
-    if source_id:
-        if source_type == NotificationSource.GENERIC:
-            url = None
-        elif source_type == NotificationSource.ORGANIZATION:
-            organization = get_or_none(Organization, pk=source_id)
-            if organization:
-                url = reverse('marketplace:org_info', args=[source_id])
-        elif source_type == NotificationSource.PROJECT:
-            project = get_or_none(Project, pk=source_id)
-            if project:
-                url = reverse('marketplace:proj_info', args=[source_id])
-        elif source_type == NotificationSource.TASK:
-            project_task = get_or_none(ProjectTask, pk=source_id)
-            if project_task:
-                url = reverse('marketplace:proj_info', args=[project_task.project.id])
-        elif source_type == NotificationSource.VOLUNTEER_APPLICATION:
-            volunteer_application = get_or_none(VolunteerApplication, pk=source_id)
-            if volunteer_application:
-                url = reverse('marketplace:proj_volunteer_application_review', args=[volunteer_application.task.project.id, volunteer_application.task.id, source_id])
-        elif source_type == NotificationSource.ORGANIZATION_MEMBERSHIP_REQUEST:
-            membership_request = get_or_none(OrganizationMembershipRequest,pk=source_id)
-            if membership_request:
-                url = reverse('marketplace:org_staff_request_review', args=[membership_request.organization.id, source_id])
-    return url
+def get_urls_for_notifications(notifications):
+    # Resolves the URLs of a page of notifications with one query per source
+    # type instead of one or more queries per notification. Only the ids
+    # needed to build the URLs are loaded, and notifications whose target no
+    # longer exists get no URL.
+    target_ids = defaultdict(set)
+    for notification in notifications:
+        if notification.target_id and notification.source in NOTIFICATION_TARGET_QUERIES:
+            target_ids[notification.source].add(notification.target_id)
+    targets = {source: NOTIFICATION_TARGET_QUERIES[source]().in_bulk(ids) for source, ids in target_ids.items()}
+    urls = []
+    for notification in notifications:
+        target = targets.get(notification.source, {}).get(notification.target_id)
+        urls.append(NOTIFICATION_TARGET_URLS[notification.source](target) if target else None)
+    return urls
+
+NOTIFICATION_TARGET_QUERIES = {
+    NotificationSource.ORGANIZATION: lambda: Organization.objects.only('id'),
+    NotificationSource.PROJECT: lambda: Project.objects.only('id'),
+    NotificationSource.TASK: lambda: ProjectTask.objects.only('id', 'project_id'),
+    NotificationSource.VOLUNTEER_APPLICATION: lambda: VolunteerApplication.objects.select_related('task').only('id', 'task__id', 'task__project_id'),
+    NotificationSource.ORGANIZATION_MEMBERSHIP_REQUEST: lambda: OrganizationMembershipRequest.objects.only('id', 'organization_id'),
+}
+
+NOTIFICATION_TARGET_URLS = {
+    NotificationSource.ORGANIZATION: lambda organization: reverse('marketplace:org_info', args=[organization.id]),
+    NotificationSource.PROJECT: lambda project: reverse('marketplace:proj_info', args=[project.id]),
+    NotificationSource.TASK: lambda project_task: reverse('marketplace:proj_info', args=[project_task.project_id]),
+    NotificationSource.VOLUNTEER_APPLICATION: lambda volunteer_application: reverse('marketplace:proj_volunteer_application_review', args=[volunteer_application.task.project_id, volunteer_application.task.id, volunteer_application.id]),
+    NotificationSource.ORGANIZATION_MEMBERSHIP_REQUEST: lambda membership_request: reverse('marketplace:org_staff_request_review', args=[membership_request.organization_id, membership_request.id]),
+}
 
 
 class AuthenticationForm(django.contrib.auth.forms.AuthenticationForm):
@@ -143,6 +144,7 @@ def logout_view(request):
     return redirect('marketplace:home')
 
 
+@query_budget(15)
 def volunteer_list_view(request):
     # checked_social_cause_fields = {}
     checked_awards_fields = {}
@@ -164,14 +166,11 @@ def volunteer_list_view(request):
         #     search_config['project_status'] = request.POST.getlist('projectstatus')
         #     for f in request.POST.getlist('projectstatus'):
         #         checked_project_fields[f] = True
-        volunteers =  UserService.get_all_approved_volunteer_profiles(request.user, search_config)
+        volunteers =  UserService.get_all_approved_volunteer_profiles(request.user, search_config, fetch_profile='list')
     elif request.method == 'GET':
-        volunteers =  UserService.get_all_approved_volunteer_profiles(request.user)
+        volunteers =  UserService.get_all_approved_volunteer_profiles(request.user, fetch_profile='list')
 
-    if volunteers:
-        volunteers_page = paginate(request, volunteers, page_size=15)
-    else:
-        volunteers_page = []
+    volunteers_page = keyset_paginate(request, volunteers, page_size=15)
 
     return render(request, 'marketplace/volunteer_list.html',
                         {
@@ -190,7 +189,6 @@ class UserHomeView(PermissionRequiredMixin, generic.ListView): ## This is a list
     model = UserNotification
     template_name = 'marketplace/home_user.html'
     context_object_name = 'notification_list'
-    paginate_by = 10
     permission_required = 'user.is_authenticated'
 
     def get_queryset(self):
@@ -198,13 +196,22 @@ class UserHomeView(PermissionRequiredMixin, generic.ListView): ## This is a list
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['notification_list'] = keyset_paginate(self.request, context['object_list'], page_size=10)
         context['breadcrumb'] = build_breadcrumb([home_link(), dashboard_link(include_link=False)])
-        for notification in context['notification_list']:
-            notification.url = get_url_for_notification(notification.source, notification.target_id)
+        notifications = context['notification_list'].object_list
+        # Only the first page starts with the newest notification, which is
+        # the last one "mark all as read" marks
+        if notifications and not context['notification_list'].previous_cursor:
+            context['newest_notification_id'] = notifications[0].id
+        context['live_updates_after'] = get_live_updates_after(context['notification_list'])
+        for notification, url in zip(notifications, get_urls_for_notifications(notifications)):
+            notification.url = url
         context['todos'] = UserService.get_user_todos(self.request.user, self.request.user)
         context['my_tasks'] = ProjectTaskService.get_user_in_progress_tasks(self.request.user)
         context['my_task_applications'] = ProjectTaskService.get_volunteer_open_task_applications(self.request.user, None)
         context['user_is_volunteer'] = UserService.user_has_volunteer_profile(self.request.user)
+        if context['user_is_volunteer']:
+            context['recommended_tasks'] = MatchingService.recommended_tasks(self.request.user, self.request.user, limit=5)
         context['user_is_any_organization_member'] = OrganizationService.user_is_any_organization_member(self.request.user)
         organizations = OrganizationService.get_organizations_with_user_create_project_permission(self.request.user)
         if len(organizations) == 1:
@@ -218,10 +225,35 @@ class UserHomeView(PermissionRequiredMixin, generic.ListView): ## This is a list
         # This should be done in the service itself but only the view knows the
         # items that are actually displayed (as pagination is done in the view) so
         # the service iteslf cannot just mark the right notifications as read.
-        mark_notifications_as_read = lambda response: NotificationService.mark_notifications_as_read(context['notification_list'])
+        unread_ids = [notification.id for notification in context['notification_list'] if not notification.is_read]
+        # Callbacks that return a value replace the response
+        def mark_notifications_as_read(response):
+            NotificationService.mark_notifications_as_read(self.request.user, unread_ids)
         response.add_post_render_callback(mark_notifications_as_read)
         return response
 
+
+@login_required
+@query_budget(5)
+def notification_updates_view(request):
+    def get_updates(after_id, timeout):
+        notifications = LiveUpdatesService.get_notification_updates(request.user, after_id, timeout)
+        for notification, url in zip(notifications, get_urls_for_notifications(notifications)):
+            notification.url = url
+        return notifications
+    return live_updates_response(request, get_updates, 'marketplace/components/notification_item.html', 'notification')
+
+
+@login_required
+@require_POST
+def mark_all_notifications_read_view(request):
+    try:
+        up_to_id = int(request.POST['up_to_id'])
+    except (KeyError, ValueError):
+        up_to_id = None
+    NotificationService.mark_notifications_as_read(request.user, up_to_id=up_to_id)
+    return redirect('marketplace:user_dashboard')
+
 def home_view(request):
     # featured volunteer
     featured_volunteer = UserService.get_featured_volunteer()
@@ -234,11 +266,6 @@ def home_view(request):
     else:
         featured_volunteer_skills = None
 
-    # platform stats
-    avg_days_month = 365.25 / 12
-    one_avg_month = timedelta(days=avg_days_month)
-    one_avg_month_ago = timezone.now() - one_avg_month
-
     return render(request, 'marketplace/home_anonymous.html', {
         'user_is_any_organization_member': OrganizationService.user_can_create_projects(request.user),
         'featured_project': ProjectService.get_featured_project(),
@@ -246,11 +273,7 @@ def home_view(request):
         'featured_volunteer': featured_volunteer,
         'featured_volunteer_skills': featured_volunteer_skills,
         'news': NewsService.get_latest_news(request.user),
-        'platform_stats': {
-            'projects_in_design': Project.objects.filter(status=ProjectStatus.DESIGN).count(),
-            'projects_this_month': Project.objects.filter(creation_date__gte=one_avg_month_ago).count(),
-            'volunteers_this_month': VolunteerProfile.objects.filter(creation_date__gte=one_avg_month_ago).count(),
-        },
+        'platform_stats': PlatformStatsService.get_platform_stats(),
     })
 
 
@@ -279,7 +302,7 @@ class UserProfileView(generic.DetailView):
 
 class UserProfileEdit(PermissionRequiredMixin, UpdateView):
     model = User
-    fields = ['first_name', 'last_name', 'email', 'profile_image_file', 'phone_number', 'skype_name' ]
+    fields = ['first_name', 'last_name', 'email', 'profile_image_file', 'phone_number', 'skype_name', 'notification_email_frequency']
     template_name = 'marketplace/user_profile_edit.html'
     pk_url_kwarg = 'user_pk'
     permission_required = 'user.is_same_user'
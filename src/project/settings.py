@@ -59,6 +59,12 @@ if file_storage_option not in file_storage_options:
     raise ImproperlyConfigured("unrecognized value for DEFAULT_FILE_STORAGE: "
                                f"{file_storage_option!r} not in {file_storage_options}")
 
+cache_option = config('CACHE_BACKEND', default='') or 'locmem'
+cache_options = {'locmem', 'file', 'redis'}
+if cache_option not in cache_options:
+    raise ImproperlyConfigured("unrecognized value for CACHE_BACKEND: "
+                               f"{cache_option!r} not in {cache_options}")
+
 
 # Application definition
 
@@ -101,6 +107,7 @@ if file_storage_option == 's3':
 
 
 MIDDLEWARE = [
+    'marketplace.middleware.QueryInspectionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -150,6 +157,42 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+## The local-memory cache is private to every gunicorn worker; the file and
+## Redis caches are shared by all the workers of a host or of all the hosts.
+if cache_option == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': config('CACHE_LOCATION'),  # e.g. redis://127.0.0.1:6379/1
+        }
+    }
+elif cache_option == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_LOCATION', default='/var/tmp/dssgsolve_cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Results of the domain getters decorated with marketplace.domain.cache.cached.
+# Entries are invalidated through tag versions kept in the cache, so with a
+# cache private to every worker the other workers would keep stale entries.
+DOMAIN_CACHE_ENABLED = config('DOMAIN_CACHE_ENABLED', default=cache_option != 'locmem', cast=bool)
+if DOMAIN_CACHE_ENABLED and cache_option == 'locmem':
+    raise ImproperlyConfigured("DOMAIN_CACHE_ENABLED requires a shared cache: "
+                               "set CACHE_BACKEND to 'file' or 'redis'")
+DOMAIN_CACHE_TIMEOUT = config('DOMAIN_CACHE_TIMEOUT', default=600, cast=int)  # seconds
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.0/ref/settings/#auth-password-validators
 
@@ -261,6 +304,53 @@ else:
     EMAIL_HOST_USER = config('EMAIL_HOST_USER')
     EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 
+# Notification emails are queued in the database and delivered in batches by
+# the send_notification_emails management command.
+NOTIFICATION_EMAIL_BATCH_SIZE = config('NOTIFICATION_EMAIL_BATCH_SIZE', default=100, cast=int)
+NOTIFICATION_EMAIL_MAX_ATTEMPTS = config('NOTIFICATION_EMAIL_MAX_ATTEMPTS', default=5, cast=int)
+NOTIFICATION_EMAIL_RETRY_DELAY = config('NOTIFICATION_EMAIL_RETRY_DELAY', default=60, cast=int)  # seconds, doubled on every retry
+NOTIFICATION_EMAIL_POLL_INTERVAL = config('NOTIFICATION_EMAIL_POLL_INTERVAL', default=10, cast=int)  # seconds
+# A worker claims a batch for this long; it must be well above the time it
+# takes to send a whole batch, or another worker may send the emails again.
+NOTIFICATION_EMAIL_CLAIM_TIMEOUT = config('NOTIFICATION_EMAIL_CLAIM_TIMEOUT', default=3600, cast=int)  # seconds
+
+# Read notifications older than the retention period are moved to the archive
+# (or deleted) by the archive_notifications management command.
+NOTIFICATION_RETENTION_DAYS = config('NOTIFICATION_RETENTION_DAYS', default=180, cast=int)
+NOTIFICATION_ARCHIVE_BATCH_SIZE = config('NOTIFICATION_ARCHIVE_BATCH_SIZE', default=1000, cast=int)
+
+# New notifications and discussion comments are fetched by the pages with
+# long-poll requests. Each web worker process holds at most
+# LIVE_UPDATES_MAX_CONNECTIONS of them at a time, which must be lower than its
+# number of threads (see gunicorn.conf); the others are answered right away
+# and the page polls again after LIVE_UPDATES_RETRY_DELAY.
+LIVE_UPDATES_TIMEOUT = config('LIVE_UPDATES_TIMEOUT', default=25, cast=int)  # seconds
+LIVE_UPDATES_POLL_INTERVAL = config('LIVE_UPDATES_POLL_INTERVAL', default=1, cast=float)  # seconds
+LIVE_UPDATES_MAX_CONNECTIONS = config('LIVE_UPDATES_MAX_CONNECTIONS', default=4, cast=int)
+LIVE_UPDATES_RETRY_DELAY = config('LIVE_UPDATES_RETRY_DELAY', default=15, cast=int)  # seconds
+LIVE_UPDATES_MAX_ROWS = config('LIVE_UPDATES_MAX_ROWS', default=20, cast=int)
+
+# Facet counts of the project search are also invalidated whenever a project
+# changes, so this only bounds how long an unused entry is kept.
+PROJECT_FACETS_CACHE_TIMEOUT = config('PROJECT_FACETS_CACHE_TIMEOUT', default=300, cast=int)  # seconds
+
+# The home page platform stats are summed from daily counters, and may lag
+# behind by this long.
+PLATFORM_STATS_CACHE_TIMEOUT = config('PLATFORM_STATS_CACHE_TIMEOUT', default=60, cast=int)  # seconds
+
+# When enabled, the queries of every request are counted and checked against
+# the query budget of the view (see marketplace.middleware.query_budget).
+QUERY_INSPECTION_ENABLED = config('QUERY_INSPECTION_ENABLED', default=DEBUG, cast=bool)
+QUERY_REPEAT_THRESHOLD = config('QUERY_REPEAT_THRESHOLD', default=5, cast=int)
+
+# Featured content of the home page. The picks are refreshed by the
+# update_featured_content command and on the domain events that change them,
+# never when the home page is shown. The scorers are functions of
+# marketplace.domain.featured or any other importable module.
+FEATURED_PROJECT_SCORER = config('FEATURED_PROJECT_SCORER', default='marketplace.domain.featured.most_volunteers_project_scorer')
+FEATURED_ORGANIZATION_SCORER = config('FEATURED_ORGANIZATION_SCORER', default='marketplace.domain.featured.most_projects_organization_scorer')
+FEATURED_VOLUNTEER_SCORER = config('FEATURED_VOLUNTEER_SCORER', default='marketplace.domain.featured.best_reviewed_volunteer_scorer')
+
 
 if DEBUG:
     LOGS_HOME = '.'